@@ -0,0 +1,5 @@
+import os
+from pathlib import Path
+
+# Benchmarks run with python -m benchmarks.<name> from the backend directory, set up the backend root like tests/conftest.py
+os.environ.setdefault("RECIPE_APP_BACKEND_ROOT", str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,315 @@
+"""
+Performance benchmarks of ingredient parsing, ingredient matching, in-process recipe matching and the recipe API.
+Runs fully offline: recipes are generated from baseline_ingredient_list.json and matched by RecipeMatcher or served by the
+in-memory database driver, and the API is called through the FastAPI test client. MongoDB queries are not benchmarked.
+Benchmarks whose dependencies aren't installed (ingredient_parser, sentence_transformers) are reported as skipped.
+
+Run from the backend directory:
+    python -m benchmarks.benchmark_suite --output results.json
+    python -m benchmarks.benchmark_suite --output results.json --compare baseline.json --tolerance 0.25
+    python -m benchmarks.benchmark_suite --only recipe_matcher_set_difference --corpus-sizes 1000 10000
+
+With --compare, every metric is checked against the saved baseline and the run exits with status 1 if any got worse
+by more than the tolerance. Metrics ending in _milliseconds or _seconds are lower is better, metrics ending in
+_per_second are higher is better, anything else is informational.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+
+from recipe_manager.embedding_store import EmbeddingStore
+from recipe_manager.ingredient_normalizer import IngredientNormalizer, SentenceTransformerHandler
+from recipe_manager.recipe_managers import RecipeManager
+from recipe_manager.recipe_matcher import RecipeMatcher
+from tests.database_testing.in_memory_database_driver import InMemoryDatabaseDriver
+from tests.ingredient_testing.raw_json_ingredient_reader import RawJsonIngredientReader
+
+SCRAPED_RECIPES_FILE = BACKEND_ROOT / "recipe_manager" / "config" / "recipe_output.json"
+DEFAULT_CORPUS_SIZES = [1000, 10000, 100000]
+DEFAULT_TOLERANCE = 0.25
+NOISE_FLOOR_MILLISECONDS = 0.05  # Differences smaller than this are timer noise, never flagged
+NUMBER_OF_QUERIES = 200
+API_CORPUS_SIZE = 10000
+
+# Parsed ingredient names that need each matching tier, the lexical ones are typos, plurals and reordered words
+LEXICAL_INGREDIENTS = ["parmesan chese", "tomatoes", "lower-sodium beef broth", "pepper black", "chicken thigh", "green olive"]
+CONTEXTUAL_INGREDIENTS = ["mexican oregano", "grated parmesan cheese", "fresh basil leaves", "boneless skinless chicken breasts", "somerandomingredient sasdf"]
+
+
+def load_raw_ingredient_strings() -> list[list[str]]:
+    """Ingredient lines of the scraped sample recipes, one list per recipe"""
+    with open(SCRAPED_RECIPES_FILE, 'r') as f:
+        return [[ingredient["original"] for ingredient in recipe["extendedIngredients"]] for recipe in json.load(f)["recipes"]]
+
+
+def generate_recipes(number_of_recipes: int, ingredient_names: list[str], rng: np.random.Generator) -> list[dict]:
+    """Recipes of 4 to 15 ingredients, common ingredients are picked far more often like in real recipes (Zipf-like)"""
+    weights = 1 / np.arange(1, len(ingredient_names) + 1)
+    weights /= weights.sum()
+    recipes = []
+    for recipe_id in range(number_of_recipes):
+        ingredient_indexes = rng.choice(len(ingredient_names), size=rng.integers(4, 16), replace=False, p=weights)
+        recipes.append({
+            "recipe_name": f"recipe {recipe_id}",
+            "source_url": f"https://example.com/recipes/{recipe_id}",
+            "ingredients": [ingredient_names[index] for index in ingredient_indexes]
+        })
+    return recipes
+
+
+def generate_pantries(number_of_pantries: int, ingredient_names: list[str], rng: np.random.Generator) -> list[list[str]]:
+    return [list(rng.choice(ingredient_names, size=rng.integers(5, 21), replace=False)) for _ in range(number_of_pantries)]
+
+
+def summarize_latencies(latencies: list[float], prefix: str = "") -> dict:
+    return {
+        f"{prefix}p50_milliseconds": float(np.percentile(latencies, 50) * 1000),
+        f"{prefix}p99_milliseconds": float(np.percentile(latencies, 99) * 1000),
+        f"{prefix}mean_milliseconds": float(np.mean(latencies) * 1000),
+    }
+
+
+def time_calls(function, arguments_list: list) -> list[float]:
+    latencies = []
+    for arguments in arguments_list:
+        start_time = time.perf_counter()
+        function(*arguments)
+        latencies.append(time.perf_counter() - start_time)
+    return latencies
+
+
+def benchmark_trim_ingredient_string(options: argparse.Namespace) -> dict:
+    ingredient_strings = [ingredient_string for recipe in load_raw_ingredient_strings() for ingredient_string in recipe]
+
+    start_time = time.perf_counter()
+    IngredientNormalizer.trim_ingredient_string(ingredient_strings[0])  # Loads the parser model
+    first_call_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for ingredient_string in ingredient_strings:
+        IngredientNormalizer.trim_ingredient_string(ingredient_string)
+    elapsed_seconds = time.perf_counter() - start_time
+
+    return {
+        "first_call_seconds": first_call_seconds,
+        "strings_per_second": len(ingredient_strings) / elapsed_seconds,
+        "number_of_strings": len(ingredient_strings),
+    }
+
+
+def benchmark_exact_and_lexical_match(options: argparse.Namespace) -> dict:
+    ingredient_normalizer = IngredientNormalizer(RawJsonIngredientReader(), contextual_matching=False)
+    known_ingredients = ingredient_normalizer.ingredient_reader.get_and_unroll_ingredients()
+
+    # Parsed tuples are matched directly, parsing is measured by trim_ingredient_string
+    exact_tuples = [(known_ingredients[i % len(known_ingredients)], None) for i in range(NUMBER_OF_QUERIES)]
+    lexical_tuples = [(LEXICAL_INGREDIENTS[i % len(LEXICAL_INGREDIENTS)], None) for i in range(NUMBER_OF_QUERIES)]
+
+    metrics = {}
+    for tier, ingredient_tuples in [("exact", exact_tuples), ("lexical", lexical_tuples)]:
+        latencies = time_calls(ingredient_normalizer.match_ingredient_tuples, [([ingredient_tuple], ["unused"]) for ingredient_tuple in ingredient_tuples])
+        metrics.update(summarize_latencies(latencies, f"{tier}_"))
+    metrics["match_statistics"] = ingredient_normalizer.get_match_statistics()["tier_counts"]
+    return metrics
+
+
+def benchmark_contextual_match(options: argparse.Namespace) -> dict:
+    ingredient_normalizer = IngredientNormalizer(RawJsonIngredientReader(), lexical_matching=False)
+    ingredient_normalizer.sentence_transformer.warm_up()
+
+    arguments_list = [(CONTEXTUAL_INGREDIENTS[i % len(CONTEXTUAL_INGREDIENTS)], None) for i in range(NUMBER_OF_QUERIES)]
+    metrics = summarize_latencies(time_calls(ingredient_normalizer.contextual_ingredient_match, arguments_list), "single_")
+
+    batch_arguments = [[(ingredient, None) for ingredient in CONTEXTUAL_INGREDIENTS]] * (NUMBER_OF_QUERIES // len(CONTEXTUAL_INGREDIENTS))
+    metrics.update(summarize_latencies(time_calls(ingredient_normalizer.batch_contextual_ingredient_match, [(arguments,) for arguments in batch_arguments]), "batch_"))
+    metrics["batch_size"] = len(CONTEXTUAL_INGREDIENTS)
+    return metrics
+
+
+def benchmark_sentence_transformer_construction(options: argparse.Namespace) -> dict:
+    known_ingredients = RawJsonIngredientReader().get_and_unroll_ingredients()
+    metrics = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # Cold encodes the whole vocabulary, warm loads the stored embeddings and index written by the cold run
+        for phase in ["cold", "warm"]:
+            start_time = time.perf_counter()
+            handler = SentenceTransformerHandler(known_ingredients, EmbeddingStore(Path(directory)))
+            handler.load_model()
+            handler.load_index()
+            metrics[f"{phase}_seconds"] = time.perf_counter() - start_time
+    metrics["vocabulary_size"] = len(known_ingredients)
+    return metrics
+
+
+def make_recipe_matcher_set_difference_benchmark(corpus_size: int):
+    def benchmark_recipe_matcher_set_difference(options: argparse.Namespace) -> dict:
+        """
+        Times RecipeMatcher.get_ingredient_set_difference, the in-process matcher of the in_process and sharded query
+        modes, and the time to build it. The MongoDB aggregation pipeline of the database query mode isn't measured.
+        """
+        rng = np.random.default_rng(options.seed)
+        ingredient_names = [ingredient["name"] for ingredient in RawJsonIngredientReader().get_all_ingredients()]
+
+        recipes = generate_recipes(corpus_size, ingredient_names, rng)
+        start_time = time.perf_counter()
+        recipe_matcher = RecipeMatcher(recipes)
+        build_seconds = time.perf_counter() - start_time
+
+        pantries = generate_pantries(NUMBER_OF_QUERIES, ingredient_names, rng)
+        latencies = time_calls(recipe_matcher.get_ingredient_set_difference, [(pantry,) for pantry in pantries])
+        return {"build_seconds": build_seconds, **summarize_latencies(latencies), "corpus_size": corpus_size}
+    return benchmark_recipe_matcher_set_difference
+
+
+def benchmark_get_recipe_links(options: argparse.Namespace) -> dict:
+    from fastapi.testclient import TestClient
+    import recipe_app
+
+    rng = np.random.default_rng(options.seed)
+    ingredient_names = [ingredient["name"] for ingredient in RawJsonIngredientReader().get_all_ingredients()]
+    database_driver = InMemoryDatabaseDriver(generate_recipes(API_CORPUS_SIZE, ingredient_names, rng))
+
+    ingredient_normalizer = IngredientNormalizer(RawJsonIngredientReader(), contextual_matching=options.contextual)
+    recipe_manager = RecipeManager(database_driver=database_driver, ingredient_normalizer=ingredient_normalizer)
+    try:
+        recipe_manager.warm_up()
+        recipe_app.recipe_manager = recipe_manager
+
+        # The app isn't entered as a context manager, so the lifespan hook connecting to MongoDB doesn't run
+        client = TestClient(recipe_app.app)
+        raw_recipes = load_raw_ingredient_strings()
+        requests = [{"num_missing_ingredients_allowed": 2, "ingredients_list": raw_recipes[i % len(raw_recipes)]} for i in range(NUMBER_OF_QUERIES)]
+
+        def get_recipe_links(request_object):
+            response = client.request("GET", "/get_recipe_links", json=request_object)
+            response.raise_for_status()
+
+        # The first pass over each recipe normalizes and matches, repeats are served by the caches
+        first_pass = time_calls(get_recipe_links, [(request_object,) for request_object in requests[:len(raw_recipes)]])
+        repeated = time_calls(get_recipe_links, [(request_object,) for request_object in requests[len(raw_recipes):]])
+    finally:
+        recipe_manager.cpu_executor.close()
+    return {**summarize_latencies(first_pass, "uncached_"), **summarize_latencies(repeated, "cached_"), "corpus_size": API_CORPUS_SIZE}
+
+
+def get_benchmarks(options: argparse.Namespace) -> dict:
+    benchmarks = {
+        "trim_ingredient_string": benchmark_trim_ingredient_string,
+        "exact_and_lexical_match": benchmark_exact_and_lexical_match,
+        "contextual_match": benchmark_contextual_match,
+        "sentence_transformer_construction": benchmark_sentence_transformer_construction,
+    }
+    for corpus_size in options.corpus_sizes:
+        benchmarks[f"recipe_matcher_set_difference_{corpus_size}"] = make_recipe_matcher_set_difference_benchmark(corpus_size)
+    benchmarks["get_recipe_links"] = benchmark_get_recipe_links
+    return benchmarks
+
+
+def run_benchmarks(options: argparse.Namespace) -> dict:
+    results = {}
+    for name, benchmark in get_benchmarks(options).items():
+        if options.only and not any(name.startswith(prefix) for prefix in options.only):
+            continue
+
+        try:
+            results[name] = {"status": "ok", "metrics": benchmark(options)}
+        except ImportError as e:
+            # Optional heavy dependency not installed here
+            results[name] = {"status": "skipped", "reason": str(e)}
+        print(f"{name}: {json.dumps(results[name])}")
+
+    return {"metadata": get_metadata(), "benchmarks": results}
+
+
+def get_metadata() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare_results(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[dict]:
+    """
+    Compares every timing and throughput metric present in both runs.
+    :return: one entry per metric with the relative change and whether it is a regression beyond tolerance
+    """
+    comparisons = []
+    for name, result in results["benchmarks"].items():
+        baseline_result = baseline["benchmarks"].get(name)
+        if result["status"] != "ok" or baseline_result is None or baseline_result["status"] != "ok":
+            continue
+
+        for metric, value in result["metrics"].items():
+            baseline_value = baseline_result["metrics"].get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(baseline_value, (int, float)) or baseline_value == 0:
+                continue
+
+            if metric.endswith("_per_second"):
+                change = (baseline_value - value) / baseline_value  # Positive is slower
+                is_noise = False
+            elif metric.endswith("_milliseconds") or metric.endswith("_seconds"):
+                change = (value - baseline_value) / baseline_value
+                scale = 1 if metric.endswith("_milliseconds") else 1000
+                is_noise = abs(value - baseline_value) * scale < NOISE_FLOOR_MILLISECONDS
+            else:
+                continue
+
+            comparisons.append({
+                "benchmark": name,
+                "metric": metric,
+                "baseline": baseline_value,
+                "value": value,
+                "change": change,
+                "regression": change > tolerance and not is_noise
+            })
+    return comparisons
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the performance benchmarks and optionally compare them to a baseline")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline results JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed relative slowdown, 0.25 is 25%%")
+    parser.add_argument("--only", nargs="+", help="only run benchmarks whose name starts with one of these")
+    parser.add_argument("--corpus-sizes", type=int, nargs="+", default=DEFAULT_CORPUS_SIZES)
+    parser.add_argument("--contextual", action="store_true", help="load the transformer model for the API benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmarks(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(benchmark_results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline_results = json.load(f)
+
+        regressions = []
+        for comparison in compare_results(benchmark_results, baseline_results, args.tolerance):
+            flag = "REGRESSION" if comparison["regression"] else "ok"
+            print(f"{flag:>10}  {comparison['benchmark']}.{comparison['metric']}: {comparison['baseline']:.4g} -> {comparison['value']:.4g} ({comparison['change']:+.1%})")
+            if comparison["regression"]:
+                regressions.append(comparison)
+
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
@@ -0,0 +1,98 @@
+"""
+Measures encode latency and resident memory of each embedding backend.
+Every backend runs in its own process so the RSS numbers don't include another backend's model. Reports the RSS
+after loading the model, single query encode p50/p99 latency, and the time to encode the whole known ingredient list.
+
+Run from the backend directory:
+    python -m benchmarks.embedding_backend_benchmark --backends sentence_transformer dynamic_int8 --intra-op-threads 1 4
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+
+from benchmarks.embedding_backend_parity import QUERY_INGREDIENTS, load_known_ingredients
+from recipe_manager.embedding_backends import EmbeddingBackendFactory, SentenceTransformerBackend
+
+NUMBER_OF_SINGLE_QUERIES = 200
+
+
+def get_rss_megabytes() -> float:
+    """Current resident set size, falls back to the peak RSS where /proc isn't available"""
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark_backend(config: dict) -> dict:
+    rss_before_load = get_rss_megabytes()
+    backend = EmbeddingBackendFactory.create(config)
+
+    start_time = time.perf_counter()
+    backend.load()
+    backend.encode(["warm up"])
+    load_seconds = time.perf_counter() - start_time
+    rss_after_load = get_rss_megabytes()
+
+    latencies = []
+    for i in range(NUMBER_OF_SINGLE_QUERIES):
+        query = QUERY_INGREDIENTS[i % len(QUERY_INGREDIENTS)]
+        start_time = time.perf_counter()
+        backend.encode([query])
+        latencies.append(time.perf_counter() - start_time)
+
+    known_ingredients = load_known_ingredients()
+    start_time = time.perf_counter()
+    backend.encode(known_ingredients)
+    vocabulary_encode_seconds = time.perf_counter() - start_time
+
+    return {
+        "backend": backend.name,
+        "intra_op_threads": config["intra_op_threads"],
+        "load_seconds": load_seconds,
+        "rss_before_load_megabytes": rss_before_load,
+        "rss_after_load_megabytes": rss_after_load,
+        "rss_after_encode_megabytes": get_rss_megabytes(),
+        "single_query_p50_milliseconds": float(np.percentile(latencies, 50) * 1000),
+        "single_query_p99_milliseconds": float(np.percentile(latencies, 99) * 1000),
+        "vocabulary_size": len(known_ingredients),
+        "vocabulary_encode_seconds": vocabulary_encode_seconds,
+    }
+
+
+def run_benchmark(backends: list[str], thread_counts: list[int], model_name: str) -> list[dict]:
+    # A fresh process per configuration, torch keeps its thread pool and allocations for the life of the process
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for backend in backends:
+        for intra_op_threads in thread_counts:
+            config = {"backend": backend, "model_name": model_name, "intra_op_threads": intra_op_threads}
+            with context.Pool(1) as pool:
+                result = pool.apply(benchmark_backend, (config,))
+            results.append(result)
+            print(f"{result['backend']:>32} threads {intra_op_threads:>2}  load {result['load_seconds']:6.2f}s  "
+                  f"rss {result['rss_after_load_megabytes']:7.1f}MB  p50 {result['single_query_p50_milliseconds']:7.2f}ms  "
+                  f"p99 {result['single_query_p99_milliseconds']:7.2f}ms  vocabulary {result['vocabulary_encode_seconds']:6.2f}s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark encode latency and memory of the embedding backends")
+    parser.add_argument("--backends", nargs="+", default=list(EmbeddingBackendFactory.BACKEND_TYPES), choices=list(EmbeddingBackendFactory.BACKEND_TYPES))
+    parser.add_argument("--intra-op-threads", type=int, nargs="+", default=[0], help="0 keeps the torch default")
+    parser.add_argument("--model-name", default=SentenceTransformerBackend.DEFAULT_MODEL_NAME)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmark(args.backends, args.intra_op_threads, args.model_name)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(benchmark_results, f, indent=2)
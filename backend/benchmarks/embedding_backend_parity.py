@@ -0,0 +1,101 @@
+"""
+Checks that an embedding backend gives the same ingredient matches as the reference full precision sentence
+transformer on the known ingredients of baseline_ingredient_list.json.
+Every known ingredient and a set of typical parsed ingredient names are searched against the known ingredients with
+both backends. The check fails if any cosine score differs by more than the tolerance or a similarity threshold
+decision changes. Best matches that changed are listed for review.
+
+Run from the backend directory:
+    python -m benchmarks.embedding_backend_parity --backend dynamic_int8 --tolerance 0.02
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from recipe_manager.embedding_backends import EmbeddingBackendFactory, EmbeddingBackendInterface, SentenceTransformerBackend
+from recipe_manager.ingredient_normalizer import SentenceTransformerHandler
+
+BASELINE_INGREDIENT_FILE = Path(__file__).resolve().parents[1] / "tests" / "ingredient_testing" / "baseline_ingredient_list.json"
+DEFAULT_TOLERANCE = 0.02
+
+# Names as they come out of the ingredient parser, including ones that aren't known ingredients
+QUERY_INGREDIENTS = [
+    "mexican oregano", "light brown sugar", "cooking spray", "ground chuck", "flour", "chicken thigh", "pasta",
+    "chopped onion", "pesto", "grated parmesan cheese", "organic cucumber", "lean ground beef",
+    "frozen mixed vegetables", "lower-sodium beef broth", "green olives", "parmigiano reggiano",
+    "somerandomingredient sasdf", "boneless skinless chicken breasts", "fresh basil leaves", "kosher salt"
+]
+
+
+def load_known_ingredients(path: Path = BASELINE_INGREDIENT_FILE) -> list[str]:
+    with open(path, 'r') as f:
+        ingredients = json.load(f)
+    return [name for item in ingredients for name in [item["name"], *item.get("alias", [])]]
+
+
+def check_parity(reference: EmbeddingBackendInterface, candidate: EmbeddingBackendInterface, known_ingredients: list[str],
+                 queries: list[str], tolerance: float = DEFAULT_TOLERANCE) -> dict:
+    """
+    Compares the cosine scores of every query against every known ingredient under both backends.
+    :return: report with the largest score difference, best match and threshold agreement, and whether it passed
+    """
+    reference_scores, candidate_scores = [
+        backend.encode(queries) @ backend.encode(known_ingredients).T for backend in [reference, candidate]
+    ]
+    score_differences = np.abs(reference_scores - candidate_scores)
+    best_match_agreement = np.argmax(reference_scores, axis=1) == np.argmax(candidate_scores, axis=1)
+
+    threshold = SentenceTransformerHandler.COSINE_SIMILARITY_THRESHOLD
+    threshold_agreement = (reference_scores.max(axis=1) >= threshold) == (candidate_scores.max(axis=1) >= threshold)
+
+    worst_query = int(np.argmax(score_differences.max(axis=1)))
+    report = {
+        "reference": reference.name,
+        "candidate": candidate.name,
+        "number_of_queries": len(queries),
+        "number_of_known_ingredients": len(known_ingredients),
+        "tolerance": tolerance,
+        "max_score_difference": float(score_differences.max()),
+        "mean_score_difference": float(score_differences.mean()),
+        "worst_query": queries[worst_query],
+        "best_match_agreement": float(np.mean(best_match_agreement)),
+        "threshold_agreement": float(np.mean(threshold_agreement)),
+        "changed_best_matches": [
+            [queries[i], known_ingredients[np.argmax(reference_scores[i])], known_ingredients[np.argmax(candidate_scores[i])]]
+            for i in np.flatnonzero(~best_match_agreement)
+        ]
+    }
+    # Ties between aliases of one ingredient can swap the best match without changing the result, so only
+    # disagreements that matter are a score outside the tolerance or a flipped threshold decision
+    report["passed"] = report["max_score_difference"] <= tolerance and report["threshold_agreement"] == 1.0
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that an embedding backend matches the reference sentence transformer")
+    parser.add_argument("--backend", default="dynamic_int8", choices=list(EmbeddingBackendFactory.BACKEND_TYPES))
+    parser.add_argument("--model-name", default=SentenceTransformerBackend.DEFAULT_MODEL_NAME)
+    parser.add_argument("--intra-op-threads", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    known_ingredient_list = load_known_ingredients()
+    parity_report = check_parity(
+        SentenceTransformerBackend(args.model_name, args.intra_op_threads),
+        EmbeddingBackendFactory.create({"backend": args.backend, "model_name": args.model_name, "intra_op_threads": args.intra_op_threads}),
+        known_ingredient_list,
+        known_ingredient_list + QUERY_INGREDIENTS,
+        args.tolerance
+    )
+    print(json.dumps({key: value for key, value in parity_report.items() if key != "changed_best_matches"}, indent=2))
+    for query, reference_match, candidate_match in parity_report["changed_best_matches"]:
+        print(f"'{query}': '{reference_match}' -> '{candidate_match}'")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(parity_report, f, indent=2)
+    sys.exit(0 if parity_report["passed"] else 1)
@@ -0,0 +1,120 @@
+"""
+Compares the FAISS index types of FaissIndexConfig at several vocabulary sizes.
+Reports build time, index size, recall@1 against the exact flat index, agreement of the similarity threshold decision
+and p50/p99 single-query search latency.
+
+Run from the backend directory:
+    python -m benchmarks.faiss_index_benchmark --sizes 1000 10000 100000
+    python -m benchmarks.faiss_index_benchmark --embeddings recipe_manager/cache/embeddings/<key>.npy --output results.json
+
+Without --embeddings, vectors are drawn around random cluster centres, which resembles the neighbourhood structure of
+ingredient embeddings better than uniform noise. Queries are perturbed known vectors plus unrelated vectors.
+"""
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from recipe_manager.faiss_index import FaissIndexConfig
+from recipe_manager.ingredient_normalizer import SentenceTransformerHandler
+
+DIMENSION = 384  # all-MiniLM-L6-v2 embedding size
+NUMBER_OF_QUERIES = 500
+NOISE_SCALE = 0.5
+
+BENCHMARK_CONFIGS = {
+    "flat": {"index_type": "flat"},
+    "hnsw": {"index_type": "hnsw", "rerank_candidates": 32, "hnsw": {"m": 32, "ef_construction": 200, "ef_search": 128}},
+    "ivf": {"index_type": "ivf", "rerank_candidates": 32, "ivf": {"nlist": 0, "nprobe": 16}},
+    "sq": {"index_type": "sq", "rerank_candidates": 32, "sq": {"quantizer_type": "QT_8bit"}},
+    "pq": {"index_type": "pq", "rerank_candidates": 64, "pq": {"nlist": 0, "nprobe": 16, "m": 48, "nbits": 8}},
+}
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def generate_embeddings(number_of_vectors: int, rng: np.random.Generator) -> np.ndarray:
+    centres = rng.standard_normal((max(1, number_of_vectors // 20), DIMENSION))
+    assignments = rng.integers(0, len(centres), number_of_vectors)
+    return normalize(centres[assignments] + NOISE_SCALE * rng.standard_normal((number_of_vectors, DIMENSION)))
+
+
+def generate_queries(embeddings: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    close_queries = embeddings[rng.integers(0, len(embeddings), NUMBER_OF_QUERIES // 2)]
+    close_queries = close_queries + 0.3 * rng.standard_normal(close_queries.shape) / np.sqrt(embeddings.shape[1])
+    unrelated_queries = rng.standard_normal((NUMBER_OF_QUERIES - len(close_queries), embeddings.shape[1]))
+    return normalize(np.vstack([close_queries, unrelated_queries]))
+
+
+def benchmark_index(index_config: FaissIndexConfig, embeddings: np.ndarray, queries: np.ndarray, exact_results) -> dict:
+    start_time = time.perf_counter()
+    index = index_config.build_index(embeddings)
+    build_seconds = time.perf_counter() - start_time
+
+    latencies = []
+    top_scores = []
+    top_indices = []
+    for query in queries:
+        start_time = time.perf_counter()
+        scores, indices = index_config.search(index, embeddings, query[np.newaxis, :], 5)
+        latencies.append(time.perf_counter() - start_time)
+        top_scores.append(scores[0, 0])
+        top_indices.append(indices[0, 0])
+
+    exact_scores, exact_indices = exact_results
+    threshold = SentenceTransformerHandler.COSINE_SIMILARITY_THRESHOLD
+    return {
+        "index_type": index_config.index_type,
+        "built_index": type(index).__name__,  # Differs from the requested type when there were too few vectors to train it
+        "build_seconds": build_seconds,
+        "index_bytes": int(faiss.serialize_index(index).nbytes),
+        "recall_at_1": float(np.mean(np.array(top_indices) == exact_indices)),
+        "threshold_agreement": float(np.mean((np.array(top_scores) >= threshold) == (exact_scores >= threshold))),
+        "p50_milliseconds": float(np.percentile(latencies, 50) * 1000),
+        "p99_milliseconds": float(np.percentile(latencies, 99) * 1000),
+    }
+
+
+def run_benchmark(sizes: list[int], index_types: list[str], embeddings_path: str | None, seed: int) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    stored_embeddings = normalize(np.load(embeddings_path)) if embeddings_path else None
+
+    results = []
+    for size in sizes:
+        if stored_embeddings is not None:
+            embeddings = stored_embeddings[rng.permutation(len(stored_embeddings))[:size]]
+        else:
+            embeddings = generate_embeddings(size, rng)
+        queries = generate_queries(embeddings, rng)
+
+        flat_config = FaissIndexConfig()
+        exact_scores, exact_indices = flat_config.search(flat_config.build_index(embeddings), embeddings, queries, 1)
+        exact_results = (exact_scores[:, 0], exact_indices[:, 0])
+
+        for index_type in index_types:
+            result = benchmark_index(FaissIndexConfig(BENCHMARK_CONFIGS[index_type]), embeddings, queries, exact_results)
+            result["vocabulary_size"] = len(embeddings)
+            results.append(result)
+            print(f"{len(embeddings):>8} {index_type:>5} ({result['built_index']})  build {result['build_seconds']:7.2f}s  size {result['index_bytes'] / 1e6:8.1f}MB  "
+                  f"recall@1 {result['recall_at_1']:.3f}  threshold agreement {result['threshold_agreement']:.3f}  "
+                  f"p50 {result['p50_milliseconds']:.3f}ms  p99 {result['p99_milliseconds']:.3f}ms")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types for ingredient matching")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--index-types", nargs="+", default=list(BENCHMARK_CONFIGS), choices=list(BENCHMARK_CONFIGS))
+    parser.add_argument("--embeddings", help="stored .npy embedding matrix to sample from instead of synthetic vectors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmark(args.sizes, args.index_types, args.embeddings, args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(benchmark_results, f, indent=2)
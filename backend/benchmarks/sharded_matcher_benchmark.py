@@ -0,0 +1,96 @@
+"""
+Measures how ShardedRecipeMatcher query latency scales with the number of shard processes on a synthetic corpus.
+Reports load time, p50/p99/mean latency of get_ingredient_set_difference and get_ranked_recipes, the speedup over a
+single shard and the parallel efficiency (speedup / shard count). The in-process RecipeMatcher is included as the
+unsharded reference, and every sharded result is checked against it.
+
+Run from the backend directory:
+    python -m benchmarks.sharded_matcher_benchmark --corpus-size 1000000 --shard-counts 1 2 4 8
+    python -m benchmarks.sharded_matcher_benchmark --corpus-size 200000 --output results.json
+
+Scaling is only near-linear up to the number of idle cores, pass shard counts no larger than os.cpu_count().
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.benchmark_suite import generate_pantries, generate_recipes, summarize_latencies, time_calls
+from recipe_manager.recipe_matcher import RecipeMatcher
+from recipe_manager.sharded_matcher import ShardedRecipeMatcher
+from tests.ingredient_testing.raw_json_ingredient_reader import RawJsonIngredientReader
+
+RANKED_BUDGET = 3
+RANKED_PAGE_SIZE = 10
+
+
+def benchmark_matcher(recipe_matcher, pantries: list[list[str]]) -> dict:
+    difference_latencies = time_calls(recipe_matcher.get_ingredient_set_difference, [(pantry, RANKED_PAGE_SIZE) for pantry in pantries])
+    ranked_latencies = time_calls(recipe_matcher.get_ranked_recipes, [(pantry, RANKED_BUDGET, RANKED_PAGE_SIZE) for pantry in pantries])
+    return {
+        **summarize_latencies(difference_latencies, "difference_"),
+        **summarize_latencies(ranked_latencies, "ranked_"),
+        "difference_queries_per_second": len(pantries) / sum(difference_latencies),
+    }
+
+
+def check_parity(reference_matcher: RecipeMatcher, sharded_matcher: ShardedRecipeMatcher, pantries: list[list[str]]):
+    for pantry in pantries:
+        expected = reference_matcher.get_ingredient_set_difference(pantry, RANKED_PAGE_SIZE)
+        if sharded_matcher.get_ingredient_set_difference(pantry, RANKED_PAGE_SIZE) != expected:
+            raise RuntimeError(f"Sharded results differ from the in-process matcher for pantry {pantry}")
+
+
+def run_benchmark(corpus_size: int, shard_counts: list[int], number_of_queries: int, seed: int) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    ingredient_names = [ingredient["name"] for ingredient in RawJsonIngredientReader().get_all_ingredients()]
+    recipes = generate_recipes(corpus_size, ingredient_names, rng)
+    pantries = generate_pantries(number_of_queries, ingredient_names, rng)
+
+    start_time = time.perf_counter()
+    reference_matcher = RecipeMatcher(recipes)
+    reference_result = {"shard_count": 0, "load_seconds": time.perf_counter() - start_time, **benchmark_matcher(reference_matcher, pantries)}
+    print(f"in-process  load {reference_result['load_seconds']:6.2f}s  difference p50 {reference_result['difference_p50_milliseconds']:8.2f}ms")
+
+    results = [reference_result]
+    single_shard_mean = None
+    for shard_count in shard_counts:
+        start_time = time.perf_counter()
+        sharded_matcher = ShardedRecipeMatcher(recipes, shard_count)
+        load_seconds = time.perf_counter() - start_time
+        try:
+            check_parity(reference_matcher, sharded_matcher, pantries[:20])
+            result = {"shard_count": shard_count, "load_seconds": load_seconds, **benchmark_matcher(sharded_matcher, pantries)}
+        finally:
+            sharded_matcher.close()
+
+        if single_shard_mean is None:
+            single_shard_mean = result["difference_mean_milliseconds"]
+        result["speedup"] = single_shard_mean / result["difference_mean_milliseconds"]
+        result["parallel_efficiency"] = result["speedup"] / shard_count if shard_counts[0] == 1 else None
+        results.append(result)
+        print(f"{shard_count:>3} shards  load {load_seconds:6.2f}s  difference p50 {result['difference_p50_milliseconds']:8.2f}ms  "
+              f"p99 {result['difference_p99_milliseconds']:8.2f}ms  ranked p50 {result['ranked_p50_milliseconds']:8.2f}ms  "
+              f"speedup {result['speedup']:.2f}x")
+
+    for result in results:
+        result["corpus_size"] = corpus_size
+        result["cpu_count"] = os.cpu_count()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sharded recipe matching against shard count")
+    parser.add_argument("--corpus-size", type=int, default=1_000_000)
+    parser.add_argument("--shard-counts", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmark(args.corpus_size, sorted(args.shard_counts), args.queries, args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(benchmark_results, f, indent=2)
@@ -1,13 +1,118 @@
-from fastapi import FastAPI, Request
+import asyncio
+import gc
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request, Response
 import logging_config, logging
-import recipe_manager
 import json
 from fastapi.middleware.cors import CORSMiddleware
-from recipe_manager.mongodb_driver import DatabaseDriver
+from recipe_manager.async_mongodb_driver import AsyncDatabaseDriver
+from recipe_manager.cpu_executor import BoundedCPUExecutor, ExecutorSaturatedError
+from recipe_manager.ingredient_normalizer import IngredientNormalizer, preload_heavy_dependencies
+from recipe_manager.metrics import REGISTRY
+from recipe_manager.recipe_managers import RecipeManager
+from recipe_manager.sharded_matcher import ShardedRecipeMatcher
+
+# Import the heavy ML dependencies in a background thread at startup instead of on the first request
+BACKGROUND_WARMUP = os.getenv("RECIPE_APP_BACKGROUND_WARMUP", "1") == "1"
+
+# Load the ingredient normalizer when the module is imported, before a pre-forking server (gunicorn --preload) starts
+# its workers, so every worker shares the model weights and the index copy-on-write instead of loading its own copy
+PRELOAD = os.getenv("RECIPE_APP_PRELOAD", "0") == "1"
+
+# Size of the executor running normalization and matching, and how many calls may wait on it before requests are rejected
+CPU_EXECUTOR_WORKERS = int(os.getenv("RECIPE_APP_CPU_WORKERS", BoundedCPUExecutor.DEFAULT_MAX_WORKERS))
+CPU_EXECUTOR_QUEUE_DEPTH = int(os.getenv("RECIPE_APP_CPU_QUEUE_DEPTH", BoundedCPUExecutor.DEFAULT_MAX_QUEUE_DEPTH))
+
+# Directory of a recipe snapshot exported with python -m recipe_manager.recipe_snapshot. If set, every worker maps the
+# same snapshot instead of loading the recipe collection from MongoDB on startup
+RECIPE_SNAPSHOT_DIRECTORY = os.getenv("RECIPE_APP_RECIPE_SNAPSHOT") or None
+
+# How recipes are matched, see RecipeManager.QUERY_MODES, and the number of matcher processes in the sharded mode
+QUERY_MODE = os.getenv("RECIPE_APP_QUERY_MODE", RecipeManager.IN_PROCESS_QUERY_MODE)
+MATCHER_SHARDS = int(os.getenv("RECIPE_APP_MATCHER_SHARDS", ShardedRecipeMatcher.DEFAULT_SHARD_COUNT))
 
-app = FastAPI()
 logger = logging.getLogger(__name__)
 
+database_driver = None
+recipe_manager = None
+preloaded_ingredient_normalizer = None
+
+# End-to-end latency and outcome of each request, per route template so path parameters don't explode the label set
+REQUEST_SECONDS = REGISTRY.histogram("http_request_seconds", "Time spent handling a request", ["route"])
+REQUESTS = REGISTRY.counter("http_requests_total", "Requests handled", ["route", "status"])
+
+# Set once the warm-up query has run, /ready reports not ready until then
+is_ready = False
+
+
+def preload_ingredient_normalizer() -> IngredientNormalizer:
+    """
+    Builds the ingredient normalizer and loads the parser, model and index in the importing (parent) process.
+    Database clients, threads and the first inference are left to each worker since none of them survive a fork safely.
+    """
+    ingredient_normalizer = RecipeManager.build_ingredient_normalizer()
+    ingredient_normalizer.preload()
+
+    # Move everything loaded so far out of the collector's generations, otherwise the first collection in each worker
+    # writes to every object header and un-shares the pages
+    gc.collect()
+    gc.freeze()
+    logger.info("Preloaded ingredient normalizer before forking workers")
+    return ingredient_normalizer
+
+
+if PRELOAD:
+    preloaded_ingredient_normalizer = preload_ingredient_normalizer()
+
+
+async def warm_up_recipe_manager():
+    global is_ready
+    try:
+        await recipe_manager.warm_up_async()
+    except Exception as e:
+        # Still serve traffic, the first requests will just pay the loading cost
+        logger.error(f"Warm-up query failed: {e}")
+    is_ready = True
+    logger.info("Recipe manager warmed up, ready for traffic")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global database_driver, recipe_manager, is_ready
+    if BACKGROUND_WARMUP and not PRELOAD:
+        threading.Thread(target=preload_heavy_dependencies, name="warmup", daemon=True).start()
+
+    database_driver = AsyncDatabaseDriver()
+    await database_driver.connect()
+    try:
+        # Ranked queries filter on ingredient_count, recipes inserted before it was stored at insert time need it set
+        await database_driver.backfill_ingredient_counts()
+    except Exception as e:
+        # Recipes without the count are still matched, the ranked pipeline computes it for them
+        logger.error(f"Backfilling ingredient counts failed: {e}")
+
+    cpu_executor = BoundedCPUExecutor(CPU_EXECUTOR_WORKERS, CPU_EXECUTOR_QUEUE_DEPTH)
+    # Loading the vocabulary and the recipes blocks, build the manager off the event loop
+    recipe_manager = await asyncio.to_thread(RecipeManager, query_mode=QUERY_MODE, cpu_executor=cpu_executor, async_database_driver=database_driver,
+                                             ingredient_normalizer=preloaded_ingredient_normalizer,
+                                             recipe_snapshot_directory=RECIPE_SNAPSHOT_DIRECTORY, shard_count=MATCHER_SHARDS)
+
+    # Warm up in the background so /ready can be polled while it runs
+    warm_up_task = asyncio.create_task(warm_up_recipe_manager())
+    yield
+
+    is_ready = False
+    warm_up_task.cancel()
+    recipe_manager.close()
+    await database_driver.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=['*'],  # Allow only your React app
@@ -16,7 +121,40 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-database_driver = DatabaseDriver()
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start_time = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = route.path if route is not None else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - start_time, route=route_path)
+        REQUESTS.increment(route=route_path, status=status)
+
+
+# Per-stage latencies and counts in the Prometheus text format
+@app.get('/metrics')
+async def metrics():
+    return Response(REGISTRY.render(), media_type=REGISTRY.CONTENT_TYPE)
+
+
+# Readiness probe, only succeeds once the warm-up query has run
+@app.get('/ready')
+async def ready():
+    if not is_ready:
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"ready": True}
+
+
+# Hit ratio and saved latency of the response and normalization caches, used to size them
+@app.get('/cache_statistics')
+async def cache_statistics():
+    return recipe_manager.get_cache_statistics()
+
 
 # Route to handle GET requests for "get_recipes"
 @app.get('/get_recipes')
@@ -30,14 +168,78 @@ async def set_pantry_essentials(request: Request):
     # Get JSON data from the request body
     ingredient_data = await request.json()
 
-    database_driver.insert_pantry_essentials(ingredient_data)
+    try:
+        await recipe_manager.set_pantry_essentials_async(ingredient_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     return "Setting pantry essentials..."
 
 
+# Route to handle POST requests for "add_ingredients", adds ingredients to the running normalizers without a restart
+@app.post('/add_ingredients')
+async def add_ingredients(request: Request):
+    addition_request = await request.json()
+
+    try:
+        added_strings = await recipe_manager.add_ingredients_async(addition_request["ingredients"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"added": added_strings}
+
+
+# Route to handle POST requests for "add_ingredient_aliases", adds aliases of a known ingredient
+@app.post('/add_ingredient_aliases')
+async def add_ingredient_aliases(request: Request):
+    addition_request = await request.json()
+
+    try:
+        added_strings = await recipe_manager.add_ingredient_aliases_async(addition_request["name"], addition_request["alias"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"added": added_strings}
+
+
 # Route to handle GET requests for "get_recipe_links"
 @app.get('/get_recipe_links')
 async def get_recipe_links(request: Request):
     request_object = await request.json()
 
-    matching_recipe = recipe_manager.find_similar_recipe(request_object)
+    try:
+        matching_recipe = await recipe_manager.find_similar_recipe_async(request_object)
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     return json.dumps(matching_recipe)
+
+
+# Route to handle GET requests for "get_ranked_recipe_links"
+@app.get('/get_ranked_recipe_links')
+async def get_ranked_recipe_links(request: Request):
+    request_object = await request.json()
+
+    try:
+        matching_recipes = await recipe_manager.find_similar_recipes_async(request_object)
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json.dumps(matching_recipes)
+
+
+# Route to handle POST requests for "get_ranked_recipe_links_batch", ranks recipes for many pantries in one request
+@app.post('/get_ranked_recipe_links_batch')
+async def get_ranked_recipe_links_batch(request: Request):
+    batch_request = await request.json()
+
+    try:
+        matching_recipes = await recipe_manager.find_similar_recipes_batch_async(batch_request)
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json.dumps(matching_recipes)
@@ -0,0 +1,227 @@
+import logging_config, logging
+from bson import ObjectId
+from pymongo import AsyncMongoClient, ReturnDocument
+from pymongo.errors import BulkWriteError
+from pymongo.server_api import ServerApi
+
+from recipe_manager.mongodb_driver import CORPUS_VERSION_CONFIG_ITEM, PANTRY_ESSENTIALS_CONFIG_ITEM, DatabaseCommandMetrics, DatabaseDriver
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabaseDriver:
+    """
+    Asyncio variant of DatabaseDriver for the request handler, exposing the same methods as coroutines so database
+    round-trips don't block the event loop. Aggregation pipelines and insert reports are shared with DatabaseDriver.
+    The client doesn't do any I/O until the first operation, call connect() once from the event loop to create the
+    recipe collection indexes and check the connection.
+    """
+    def __init__(self, client: AsyncMongoClient | None = None):
+        # Load Config file
+        config_data = DatabaseDriver.load_mongo_config()
+
+        if client is None:
+            client = AsyncMongoClient(DatabaseDriver.get_cloud_connection_uri(), server_api=ServerApi('1'), event_listeners=[DatabaseCommandMetrics()])
+        self.client = client
+        self.db = self.client[config_data["database-name"]]
+
+        # Get all collections
+        self.config_collection_name = config_data["config-collection-name"]
+        self.recipe_list_collection_name = config_data["recipe-list-collection-name"]
+        self.normalized_ingredients_name = config_data["normalized_ingredients_name"]
+
+        # Set up all collection objects
+        self.config_collection = self.db[self.config_collection_name]
+        self.recipe_collection = self.db[self.recipe_list_collection_name]
+        self.normalized_ingredients_collection = self.db[self.normalized_ingredients_name]
+
+        # Callbacks notified with the list of recipes that were actually inserted by insert_recipe_list
+        self.recipe_insert_listeners = []
+
+        # Last known version of the recipe corpus, used to invalidate cached query results
+        self.corpus_version = 0
+
+    async def connect(self):
+        try:
+            await self.client.admin.command('ping')
+            if self.recipe_list_collection_name not in await self.db.list_collection_names():
+                logger.info(f"Collection {self.recipe_list_collection_name} does not exist, creating with unique index")
+                await self.recipe_collection.create_index("source_url", unique=True)
+
+            # Indexes added after the collection was created, creating an index that already exists is a no-op
+            await self.recipe_collection.create_index("ingredients")
+            await self.recipe_collection.create_index("ingredient_count")
+            await self.get_corpus_version()
+            logger.debug("Successfully connected to MongoDB Cluster")
+        except Exception as e:
+            error_msg = f"MongoDB Error: {str(e)}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+    async def close(self):
+        await self.client.close()
+
+    async def insert_recipe_list(self, recipe_list) -> dict:
+        """
+        Inserts the recipes, skipping any recipe whose source URL already exists
+        :param recipe_list: list of recipe dicts to insert
+        :return: insertion report, see DatabaseDriver.insert_recipe_list
+        """
+        recipe_documents = DatabaseDriver.prepare_recipes_for_insert(recipe_list)
+
+        inserted_recipes = []
+        duplicate_indexes = set()
+        failed_indexes = set()
+        try:
+            # Insert entire provided recipe list, not inserting any duplicate entries (ordered=False)
+            await self.recipe_collection.insert_many(recipe_documents, ordered=False)
+            inserted_recipes = recipe_list
+        except BulkWriteError as bwe:
+            duplicate_indexes, failed_indexes = DatabaseDriver.get_bulk_write_error_indexes(bwe)
+            inserted_recipes = [recipe for index, recipe in enumerate(recipe_list) if index not in duplicate_indexes | failed_indexes]
+        except Exception as e:
+            # Print the type of the exception and the exception message
+            logger.error(f"Exception type: {type(e)}")
+            logger.error(f"Exception message: {e}")
+            failed_indexes = set(range(len(recipe_list)))
+
+        insert_report = DatabaseDriver.build_insert_report(recipe_list, inserted_recipes, duplicate_indexes, failed_indexes)
+
+        if inserted_recipes:
+            await self.increment_corpus_version()
+            for listener in self.recipe_insert_listeners:
+                listener(inserted_recipes)
+
+        return insert_report
+
+    async def increment_corpus_version(self) -> int:
+        """See DatabaseDriver.increment_corpus_version"""
+        try:
+            corpus_version_item = await self.config_collection.find_one_and_update(
+                {"config_item": CORPUS_VERSION_CONFIG_ITEM},
+                {"$inc": {"version": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            self.corpus_version = corpus_version_item["version"]
+        except Exception as e:
+            logger.error(f"Exception message: {e}")
+            self.corpus_version += 1
+        return self.corpus_version
+
+    async def get_corpus_version(self) -> int:
+        """See DatabaseDriver.get_corpus_version"""
+        try:
+            corpus_version_item = await self.config_collection.find_one({"config_item": CORPUS_VERSION_CONFIG_ITEM})
+            if corpus_version_item is not None:
+                self.corpus_version = corpus_version_item["version"]
+        except Exception as e:
+            logger.error(f"Exception message: {e}")
+        return self.corpus_version
+
+    def add_recipe_insert_listener(self, listener):
+        """
+        Registers a callback that is called with the list of newly inserted recipes after each insert_recipe_list call
+        :param listener: callable taking a list of recipe dicts
+        """
+        self.recipe_insert_listeners.append(listener)
+
+    async def get_all_recipes(self, projection: dict | None = None) -> list[dict]:
+        return await self.recipe_collection.find({}, projection).to_list()
+
+    async def get_recipes_inserted_after(self, recipe_id: ObjectId | None, projection: dict | None = None) -> list[dict]:
+        """See DatabaseDriver.get_recipes_inserted_after"""
+        return await self.recipe_collection.find(DatabaseDriver.build_recipes_inserted_after_filter(recipe_id), projection).to_list()
+
+    async def insert_pantry_essentials(self, ingredient_list: dict) -> dict | None:
+        return await self.insert_config_item(PANTRY_ESSENTIALS_CONFIG_ITEM, ingredient_list)
+
+    async def get_pantry_essentials(self):
+        return await self.get_config_item(PANTRY_ESSENTIALS_CONFIG_ITEM)
+
+    async def get_config_item(self, item_name: str) -> dict | None:
+        try:
+            return await self.config_collection.find_one({"config_item": item_name})
+        except Exception as e:
+            logger.error(f"Exception occurred: {e}")
+
+    async def get_config_item_version(self, item_name: str) -> int | None:
+        """See DatabaseDriver.get_config_item_version"""
+        config_item = await self.config_collection.find_one({"config_item": item_name}, {"version": 1})
+        return None if config_item is None else config_item.get("version", 0)
+
+    async def get_normalized_ingredients(self):
+        try:
+            return await self.normalized_ingredients_collection.find().to_list()
+        except Exception as e:
+            logger.error(f"Exception message: {e}")
+
+    async def insert_normalized_ingredient(self, new_normalized_ingredient_name):
+        new_normalized_ingredient = {
+            "normalized_name": new_normalized_ingredient_name,
+            "alias": []
+        }
+
+        await self.normalized_ingredients_collection.insert_one(new_normalized_ingredient)
+
+    async def insert_config_item(self, item_name: str, dict_to_insert: dict) -> dict | None:
+        """See DatabaseDriver.insert_config_item"""
+        if type(dict_to_insert) is not dict:
+            raise TypeError(f"Expected parameter to be of type 'dict' but got {type(dict_to_insert).__name__}")
+
+        try:
+            config_item = await self.config_collection.find_one_and_update(
+                {"config_item": item_name},
+                DatabaseDriver.build_config_item_update(dict_to_insert),
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            logger.info(f"Stored config item '{item_name}' version {config_item['version']}")
+            return config_item
+        except Exception as e:
+            logger.error(f"Exception message: {e}")
+
+    async def append_to_config_item(self, item_name: str, field: str, values: list) -> dict | None:
+        """See DatabaseDriver.append_to_config_item"""
+        try:
+            config_item = await self.config_collection.find_one_and_update(
+                {"config_item": item_name},
+                {"$push": {field: {"$each": values}}, "$inc": {"version": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            logger.info(f"Appended {len(values)} values to config item '{item_name}' version {config_item['version']}")
+            return config_item
+        except Exception as e:
+            logger.error(f"Exception message: {e}")
+
+    async def get_ingredient_set_difference(self, ingredient_list: list[str]):
+        cursor = await self.recipe_collection.aggregate(DatabaseDriver.build_ingredient_set_difference_pipeline(ingredient_list))
+        return await cursor.to_list()
+
+    async def get_ranked_recipes(self, ingredient_list: list[str], num_missing_ingredients_allowed: int, number_of_recipes: int, page: int = 0):
+        """See DatabaseDriver.get_ranked_recipes"""
+        pipeline = DatabaseDriver.build_ranked_recipes_pipeline(ingredient_list, num_missing_ingredients_allowed, number_of_recipes, page)
+        cursor = await self.recipe_collection.aggregate(pipeline)
+        return await cursor.to_list()
+
+    async def backfill_ingredient_counts(self):
+        """Sets ingredient_count on recipes inserted before it was precomputed at insert time"""
+        result = await self.recipe_collection.update_many(
+            {"ingredient_count": {"$exists": False}},
+            [{"$set": {"ingredient_count": {"$size": {"$setUnion": ["$ingredients", []]}}}}]
+        )
+        logger.info(f"Backfilled ingredient_count on {result.modified_count} recipes")
+
+    async def recipe_already_in_db(self, url_to_check: str) -> bool:
+        """Checks if item already exists in database by comparing the URL."""
+        return await self.recipe_collection.find_one({"source_url": url_to_check}) is not None
+
+    async def get_existing_source_urls(self, urls_to_check: list[str]) -> set[str]:
+        """See DatabaseDriver.get_existing_source_urls"""
+        if not urls_to_check:
+            return set()
+
+        cursor = self.recipe_collection.find({"source_url": {"$in": list(set(urls_to_check))}}, {"source_url": 1, "_id": 0})
+        return {recipe["source_url"] async for recipe in cursor}
@@ -0,0 +1,161 @@
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import logging_config, logging
+from recipe_manager.metrics import REGISTRY
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+AUDIT_RECORDS = REGISTRY.counter("audit_log_records_total", "Audit records by outcome: written, sampled out or dropped on a full queue", ["log", "outcome"])
+
+# Fraction of records kept once the queue is filling up, 1 keeps everything that fits
+AUDIT_SAMPLE_RATE = float(os.getenv("RECIPE_APP_AUDIT_SAMPLE_RATE", "1.0"))
+
+
+class AuditLogWriter:
+    """
+    Appends structured records (one JSON object per line) to a log file from a background thread.
+    write only puts the record on an in-memory queue, the writer thread drains it in batches with one open and write
+    per batch, and rotates the file to <name>.1 ... <name>.<backup_count> once it grows past max_bytes.
+    Existing files are appended to, nothing is deleted on restart apart from the oldest backup on rotation.
+
+    Under load, once the queue holds more than sampling_queue_depth records, only sample_rate of new records are kept.
+    If the queue is full, records are dropped instead of blocking the caller. Both are counted in audit_log_records_total.
+    """
+    DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+    DEFAULT_BACKUP_COUNT = 5
+    DEFAULT_MAX_QUEUE_SIZE = 10000
+    BATCH_SIZE = 256  # Maximum number of records written per file open
+    FLUSH_INTERVAL_SECONDS = 1.0  # Longest a record waits for a batch to fill up
+
+    def __init__(self, path: Path | str, max_bytes: int = DEFAULT_MAX_BYTES, backup_count: int = DEFAULT_BACKUP_COUNT,
+                 max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE, sample_rate: float = AUDIT_SAMPLE_RATE,
+                 sampling_queue_depth: int | None = None):
+        """
+        :param path: log file, relative paths are resolved against the working directory when the first batch is written
+        :param max_bytes: size after which the file is rotated, 0 to never rotate
+        :param backup_count: number of rotated files kept
+        :param max_queue_size: records held in memory before new ones are dropped
+        :param sample_rate: fraction of records kept while the queue is deeper than sampling_queue_depth
+        :param sampling_queue_depth: queue depth where sampling starts, half of max_queue_size if None
+        """
+        if max_queue_size <= 0 or not 0 <= sample_rate <= 1:
+            raise ValueError(f"Invalid audit log settings: max_queue_size={max_queue_size}, sample_rate={sample_rate}")
+
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.sample_rate = sample_rate
+        self.sampling_queue_depth = sampling_queue_depth if sampling_queue_depth is not None else max_queue_size // 2
+        self.label = self.path.stem
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+
+    def write(self, event: str, **fields) -> bool:
+        """
+        Queues one record, the only cost paid by the caller
+        :return: True if the record was queued, False if it was sampled out or dropped
+        """
+        if self._closed:
+            return False
+
+        if self.sample_rate < 1 and self._queue.qsize() >= self.sampling_queue_depth and random.random() >= self.sample_rate:
+            AUDIT_RECORDS.increment(log=self.label, outcome="sampled_out")
+            return False
+
+        self._ensure_writer_thread()
+        try:
+            self._queue.put_nowait({"timestamp": time.time(), "event": event, **fields})
+        except queue.Full:
+            AUDIT_RECORDS.increment(log=self.label, outcome="dropped")
+            return False
+        return True
+
+    def flush(self):
+        """Blocks until every queued record has been written"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Writes the remaining records and stops the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _ensure_writer_thread(self):
+        # Started on first use, and again in a forked worker since the parent's thread doesn't survive the fork
+        if self._thread_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name=f"audit_log_{self.label}", daemon=True)
+            self._thread.start()
+            self._thread_pid = os.getpid()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            try:
+                records = [self._queue.get(timeout=AuditLogWriter.FLUSH_INTERVAL_SECONDS)]
+            except queue.Empty:
+                continue
+
+            while len(records) < AuditLogWriter.BATCH_SIZE:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if records[-1] is None:
+                stop = True
+            batch = [record for record in records if record is not None]
+            try:
+                if batch:
+                    self._write_batch(batch)
+            except Exception as e:
+                # Never let a full disk or a bad record kill the writer, the records of the batch are lost
+                logger.error(f"Failed to write {len(batch)} records to {self.path}: {e}")
+            finally:
+                for _ in records:
+                    self._queue.task_done()
+
+    def _write_batch(self, records: List[dict]):
+        lines = "".join(json.dumps(record, default=str) + "\n" for record in records)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            size = f.tell()
+        AUDIT_RECORDS.increment(len(records), log=self.label, outcome="written")
+
+        if self.max_bytes and size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            self.path.unlink(missing_ok=True)
+            return
+
+        for backup_number in range(self.backup_count - 1, 0, -1):
+            backup_path = self.get_backup_path(backup_number)
+            if backup_path.exists():
+                backup_path.replace(self.get_backup_path(backup_number + 1))
+        self.path.replace(self.get_backup_path(1))
+
+    def get_backup_path(self, backup_number: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{backup_number}")
@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+import logging_config, logging
+from recipe_manager.mongodb_driver import DatabaseDriver
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+class ConfigCache:
+    """
+    In-process copy of config items such as the pantry essentials, so requests don't read the config collection.
+    Every config write increments the item's version stamp (see DatabaseDriver.insert_config_item). A cached item is
+    trusted for refresh_seconds, then only its version is read and the full item is fetched again when it changed.
+    Writes made through this process are stored with put, so they are visible immediately rather than after a refresh.
+    Values derived from an item, e.g. normalized ingredient names, are cached alongside it with get_derived.
+    """
+    DEFAULT_REFRESH_SECONDS = 5.0
+
+    def __init__(self, database_driver: DatabaseDriver, refresh_seconds: float = DEFAULT_REFRESH_SECONDS):
+        self.database_driver = database_driver
+        self.refresh_seconds = refresh_seconds
+
+        self._items: Dict[str, Tuple[dict | None, float]] = {}  # Item name -> (config item or None, time checked)
+        self._derived: Dict[str, Tuple[int | None, Any]] = {}  # Item name -> (version derived from, derived value)
+        self._lock = threading.Lock()
+
+    def get(self, item_name: str) -> dict | None:
+        """Returns the config item, None if it doesn't exist. The stored version is checked every refresh_seconds."""
+        with self._lock:
+            cached = self._items.get(item_name)
+        if cached is not None and time.monotonic() - cached[1] < self.refresh_seconds:
+            return cached[0]
+
+        config_item = cached[0] if cached is not None else None
+        try:
+            if cached is None or self.database_driver.get_config_item_version(item_name) != self.get_version(config_item):
+                config_item = self.database_driver.get_config_item(item_name)
+                logger.info(f"Config item '{item_name}' refreshed to version {self.get_version(config_item)}")
+        except Exception as e:
+            # Keep serving the cached copy, the check is retried after the next refresh interval
+            logger.error(f"Failed to refresh config item '{item_name}': {e}")
+
+        self.put(item_name, config_item)
+        return config_item
+
+    def get_derived(self, item_name: str, derive: Callable[[dict | None], Any]) -> Any:
+        """
+        Returns derive(config item), computed once per version of the item
+        :param derive: called with the config item, or None if it doesn't exist
+        """
+        config_item = self.get(item_name)
+        version = self.get_version(config_item)
+        with self._lock:
+            derived = self._derived.get(item_name)
+        if derived is not None and derived[0] == version:
+            return derived[1]
+
+        # Derived outside the lock, it may be slow. Only kept if no newer version was cached meanwhile
+        derived_value = derive(config_item)
+        with self._lock:
+            cached = self._items.get(item_name)
+            if cached is not None and self.get_version(cached[0]) == version:
+                self._derived[item_name] = (version, derived_value)
+        return derived_value
+
+    def put(self, item_name: str, config_item: dict | None):
+        """Stores a config item this process just wrote, as returned by insert_config_item"""
+        with self._lock:
+            self._items[item_name] = (config_item, time.monotonic())
+
+    @staticmethod
+    def get_version(config_item: dict | None) -> int | None:
+        """Version stamp of a config item, matching DatabaseDriver.get_config_item_version"""
+        return None if config_item is None else config_item.get("version", 0)
@@ -0,0 +1,73 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import logging_config, logging
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when a call is submitted while the executor already holds its maximum number of pending calls"""
+
+
+class BoundedCPUExecutor:
+    """
+    Runs CPU-bound work (ingredient parsing, embedding and matching) off the event loop on a dedicated thread pool.
+    Threads are used instead of processes so every worker shares the loaded model and FAISS index, torch and FAISS
+    release the GIL while they compute. The number of queued plus running calls is bounded so a burst of requests is
+    rejected with an ExecutorSaturatedError instead of building an unbounded backlog behind the model.
+    """
+    DEFAULT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+    DEFAULT_MAX_QUEUE_DEPTH = 64
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, max_queue_depth: int = DEFAULT_MAX_QUEUE_DEPTH):
+        if max_workers <= 0 or max_queue_depth <= 0:
+            raise ValueError(f"Invalid executor size: max_workers={max_workers}, max_queue_depth={max_queue_depth}")
+
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cpu_executor")
+
+        self.pending = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Runs function(*args, **kwargs) on the executor and waits for it without blocking the event loop
+        :return: return value of function
+        """
+        with self._lock:
+            if self.pending >= self.max_queue_depth:
+                self.rejected += 1
+                raise ExecutorSaturatedError(f"CPU executor queue is full ({self.max_queue_depth} pending calls)")
+            self.pending += 1
+
+        # Release the slot when the call finishes rather than when the caller stops waiting, a cancelled request
+        # still occupies a worker until its call returns
+        try:
+            future = self.executor.submit(functools.partial(function, *args, **kwargs))
+        except RuntimeError:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+
+    def get_statistics(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue_depth": self.max_queue_depth,
+            "pending": self.pending,
+            "rejected": self.rejected
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
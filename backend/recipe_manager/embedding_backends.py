@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import logging_config, logging
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+# sentence_transformers and torch are imported on first use, like in ingredient_normalizer
+
+
+class EmbeddingBackendInterface(ABC):
+    """
+    Encodes ingredient strings into L2 normalized float32 embeddings for SentenceTransformerHandler.
+    Embeddings of different backends aren't interchangeable, so the name is part of the embedding store key and the
+    normalization cache version.
+    """
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Identifies the model and any transformation of it that changes its embeddings"""
+        pass
+
+    @abstractmethod
+    def load(self):
+        """Loads the model, called once before the first encode. Must be safe to call more than once"""
+        pass
+
+    @abstractmethod
+    def encode(self, strings: List[str]) -> np.ndarray:
+        """
+        :param strings: strings to encode
+        :return: float32 matrix with one L2 normalized embedding per string
+        """
+        pass
+
+
+class SentenceTransformerBackend(EmbeddingBackendInterface):
+    """Full precision PyTorch sentence transformer, the reference backend"""
+    DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, intra_op_threads: int = 0):
+        """
+        :param intra_op_threads: number of threads torch uses for a single encode, 0 to keep the torch default
+        """
+        self.model_name = model_name
+        self.intra_op_threads = intra_op_threads
+        self._model = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.model_name
+
+    def load(self):
+        with self._load_lock:
+            if self._model is None:
+                import torch
+                from sentence_transformers import SentenceTransformer
+
+                if self.intra_op_threads > 0:
+                    torch.set_num_threads(self.intra_op_threads)
+
+                start = time.perf_counter()
+                self._model = self.prepare_model(SentenceTransformer(self.model_name, device="cpu"))
+                logger.info(f"Loaded embedding backend '{self.name}' in {time.perf_counter() - start:.2f}s")
+
+    def prepare_model(self, model):
+        """Hook for subclasses to transform the loaded model"""
+        return model
+
+    def encode(self, strings: List[str]) -> np.ndarray:
+        if self._model is None:
+            self.load()
+
+        return self._model.encode(
+            strings,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ).astype("float32")
+
+
+class QuantizedSentenceTransformerBackend(SentenceTransformerBackend):
+    """
+    The same sentence transformer with its Linear layers dynamically quantized to int8, for CPU-only hosts.
+    Weights are stored as int8 and activations are quantized on the fly, which makes encoding faster and the model
+    smaller at the cost of slightly different embeddings, see benchmarks/embedding_backend_parity.py.
+    """
+    @property
+    def name(self) -> str:
+        return f"{self.model_name}-dynamic-int8"
+
+    def prepare_model(self, model):
+        import torch
+
+        model.eval()
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class EmbeddingBackendFactory:
+    """Creates the embedding backend described by embedding_backend_config.json"""
+    DEFAULT_PATH = Path(__file__).resolve().parent / "config" / "embedding_backend_config.json"
+    BACKEND_TYPES = {
+        "sentence_transformer": SentenceTransformerBackend,
+        "dynamic_int8": QuantizedSentenceTransformerBackend
+    }
+
+    @staticmethod
+    def create(config: dict | None = None) -> EmbeddingBackendInterface:
+        config = config if config is not None else {"backend": "sentence_transformer"}
+        backend_type = config["backend"]
+        if backend_type not in EmbeddingBackendFactory.BACKEND_TYPES:
+            raise ValueError(f"Unknown embedding backend '{backend_type}', expected one of {list(EmbeddingBackendFactory.BACKEND_TYPES)}")
+
+        return EmbeddingBackendFactory.BACKEND_TYPES[backend_type](
+            model_name=config.get("model_name", SentenceTransformerBackend.DEFAULT_MODEL_NAME),
+            intra_op_threads=config.get("intra_op_threads", 0)
+        )
+
+    @staticmethod
+    def load(path: Path = DEFAULT_PATH) -> EmbeddingBackendInterface:
+        with open(path, 'r') as f:
+            return EmbeddingBackendFactory.create(json.load(f))
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple, TYPE_CHECKING
+
+import numpy as np
+import logging_config, logging
+
+if TYPE_CHECKING:
+    import faiss
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingStore:
+    """
+    On-disk store for the ingredient embedding matrix and its FAISS index.
+    Entries are keyed by a hash of the model name, the ordered ingredient strings and the index signature (type and
+    build parameters, see FaissIndexConfig.signature), and are loaded with memory-mapping
+    so several processes on one host share the same pages. The manifest remembers the latest entry per model so a
+    changed vocabulary only needs to encode the strings that weren't in the previous entry.
+    """
+    DEFAULT_DIRECTORY = Path(__file__).resolve().parent / "cache" / "embeddings"
+    MANIFEST_FILE_NAME = "manifest.json"
+
+    def __init__(self, directory: Path = DEFAULT_DIRECTORY):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(model_name: str, ingredient_strings: List[str], index_signature: str = "flat") -> str:
+        serialized = json.dumps([model_name, ingredient_strings] if index_signature == "flat" else [model_name, ingredient_strings, index_signature], ensure_ascii=False)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def load(self, model_name: str, ingredient_strings: List[str], index_signature: str = "flat") -> Tuple[np.ndarray, "faiss.Index"] | None:
+        """
+        Loads the stored embeddings and index for exactly this model, list of strings and index type, memory-mapped read only.
+        :return: (embedding matrix, FAISS index) or None if nothing is stored for this key
+        """
+        key = self.make_key(model_name, ingredient_strings, index_signature)
+        embeddings_path, index_path, _ = self._get_paths(key)
+        if not embeddings_path.exists() or not index_path.exists():
+            return None
+
+        import faiss
+
+        try:
+            embeddings = np.load(embeddings_path, mmap_mode="r")
+            index = faiss.read_index(str(index_path), getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY)
+        except Exception as e:
+            logger.warning(f"Could not load stored embeddings for key {key}, they will be rebuilt: {e}")
+            return None
+
+        logger.info(f"Loaded {len(ingredient_strings)} stored ingredient embeddings for model '{model_name}'")
+        return embeddings, index
+
+    def load_reusable_embeddings(self, model_name: str) -> Dict[str, np.ndarray]:
+        """
+        Returns the embedding of every string from the latest stored entry of model_name, used to avoid re-encoding
+        ingredients that didn't change when the vocabulary is updated.
+        """
+        key = self._read_manifest().get(model_name)
+        if key is None:
+            return {}
+
+        embeddings_path, _, strings_path = self._get_paths(key)
+        try:
+            embeddings = np.load(embeddings_path, mmap_mode="r")
+            with open(strings_path, "r", encoding="utf-8") as f:
+                ingredient_strings = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load previous embeddings for model '{model_name}': {e}")
+            return {}
+
+        return {ingredient_string: embeddings[row] for row, ingredient_string in enumerate(ingredient_strings)}
+
+    def save(self, model_name: str, ingredient_strings: List[str], embeddings: np.ndarray, index: "faiss.Index", index_signature: str = "flat"):
+        """Stores the embeddings and index of ingredient_strings and marks them as the latest entry for model_name"""
+        import faiss
+
+        key = self.make_key(model_name, ingredient_strings, index_signature)
+        embeddings_path, index_path, strings_path = self._get_paths(key)
+
+        # Write to temporary files and rename so concurrent readers never see partial files
+        self._atomic_write(embeddings_path, lambda path: self._save_array(path, embeddings))
+        self._atomic_write(index_path, lambda path: faiss.write_index(index, str(path)))
+        self._atomic_write(strings_path, lambda path: path.write_text(json.dumps(ingredient_strings, ensure_ascii=False), encoding="utf-8"))
+
+        manifest = self._read_manifest()
+        manifest[model_name] = key
+        self._atomic_write(self.directory / EmbeddingStore.MANIFEST_FILE_NAME, lambda path: path.write_text(json.dumps(manifest), encoding="utf-8"))
+        logger.info(f"Stored {len(ingredient_strings)} ingredient embeddings for model '{model_name}'")
+
+    def _get_paths(self, key: str) -> Tuple[Path, Path, Path]:
+        return self.directory / f"{key}.npy", self.directory / f"{key}.faiss", self.directory / f"{key}.json"
+
+    def _read_manifest(self) -> Dict[str, str]:
+        try:
+            with open(self.directory / EmbeddingStore.MANIFEST_FILE_NAME, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_array(path: Path, array: np.ndarray):
+        # Save through a file object, np.save would otherwise append ".npy" to the temporary file name
+        with open(path, "wb") as f:
+            np.save(f, np.ascontiguousarray(array, dtype=np.float32))
+
+    @staticmethod
+    def _atomic_write(path: Path, write_function):
+        temporary_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        write_function(temporary_path)
+        os.replace(temporary_path, path)
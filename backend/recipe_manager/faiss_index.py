@@ -0,0 +1,129 @@
+import copy
+import json
+import math
+from pathlib import Path
+from typing import Tuple, TYPE_CHECKING
+
+import numpy as np
+import logging_config, logging
+
+if TYPE_CHECKING:
+    import faiss
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+class FaissIndexConfig:
+    """
+    Type and build parameters of the FAISS index over the known ingredient embeddings, read from faiss_index_config.json.
+    Index types:
+        flat: exact inner product search (IndexFlatIP)
+        hnsw: graph based approximate search (IndexHNSWFlat)
+        ivf: inverted lists over k-means clusters, searching nprobe of nlist clusters (IndexIVFFlat)
+        sq: 8 bit scalar quantized vectors, a quarter of the float32 memory (IndexScalarQuantizer)
+        pq: inverted lists of product quantized vectors, for the largest vocabularies (IndexIVFPQ)
+    Approximate types return the best rerank_candidates by approximate score, which are then re-scored exactly against
+    the float32 embeddings so the returned scores, and the similarity threshold applied to them, match exact search.
+    An nlist of 0 picks 4 * sqrt(number of vectors) clusters, fewer if there aren't enough vectors to train them.
+    """
+    DEFAULT_PATH = Path(__file__).resolve().parent / "config" / "faiss_index_config.json"
+    INDEX_TYPES = ["flat", "hnsw", "ivf", "sq", "pq"]
+    TRAINING_POINTS_PER_CENTROID = 39  # Below this FAISS warns that k-means training is unreliable
+
+    def __init__(self, config: dict | None = None):
+        self.config = copy.deepcopy(config) if config is not None else {"index_type": "flat"}
+        self.index_type = self.config["index_type"]
+        if self.index_type not in FaissIndexConfig.INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type '{self.index_type}', expected one of {FaissIndexConfig.INDEX_TYPES}")
+        self.rerank_candidates = self.config.get("rerank_candidates", 32)
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_PATH) -> "FaissIndexConfig":
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    @property
+    def signature(self) -> str:
+        """Identifies the index type and build parameters, stored indexes are only reused with the same signature"""
+        if self.index_type == "flat":
+            return "flat"
+        return json.dumps([self.index_type, self.config.get(self.index_type, {})], sort_keys=True)
+
+    @property
+    def is_exact(self) -> bool:
+        return self.index_type == "flat"
+
+    def build_index(self, embeddings: np.ndarray) -> "faiss.Index":
+        """
+        Builds and fills an index of the configured type over L2 normalized embeddings.
+        Falls back to a flat index when there are too few vectors to train the configured type.
+        """
+        import faiss
+
+        number_of_vectors, dimension = embeddings.shape
+        parameters = self.config.get(self.index_type, {})
+        index_type = self.index_type
+
+        # Automatic nlist is capped so every centroid gets enough training points
+        automatic_nlist = min(int(4 * math.sqrt(number_of_vectors)), number_of_vectors // FaissIndexConfig.TRAINING_POINTS_PER_CENTROID)
+        nlist = parameters.get("nlist") or max(1, automatic_nlist)
+        minimum_training_points = {
+            "ivf": nlist * FaissIndexConfig.TRAINING_POINTS_PER_CENTROID,
+            "pq": max(nlist, 2 ** parameters.get("nbits", 8)) * FaissIndexConfig.TRAINING_POINTS_PER_CENTROID
+        }.get(index_type, 0)
+        if number_of_vectors < minimum_training_points:
+            logger.warning(f"{number_of_vectors} vectors are too few to train a '{index_type}' index, using an exact flat index")
+            index_type = "flat"
+
+        if index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(dimension, parameters.get("m", 32), faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = parameters.get("ef_construction", 200)
+        elif index_type == "ivf":
+            index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dimension), dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        elif index_type == "sq":
+            quantizer_type = getattr(faiss.ScalarQuantizer, parameters.get("quantizer_type", "QT_8bit"))
+            index = faiss.IndexScalarQuantizer(dimension, quantizer_type, faiss.METRIC_INNER_PRODUCT)
+        elif index_type == "pq":
+            index = faiss.IndexIVFPQ(faiss.IndexFlatIP(dimension), dimension, nlist, parameters.get("m", 48),
+                                     parameters.get("nbits", 8), faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexFlatIP(dimension)
+
+        if not index.is_trained:
+            index.train(embeddings)
+        index.add(embeddings)
+        self.configure_index(index)
+        return index
+
+    def configure_index(self, index: "faiss.Index"):
+        """Applies the search time parameters, which aren't all stored in the index file"""
+        import faiss
+
+        parameters = self.config.get(self.index_type, {})
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = max(parameters.get("ef_search", 128), self.rerank_candidates)
+        elif isinstance(index, faiss.IndexIVF):
+            index.nprobe = min(parameters.get("nprobe", 16), index.nlist)
+
+    def search(self, index: "faiss.Index", embeddings: np.ndarray, query_embeddings: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Searches the k nearest known ingredients of every query, same output as faiss.Index.search.
+        For approximate indexes the candidates are re-scored with the exact inner product against embeddings.
+        Missing results have index -1 and score -inf.
+        """
+        if self.is_exact or index.ntotal == 0:
+            return index.search(query_embeddings, k)
+
+        number_of_candidates = min(max(k, self.rerank_candidates), index.ntotal)
+        _, candidate_indices = index.search(query_embeddings, number_of_candidates)
+
+        valid = candidate_indices >= 0
+        candidate_vectors = np.asarray(embeddings)[np.where(valid, candidate_indices, 0)]
+        exact_scores = np.einsum("qd,qcd->qc", query_embeddings, candidate_vectors)
+        exact_scores = np.where(valid, exact_scores, -np.inf).astype(np.float32)
+
+        order = np.argsort(-exact_scores, axis=1, kind="stable")[:, :k]
+        scores = np.take_along_axis(exact_scores, order, axis=1)
+        indices = np.where(np.isfinite(scores), np.take_along_axis(candidate_indices, order, axis=1), -1)
+        return scores, indices
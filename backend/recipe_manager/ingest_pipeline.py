@@ -0,0 +1,295 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import List
+
+from recipe_manager.metrics import REGISTRY
+import logging_config, logging
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+STAGE_ITEMS = REGISTRY.counter("scrape_stage_items_total", "Recipes into and out of each scrape stage", ["stage", "direction"])
+STAGE_BUSY_SECONDS = REGISTRY.counter("scrape_stage_busy_seconds_total", "Time each scrape stage spent working, items divided by this is its throughput", ["stage"])
+
+
+class StageCounters:
+    """
+    Throughput counters of one pipeline stage, only updated by the stage's own thread.
+    Every update is also added to the process-wide scrape stage metrics.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0  # Time spent working, excluding time blocked on the input and output queues
+
+    def record(self, items_in: int, items_out: int, busy_seconds: float):
+        self.items_in += items_in
+        self.items_out += items_out
+        self.busy_seconds += busy_seconds
+
+        STAGE_ITEMS.increment(items_in, stage=self.name, direction="in")
+        STAGE_ITEMS.increment(items_out, stage=self.name, direction="out")
+        STAGE_BUSY_SECONDS.increment(busy_seconds, stage=self.name)
+
+    def get_statistics(self) -> dict:
+        return {
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_seconds": self.busy_seconds,
+            "items_per_second": self.items_in / self.busy_seconds if self.busy_seconds else 0.0
+        }
+
+
+class RecipeChunk:
+    """Recipes fetched by one API call, passed from stage to stage"""
+    def __init__(self, chunk_id: int, fetched_count: int, recipes: List[dict]):
+        self.chunk_id = chunk_id
+        self.fetched_count = fetched_count  # Number of recipes the API returned for this chunk
+        self.recipes = recipes
+
+
+class IngestPipeline:
+    """
+    Streaming scrape-and-ingest, running fetch, transform, link check, normalize and insert as concurrent stages
+    connected by bounded queues, so memory stays bounded by the queue sizes instead of growing with num_recipes.
+    Recipes are inserted in insert_many batches of insert_batch_size. After each batch a checkpoint records how many
+    fetched recipes are fully processed, an interrupted run started again with the same num_recipes only fetches the rest.
+    """
+    DEFAULT_FETCH_BATCH_SIZE = 25  # Recipes requested per API call
+    DEFAULT_INSERT_BATCH_SIZE = 50
+    DEFAULT_QUEUE_SIZE = 4  # Chunks buffered between two stages
+    DEFAULT_CHECKPOINT_PATH = Path(__file__).resolve().parent / "cache" / "ingest_checkpoint.json"
+    STAGE_NAMES = ["fetch", "transform", "link_check", "normalize", "insert"]
+    QUEUE_POLL_SECONDS = 0.1
+
+    def __init__(self, recipe_scraper, fetch_batch_size: int = DEFAULT_FETCH_BATCH_SIZE, insert_batch_size: int = DEFAULT_INSERT_BATCH_SIZE,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, checkpoint_path: Path | None = DEFAULT_CHECKPOINT_PATH):
+        """
+        :param recipe_scraper: RecipeScraper providing the API access, link checker, normalizer and database driver
+        :param checkpoint_path: checkpoint file, None to disable resuming
+        """
+        if fetch_batch_size <= 0 or insert_batch_size <= 0 or queue_size <= 0:
+            raise ValueError(f"Invalid pipeline sizes: fetch_batch_size={fetch_batch_size}, insert_batch_size={insert_batch_size}, queue_size={queue_size}")
+
+        self.recipe_scraper = recipe_scraper
+        self.fetch_batch_size = fetch_batch_size
+        self.insert_batch_size = insert_batch_size
+        self.queue_size = queue_size
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path is not None else None
+
+        self.stage_counters = {}
+        self.insert_report = {}
+        self._stop_event = threading.Event()
+        self._errors = []
+
+    def run(self, num_recipes: int) -> dict:
+        """
+        Scrapes num_recipes random recipes and inserts the valid ones, resuming from the checkpoint if one exists for num_recipes
+        :return: report in the format below
+        {
+            "inserted": list[source_url],
+            "duplicates": list[source_url],
+            "failed": list[source_url],
+            "completed": integer (fetched recipes fully processed, including earlier interrupted runs),
+            "stages": {stage_name: StageCounters.get_statistics()}
+        }
+        """
+        checkpoint = self.load_checkpoint(num_recipes)
+        completed = checkpoint["completed"]
+        logger.info(f"Starting pipelined ingest of {num_recipes} recipes, {completed} already completed")
+
+        self.stage_counters = {name: StageCounters(name) for name in IngestPipeline.STAGE_NAMES}
+        self.insert_report = {"inserted": [], "duplicates": [], "failed": []}
+        self._stop_event.clear()
+        self._errors = []
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in IngestPipeline.STAGE_NAMES[1:]]
+        stage_functions = [self._transform_chunk, self._check_chunk_links, self._normalize_chunk]
+        threads = [threading.Thread(target=self._run_stage, args=(self._fetch_chunks, None, queues[0], num_recipes - completed), name="ingest_fetch")]
+        for index, stage_function in enumerate(stage_functions):
+            name = IngestPipeline.STAGE_NAMES[index + 1]
+            threads.append(threading.Thread(target=self._run_stage, args=(stage_function, queues[index], queues[index + 1]), name=f"ingest_{name}"))
+        threads.append(threading.Thread(target=self._run_stage, args=(self._insert_chunks, queues[-1], None, num_recipes, completed), name="ingest_insert"))
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        statistics = {name: counters.get_statistics() for name, counters in self.stage_counters.items()}
+        logger.info(f"Ingest stage statistics: {statistics}")
+        if self._errors:
+            raise RuntimeError(f"Pipelined ingest failed, rerun to resume from the checkpoint: {self._errors[0]}") from self._errors[0]
+
+        if self.checkpoint_path is not None:
+            self.checkpoint_path.unlink(missing_ok=True)
+
+        return {**self.insert_report, "completed": num_recipes, "stages": statistics}
+
+    def _run_stage(self, stage_function, input_queue: queue.Queue | None, output_queue: queue.Queue | None, *args):
+        """Runs one stage, any exception stops every stage and the end of input is always passed downstream"""
+        try:
+            if input_queue is None:
+                stage_function(output_queue, *args)
+            else:
+                stage_function(self._iterate_queue(input_queue), output_queue, *args)
+        except Exception as e:
+            logger.error(f"Ingest stage '{stage_function.__name__}' failed: {e}")
+            self._errors.append(e)
+            self._stop_event.set()
+        finally:
+            if output_queue is not None:
+                self._put(output_queue, None, force=True)
+
+    def _iterate_queue(self, input_queue: queue.Queue):
+        while True:
+            try:
+                chunk = input_queue.get(timeout=IngestPipeline.QUEUE_POLL_SECONDS)
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    return
+                continue
+            if chunk is None or self._stop_event.is_set():
+                return
+            yield chunk
+
+    def _put(self, output_queue: queue.Queue, chunk: RecipeChunk | None, force: bool = False):
+        """Blocks while output_queue is full, gives up once the pipeline is stopping unless force is set"""
+        while True:
+            try:
+                output_queue.put(chunk, timeout=IngestPipeline.QUEUE_POLL_SECONDS)
+                return
+            except queue.Full:
+                if self._stop_event.is_set() and not force:
+                    return
+                if self._stop_event.is_set():
+                    # Downstream stages are stopping too, drop a buffered chunk so the end of input fits
+                    try:
+                        output_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def _fetch_chunks(self, output_queue: queue.Queue, num_recipes: int):
+        counters = self.stage_counters["fetch"]
+        chunk_id = 0
+        remaining = num_recipes
+        while remaining > 0 and not self._stop_event.is_set():
+            start_time = time.perf_counter()
+            recipe_list_obj = self.recipe_scraper.get_random_recipes(min(self.fetch_batch_size, remaining))
+            if recipe_list_obj is None:
+                raise RuntimeError("Could not get random recipes")
+
+            recipes = recipe_list_obj["recipes"]
+            if not recipes:
+                raise RuntimeError("API returned no recipes")
+            counters.record(len(recipes), len(recipes), time.perf_counter() - start_time)
+            remaining -= len(recipes)
+
+            self._put(output_queue, RecipeChunk(chunk_id, len(recipes), recipes))
+            chunk_id += 1
+
+    def _transform_chunk(self, chunks, output_queue: queue.Queue):
+        seen_urls = set()
+        for chunk in chunks:
+            # Drop recipes already seen in an earlier chunk of this run, they may not be inserted yet
+            recipes = [recipe for recipe in chunk.recipes if recipe["sourceUrl"] not in seen_urls]
+            seen_urls.update(recipe["sourceUrl"] for recipe in recipes)
+            self._process_chunk("transform", chunk, lambda: self.recipe_scraper.transform_recipe_structure({"recipes": recipes}), output_queue)
+
+    def _check_chunk_links(self, chunks, output_queue: queue.Queue):
+        for chunk in chunks:
+            def check_links():
+                live_urls = self.recipe_scraper.link_checker.check_urls([recipe_dict["source_url"] for recipe_dict in chunk.recipes])
+                return [recipe_dict for recipe_dict in chunk.recipes if live_urls[recipe_dict["source_url"]]]
+            self._process_chunk("link_check", chunk, check_links, output_queue)
+
+    def _normalize_chunk(self, chunks, output_queue: queue.Queue):
+        for chunk in chunks:
+            self._process_chunk("normalize", chunk, lambda: self.recipe_scraper.normalize_recipe_list(chunk.recipes), output_queue)
+
+    def _process_chunk(self, stage_name: str, chunk: RecipeChunk, process_function, output_queue: queue.Queue):
+        start_time = time.perf_counter()
+        recipes = process_function()
+        self.stage_counters[stage_name].record(len(chunk.recipes), len(recipes), time.perf_counter() - start_time)
+
+        self._put(output_queue, RecipeChunk(chunk.chunk_id, chunk.fetched_count, recipes))
+
+    def _insert_chunks(self, chunks, _output_queue, num_recipes: int, completed: int):
+        counters = self.stage_counters["insert"]
+        buffer = []
+        # [fetched_count, recipes of the chunk still in buffer] of every chunk not yet fully inserted, in arrival order
+        pending_chunks = deque()
+
+        def flush(number_to_insert: int):
+            batch = buffer[:number_to_insert]
+            del buffer[:number_to_insert]
+
+            start_time = time.perf_counter()
+            insert_report = self.recipe_scraper.database_driver.insert_recipe_list(batch)
+            counters.record(len(batch), len(insert_report["inserted"]), time.perf_counter() - start_time)
+            for key in self.insert_report:
+                self.insert_report[key].extend(insert_report[key])
+            if insert_report["failed"]:
+                # The driver reports a lost connection as a failed batch rather than raising, the chunks stay
+                # uncompleted so the checkpoint doesn't advance past them
+                raise RuntimeError(f"Failed to insert {len(insert_report['failed'])} of {len(batch)} recipes")
+
+            for pending_chunk in pending_chunks:
+                flushed = min(number_to_insert, pending_chunk[1])
+                pending_chunk[1] -= flushed
+                number_to_insert -= flushed
+                if number_to_insert == 0:
+                    break
+
+        def complete_inserted_chunks():
+            nonlocal completed
+            completed_before = completed
+            while pending_chunks and pending_chunks[0][1] == 0:
+                completed += pending_chunks.popleft()[0]
+            if completed != completed_before:
+                self.save_checkpoint(num_recipes, completed)
+
+        for chunk in chunks:
+            buffer.extend(chunk.recipes)
+            pending_chunks.append([chunk.fetched_count, len(chunk.recipes)])
+            while len(buffer) >= self.insert_batch_size:
+                flush(self.insert_batch_size)
+            complete_inserted_chunks()
+
+        if buffer and not self._stop_event.is_set():
+            flush(len(buffer))
+            complete_inserted_chunks()
+
+    def load_checkpoint(self, num_recipes: int) -> dict:
+        """Returns the checkpoint of an interrupted run of num_recipes, or a fresh one"""
+        fresh_checkpoint = {"num_recipes": num_recipes, "completed": 0}
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return fresh_checkpoint
+
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable ingest checkpoint: {e}")
+            return fresh_checkpoint
+
+        if checkpoint.get("num_recipes") != num_recipes:
+            logger.warning(f"Ignoring ingest checkpoint for {checkpoint.get('num_recipes')} recipes, {num_recipes} requested")
+            return fresh_checkpoint
+        return checkpoint
+
+    def save_checkpoint(self, num_recipes: int, completed: int):
+        if self.checkpoint_path is None:
+            return
+
+        # Write to a temporary file and rename so a crash never leaves a partial checkpoint
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.checkpoint_path.with_name(f".{self.checkpoint_path.name}.{os.getpid()}.tmp")
+        temporary_path.write_text(json.dumps({"num_recipes": num_recipes, "completed": completed}))
+        os.replace(temporary_path, self.checkpoint_path)
@@ -1,12 +1,30 @@
+import itertools
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-from ingredient_parser import parse_ingredient
-from typing import Tuple, List
+import numpy as np
+
+from typing import Dict, List, NamedTuple, Tuple, TYPE_CHECKING
+from recipe_manager.audit_log import AuditLogWriter
+from recipe_manager.embedding_backends import EmbeddingBackendFactory, EmbeddingBackendInterface
+from recipe_manager.embedding_store import EmbeddingStore
+from recipe_manager.faiss_index import FaissIndexConfig
 from recipe_manager.ingredient_readers import IngredientReaderInterface
-from tests.ingredient_testing.raw_json_ingredient_reader import RawJsonIngredientReader
+from recipe_manager.ingredient_vocabulary import IngredientVocabulary
+from recipe_manager.lexical_matcher import LexicalMatcher
+from recipe_manager.metrics import DEFAULT_SIZE_BUCKETS, REGISTRY
+from recipe_manager.normalization_cache import NormalizationCache
 import logging_config, logging
-from sentence_transformers import SentenceTransformer
-import faiss
+
+if TYPE_CHECKING:
+    import faiss
+
+# Heavy dependencies (ingredient_parser, sentence_transformers/torch and faiss) are imported on first use,
+# so importing this module or doing exact-match-only normalization stays fast.
 
 # Get logger instance
 logger = logging.getLogger(__name__)
@@ -15,54 +33,101 @@ IGNORED_INGREDIENTS = [
     "water",
 ]
 
+NORMALIZATION_SECONDS = REGISTRY.histogram("ingredient_normalization_seconds", "Time to normalize one list of ingredient strings, including cache lookups")
+PARSE_SECONDS = REGISTRY.histogram("ingredient_parse_seconds", "Time to parse the ingredient strings of one list that weren't cached")
+MATCH_SECONDS = REGISTRY.histogram("ingredient_match_seconds", "Time spent in each matching tier for one list of parsed ingredients", ["tier"])
+MATCHES = REGISTRY.counter("ingredient_matches_total", "Parsed ingredients resolved by each matching tier", ["tier"])
+ENCODE_SECONDS = REGISTRY.histogram("embedding_encode_seconds", "Time to encode one batch of query strings")
+ENCODE_BATCH_SIZE = REGISTRY.histogram("embedding_batch_size", "Number of query strings encoded together", buckets=DEFAULT_SIZE_BUCKETS)
+INDEX_SEARCH_SECONDS = REGISTRY.histogram("faiss_search_seconds", "Time to search the known ingredient index for one batch of queries")
+
+
+def preload_heavy_dependencies(contextual_matching: bool = True):
+    """
+    Imports the heavy dependencies ahead of first use, meant to be run in a background thread at startup.
+    :param contextual_matching: also import sentence_transformers (torch) and faiss if True
+    """
+    start = time.perf_counter()
+    import ingredient_parser
+    if contextual_matching:
+        import faiss
+        import sentence_transformers
+    logger.info(f"Preloaded heavy dependencies in {time.perf_counter() - start:.2f}s")
+
+
+def initialize_parse_worker():
+    """Process pool initializer, loads the ingredient parser model once per worker process"""
+    IngredientNormalizer.trim_ingredient_string("1 cup flour")
+
+
+def trim_ingredient_string_chunk(ingredient_string_chunk: List[str]) -> List[Tuple[str, str]]:
+    """Process pool task, trims a chunk of ingredient strings in order"""
+    return [IngredientNormalizer.trim_ingredient_string(ingredient_string) for ingredient_string in ingredient_string_chunk]
+
+
 class IngredientNormalizer:
-    MATCHED_INGREDIENT_LOG_FILE = Path("contextual_matched_ingredients.log")
-    OVERWRITE_LOG_FILE = True  # Removes existing log file when instantiated if True. Easier for debugging.
+    MATCH_AUDIT_LOG = AuditLogWriter("contextual_matched_ingredients.log")  # Contextual matches, for reviewing the threshold
+    PARALLEL_PARSE_MINIMUM_BATCH = 200  # Lists smaller than this are parsed in-process, pool overhead dominates otherwise
+    PARALLEL_PARSE_CHUNK_SIZE = 50  # Number of strings sent to a worker per task
+    MATCH_TIERS = ["ignored", "exact", "lexical", "contextual", "unmatched"]  # Where each parsed ingredient was resolved
 
     """
     Class to handle normalizing ingredient strings
     This class uses the nlp-ingredient-parser library, for more information on this, see https://ingredient-parser.readthedocs.io/en/latest/
     """
-    def __init__(self, ingredient_reader: IngredientReaderInterface):
+    def __init__(self, ingredient_reader: IngredientReaderInterface, normalization_cache: NormalizationCache | None = None,
+                 embedding_store: EmbeddingStore | None = None, contextual_matching: bool = True, parse_workers: int = 0,
+                 embedding_backend: EmbeddingBackendInterface | None = None, lexical_matching: bool = True):
+        """
+        :param contextual_matching: if False, the transformer model is never loaded and ingredients without an exact or lexical match are unmatched
+        :param parse_workers: number of worker processes used to parse large ingredient lists, 0 or 1 to parse in-process
+        :param embedding_backend: model used to encode ingredient strings, read from embedding_backend_config.json if None
+        :param lexical_matching: if True, fuzzy string matching is tried before contextual matching, see LexicalMatcher
+        """
         self.ingredient_reader = ingredient_reader
+        self.contextual_matching = contextual_matching
+        self.parse_workers = parse_workers
+        self._parse_executor = None
 
-        # Generate set of existing ingredient strings for efficient exact string matching
         unrolled_ingredient_strings_list = self.ingredient_reader.get_and_unroll_ingredients()
-        self.unrolled_ingredient_strings = set(unrolled_ingredient_strings_list)
 
         self.all_ingredients = self.ingredient_reader.get_all_ingredients()  # List[dict] of all ingredients and their aliases
 
-        self.sentence_transformer = SentenceTransformerHandler(unrolled_ingredient_strings_list)
+        # Single alias -> top-level name lookup, used for both exact matching and alias resolution
+        self.vocabulary = IngredientVocabulary(self.all_ingredients)
+        self.lexical_matcher = LexicalMatcher(self.vocabulary) if lexical_matching else None
 
-        if IngredientNormalizer.OVERWRITE_LOG_FILE:
-            IngredientNormalizer.MATCHED_INGREDIENT_LOG_FILE.unlink(missing_ok=True)
+        # Number of parsed ingredients resolved by each matching tier, see get_match_statistics
+        self.tier_counts = dict.fromkeys(IngredientNormalizer.MATCH_TIERS, 0)
+        self._tier_counts_lock = threading.Lock()
+        self._vocabulary_update_lock = threading.Lock()  # Serializes add_ingredients calls, readers never take it
 
-    def generate_normalized_ingredients(self, ingredient_strings: List[str] | str) -> Tuple[List[str], List[str]]:
+        self.sentence_transformer = None
+        if self.contextual_matching:
+            self.sentence_transformer = SentenceTransformerHandler(unrolled_ingredient_strings_list, embedding_store, embedding_backend=embedding_backend)
+
+        # Cache of parsed tuples and normalized names, in-memory only unless a persistent cache is provided
+        self.normalization_cache = normalization_cache if normalization_cache is not None else NormalizationCache()
+        self.normalization_cache.set_vocabulary_version(self.get_cache_version())
+
+    def generate_normalized_ingredients(self, ingredient_strings: List[str] | str, batch: bool = True) -> Tuple[List[str], List[str]]:
         """
         Takes ingredient_string_list and generates a final normalized ingredients list.
         Iterates through ingredient_string_list and calls generate_normalized_ingredient_string on each tuple.
         Prioritize the "non-foundational" ingredient name first, only use match for "foundational" ingredient if the non-foundational match doesn't exist
         If any values are None, this means that the ingredient could not be normalized confidently.
+        If batch is True, all contextual matches of the request are encoded and searched together.
         """
         # First generate the ingredient string tuples by trimming/parsing provided ingredient list
         list_to_parse = [ingredient_strings] if not isinstance(ingredient_strings, List) else ingredient_strings
-        ingredient_string_tuples = self.trim_ingredient_string_list(list_to_parse)
+        ingredient_string_tuples, matched_names = self.resolve_ingredient_strings(list_to_parse, batch)
 
         normalized_list = []
         unmatched_ingredient_list = []
-        for ingredient_tuple, ingredient_str in zip(ingredient_string_tuples, list_to_parse):
-            if ingredient_tuple[0] in IGNORED_INGREDIENTS or ingredient_tuple[1] in IGNORED_INGREDIENTS:
-                # Ignore anything in IGNORED_INGREDIENTS list
-                logger.info(f"Ignored ingredient found: {ingredient_tuple}, skipping.")
+        for ingredient_tuple, ingredient_str, new_normalized_name in zip(ingredient_string_tuples, list_to_parse, matched_names):
+            if self.is_ignored_ingredient(ingredient_tuple):
                 continue
 
-            # Attempt to generate normalized name
-            new_normalized_name = self.check_exact_ingredient_string_match(ingredient_tuple)
-
-            if not new_normalized_name:
-                # No exact match, try other methods of matching
-                new_normalized_name = self.contextual_ingredient_match(ingredient_str, ingredient_tuple[0], ingredient_tuple[1])
-
             if not new_normalized_name:
                 # Ingredient match not confidently found. Log warning and continue
                 logger.warning(f"Couldn't find ingredient match for tuple: {ingredient_str}")
@@ -75,20 +140,228 @@ class IngredientNormalizer:
 
         return normalized_list, unmatched_ingredient_list
 
+    def normalize_ingredient_strings(self, ingredient_strings: List[str], batch: bool = True) -> List[str | None]:
+        """
+        Normalizes every string in ingredient_strings, keeping the output aligned with the input.
+        Entries are None when the ingredient is ignored or couldn't be matched confidently.
+        """
+        _, matched_names = self.resolve_ingredient_strings(ingredient_strings, batch)
+        return matched_names
+
+    def resolve_ingredient_strings(self, ingredient_strings: List[str], batch: bool = True) -> Tuple[List[Tuple[str, str]], List[str | None]]:
+        """
+        Returns the trimmed ingredient tuple and the normalized name (None if ignored or unmatched) of every string.
+        Results are served from the normalization cache when possible, only cache misses are parsed and matched.
+        """
+        start_time = time.perf_counter()
+        vocabulary_version = self.normalization_cache.vocabulary_version
+        cached_entries = {}
+        uncached_strings = []
+        for ingredient_string in ingredient_strings:
+            key = NormalizationCache.make_key(ingredient_string)
+            if key in cached_entries:
+                continue
+
+            entry = self.normalization_cache.get(ingredient_string)
+            cached_entries[key] = entry
+            if entry is None:
+                uncached_strings.append(ingredient_string)
+
+        if uncached_strings:
+            # Parse and match every distinct string that isn't cached yet, then store the results (including misses)
+            with PARSE_SECONDS.time():
+                uncached_tuples = self.trim_ingredient_string_list(uncached_strings)
+            uncached_names = self.match_ingredient_tuples(uncached_tuples, uncached_strings, batch)
+            new_entries = list(zip(uncached_tuples, uncached_names))
+            self.normalization_cache.put_many(uncached_strings, new_entries, vocabulary_version)
+            for ingredient_string, entry in zip(uncached_strings, new_entries):
+                cached_entries[NormalizationCache.make_key(ingredient_string)] = entry
+
+        entries = [cached_entries[NormalizationCache.make_key(ingredient_string)] for ingredient_string in ingredient_strings]
+        NORMALIZATION_SECONDS.observe(time.perf_counter() - start_time)
+        return [entry[0] for entry in entries], [entry[1] for entry in entries]
+
+    def add_ingredients(self, new_ingredients: List[Dict]) -> List[str]:
+        """
+        Adds ingredients, or aliases of known ingredients, to the running normalizer without rebuilding it. Only the
+        strings that aren't known yet are processed and encoded.
+        Each structure is replaced rather than modified, in dependency order: the vocabulary first, then the lexical
+        matcher and the embedding index, so anything they match resolves in the vocabulary a request reads afterwards.
+        The normalization cache moves to the new vocabulary version last. Results of the previous version aren't read
+        anymore, but stay in the persistent cache for the processes that haven't added these ingredients yet.
+        :param new_ingredients: ingredients in the format returned by IngredientReaderInterface.get_all_ingredients
+        :return: the ingredient strings that weren't known before
+        """
+        with self._vocabulary_update_lock:
+            if all(ingredient_string in self.vocabulary
+                   for ingredient_dict in new_ingredients for ingredient_string in [ingredient_dict["name"], *ingredient_dict.get("alias", [])]):
+                return []
+
+            vocabulary = self.vocabulary.with_ingredients(new_ingredients)
+            new_strings = list(itertools.islice(vocabulary.alias_to_canonical, len(self.vocabulary), None))
+
+            self.vocabulary = vocabulary
+            self.all_ingredients = vocabulary.get_all_ingredients()
+            if self.lexical_matcher:
+                self.lexical_matcher = self.lexical_matcher.with_vocabulary(vocabulary, new_strings)
+            if self.sentence_transformer:
+                self.sentence_transformer.add_ingredients(new_strings)
+            self.normalization_cache.set_vocabulary_version(self.get_cache_version())
+
+        logger.info(f"Added {len(new_strings)} ingredient strings, vocabulary version {vocabulary.version}")
+        return new_strings
+
+    def add_aliases(self, ingredient_name: str, aliases: List[str]) -> List[str]:
+        """Adds aliases to a known top-level ingredient, see add_ingredients"""
+        if ingredient_name not in self.vocabulary.canonical_to_aliases:
+            raise ValueError(f"Unknown ingredient '{ingredient_name}'")
+        return self.add_ingredients([{"name": ingredient_name, "alias": list(aliases)}])
+
+    def get_cache_version(self) -> str:
+        """Version of everything a cached normalization result depends on"""
+        lexical_signature = self.lexical_matcher.signature if self.lexical_matcher else "no-lexical"
+        if not self.contextual_matching:
+            return f"{self.vocabulary.version}:{lexical_signature}:exact"
+        return f"{self.vocabulary.version}:{lexical_signature}:{self.sentence_transformer.embedding_backend.name}:{SentenceTransformerHandler.COSINE_SIMILARITY_THRESHOLD}"
+
+    def get_match_statistics(self) -> dict:
+        """
+        Number and share of parsed ingredients resolved by each matching tier, cached normalizations aren't counted.
+        Every lexical match is a transformer encode and search that didn't have to run.
+        """
+        with self._tier_counts_lock:
+            tier_counts = dict(self.tier_counts)
+        total = sum(tier_counts.values())
+        return {
+            "tier_counts": tier_counts,
+            "tier_hit_rates": {tier: count / total if total else 0.0 for tier, count in tier_counts.items()},
+            "contextual_lookups": tier_counts["contextual"] + tier_counts["unmatched"] if self.contextual_matching else 0,
+            "contextual_lookups_avoided": tier_counts["lexical"]
+        }
+
+    def warm_up(self):
+        """Loads the parser, and the transformer model and index if contextual matching is enabled, ahead of the first request"""
+        self.trim_ingredient_string("1 cup flour")
+        if self.sentence_transformer:
+            self.sentence_transformer.warm_up()
+
+    def preload(self):
+        """
+        Loads the parser, and the transformer model and index if contextual matching is enabled, without running the
+        model. Meant to be called before forking worker processes so they share the loaded weights copy-on-write
+        """
+        self.trim_ingredient_string("1 cup flour")
+        if self.sentence_transformer:
+            self.sentence_transformer.load_model()
+            self.sentence_transformer.load_index()
+
+    def match_ingredient_tuples(self, ingredient_string_tuples: List[Tuple[str, str]], ingredient_strings: List[str], batch: bool = True) -> List[str | None]:
+        """
+        Matches each trimmed ingredient tuple to a normalized ingredient name, exact matches first.
+        Tuples without an exact match go through lexical matching, and those without a conclusive lexical match go
+        through contextual matching, either one at a time or all in one batch.
+        Returns one entry per tuple, None for ignored or unmatched ingredients.
+        """
+        matched_names = [None] * len(ingredient_string_tuples)
+        tier_counts = dict.fromkeys(IngredientNormalizer.MATCH_TIERS, 0)
+        lexical_indexes = []
+        start_time = time.perf_counter()
+        for index, ingredient_tuple in enumerate(ingredient_string_tuples):
+            if self.is_ignored_ingredient(ingredient_tuple):
+                # Ignore anything in IGNORED_INGREDIENTS list
+                logger.info(f"Ignored ingredient found: {ingredient_tuple}, skipping.")
+                tier_counts["ignored"] += 1
+                continue
+
+            # Attempt to generate normalized name
+            matched_names[index] = self.check_exact_ingredient_string_match(ingredient_tuple)
+            if matched_names[index]:
+                tier_counts["exact"] += 1
+            else:
+                # No exact match, try other methods of matching
+                lexical_indexes.append(index)
+
+        MATCH_SECONDS.observe(time.perf_counter() - start_time, tier="exact")
+
+        # Cheap fuzzy string matching first, only inconclusive ones need the transformer model
+        contextual_indexes = lexical_indexes
+        if self.lexical_matcher and lexical_indexes:
+            with MATCH_SECONDS.time(tier="lexical"):
+                lexical_names = self.lexical_ingredient_match([ingredient_string_tuples[index] for index in lexical_indexes])
+            contextual_indexes = []
+            for index, lexical_name in zip(lexical_indexes, lexical_names):
+                if lexical_name:
+                    matched_names[index] = lexical_name
+                    tier_counts["lexical"] += 1
+                else:
+                    contextual_indexes.append(index)
+
+        contextual_args = [(ingredient_strings[index], *ingredient_string_tuples[index]) for index in contextual_indexes]
+        if not self.contextual_matching or not contextual_args:
+            contextual_names = [None] * len(contextual_args)
+        else:
+            with MATCH_SECONDS.time(tier="contextual"):
+                if batch:
+                    contextual_names = self.batch_contextual_ingredient_match(contextual_args)
+                else:
+                    contextual_names = [self.contextual_ingredient_match(*args) for args in contextual_args]
+
+        for index, contextual_name in zip(contextual_indexes, contextual_names):
+            matched_names[index] = contextual_name
+            tier_counts["contextual" if contextual_name else "unmatched"] += 1
+
+        with self._tier_counts_lock:
+            for tier, count in tier_counts.items():
+                self.tier_counts[tier] += count
+        for tier, count in tier_counts.items():
+            if count:
+                MATCHES.increment(count, tier=tier)
+
+        return matched_names
+
+    def lexical_ingredient_match(self, ingredient_string_tuples: List[Tuple[str, str]]) -> List[str | None]:
+        """
+        Fuzzy matches the trimmed ingredient tuples against the known ingredient strings, all unique strings in one call.
+        Prioritizes the regular ingredient name over the foundational name, like the exact match.
+        Returns the top-level ingredient name of each tuple, None if neither string has a conclusive match.
+        """
+        unique_strings = list(dict.fromkeys(
+            ingredient for ingredient_tuple in ingredient_string_tuples for ingredient in ingredient_tuple if ingredient
+        ))
+        lexical_matches = dict(zip(unique_strings, self.lexical_matcher.match_strings(unique_strings)))
+
+        matched_names = []
+        for ingredient_tuple in ingredient_string_tuples:
+            matched_name = None
+            for ingredient in ingredient_tuple:
+                matched_string, score = lexical_matches.get(ingredient, (None, None))
+                if matched_string:
+                    logger.debug(f"Lexical match: '{ingredient}' is {matched_string} with score {score:.1f}")
+                    matched_name = self.find_top_level_ingredient_name(matched_string)
+                    break
+            matched_names.append(matched_name)
+        return matched_names
+
+    @staticmethod
+    def is_ignored_ingredient(ingredient_tuple: Tuple[str, str]) -> bool:
+        return ingredient_tuple[0] in IGNORED_INGREDIENTS or ingredient_tuple[1] in IGNORED_INGREDIENTS
+
     def check_exact_ingredient_string_match(self, ingredient_tuple_to_normalize: Tuple[str,str]) -> str | None:
         """
         Generates a normalized ingredient string based on the passed in ingredient string.
         Prioritizes regular ingredient name over foundational ingredient name
         """
-        # First check the regular ingredient string for an exact match in the unrolled_ingredient_strings set
-        if ingredient_tuple_to_normalize[0] and self.exact_ingredient_match(ingredient_tuple_to_normalize[0]):
-            # If match found, we then need to find the top level ingredient string to ensure this isn't an alias match
-            return self.find_top_level_ingredient_name(ingredient_tuple_to_normalize[0])
+        # First check the regular ingredient string for an exact match, resolving aliases to the top level ingredient string
+        if ingredient_tuple_to_normalize[0]:
+            top_level_name = self.vocabulary.get_canonical_name(ingredient_tuple_to_normalize[0])
+            if top_level_name:
+                return top_level_name
 
         # Next check foundational ingredient string for exact match
-        if ingredient_tuple_to_normalize[1] and self.exact_ingredient_match(ingredient_tuple_to_normalize[1]):
-            # If match found, we then need to find the top level ingredient string to ensure this isn't an alias match
-            return self.find_top_level_ingredient_name(ingredient_tuple_to_normalize[1])
+        if ingredient_tuple_to_normalize[1]:
+            top_level_name = self.vocabulary.get_canonical_name(ingredient_tuple_to_normalize[1])
+            if top_level_name:
+                return top_level_name
 
         return None  # Nothing found, return None
 
@@ -97,33 +370,51 @@ class IngredientNormalizer:
         Finds the top level name of the ingredient_to_find string.
         Changes this string from alias to top-level name if necessary.
         """
-        for ingredient_dict in self.all_ingredients:
-            # First check if the string is the top level name
-            if ingredient_dict["name"] == ingredient_to_find:
-                return ingredient_to_find
-
-            # Then iterate through each alias for this entry and check string matching
-            for alias in ingredient_dict["alias"]:
-                if alias == ingredient_to_find:
-                    return ingredient_dict["name"]
+        top_level_name = self.vocabulary.get_canonical_name(ingredient_to_find)
+        if top_level_name is None:
+            # This method should only be called if we know the string exists in our ingredient list, so raise error if we reach this point
+            raise RuntimeError(f"find_top_level_ingredient_name method called for string '{ingredient_to_find}', but string doesn't exist in ingredients")
 
-        # This method should only be called if we know the string exists in our ingredient list, so raise error if we reach this point
-        raise RuntimeError(f"find_top_level_ingredient_name method called for string '{ingredient_to_find}', but string doesn't exist in ingredients")
+        return top_level_name
 
     def trim_ingredient_string_list(self, ingredient_string_list: List[str]) -> List[Tuple[str, str]]:
         """
         Iterates through ingredient_string_list and calls "trim_ingredient_string" method on each string value
+        Large lists are split in chunks and parsed across the worker process pool if parse_workers is set.
         Returns list of Tuples containing <trimmed ingredient, trimmed foundation ingredient>
         """
-        trimmed_ingredient_string_list = []
-        for ingredient_string in ingredient_string_list:
-            next_ingredient_tuple = self.trim_ingredient_string(ingredient_string)
-            trimmed_ingredient_string_list.append(next_ingredient_tuple)
-
-        return trimmed_ingredient_string_list
+        if self.parse_workers > 1 and len(ingredient_string_list) >= IngredientNormalizer.PARALLEL_PARSE_MINIMUM_BATCH:
+            chunk_size = IngredientNormalizer.PARALLEL_PARSE_CHUNK_SIZE
+            chunks = [ingredient_string_list[i:i + chunk_size] for i in range(0, len(ingredient_string_list), chunk_size)]
+
+            # map keeps the chunks in input order
+            trimmed_ingredient_string_list = []
+            for trimmed_chunk in self.get_parse_executor().map(trim_ingredient_string_chunk, chunks):
+                trimmed_ingredient_string_list.extend(trimmed_chunk)
+            return trimmed_ingredient_string_list
+
+        return trim_ingredient_string_chunk(ingredient_string_list)
+
+    def get_parse_executor(self) -> ProcessPoolExecutor:
+        if self._parse_executor is None:
+            # Spawn instead of fork, forking a process that already loaded torch threads isn't safe
+            self._parse_executor = ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initialize_parse_worker
+            )
+        return self._parse_executor
+
+    def close(self):
+        """Shuts down the parse worker pool if it was started"""
+        if self._parse_executor is not None:
+            self._parse_executor.shutdown()
+            self._parse_executor = None
 
     @staticmethod
     def trim_ingredient_string(ingredient_string: str) -> Tuple[str, str]:
+        from ingredient_parser import parse_ingredient
+
         # Use foundation foods for extra trimming
         lower_ingredient_string = ingredient_string.lower()
         parsed_ingredient = parse_ingredient(lower_ingredient_string, foundation_foods=True)
@@ -143,10 +434,10 @@ class IngredientNormalizer:
 
     def exact_ingredient_match(self, string_to_check: str) -> bool:
         """
-        Checks the "unrolled_ingredient_strings" set for exact match.
+        Checks the ingredient vocabulary for exact match.
         Returns True if match exists, False if no match
         """
-        return string_to_check in self.unrolled_ingredient_strings
+        return string_to_check in self.vocabulary
 
     def contextual_ingredient_match(self, *args) -> str | None:
         highest_score = 0
@@ -166,84 +457,230 @@ class IngredientNormalizer:
                 highest_score = score
                 best_matched_string = matched_string
 
+        return self.resolve_contextual_match(args, best_matched_string, highest_score)
+
+    def batch_contextual_ingredient_match(self, args_list: List[Tuple]) -> List[str | None]:
+        """
+        Batched equivalent of calling contextual_ingredient_match(*args) for every entry of args_list.
+        Every unique candidate string is encoded and searched in a single call, then the best candidate per ingredient
+        is picked with one argmax over the score matrix. The first candidate wins ties, same as the per-item path.
+        """
+        if not args_list:
+            return []
+
+        # Search every unique candidate string once
+        unique_candidates = list(dict.fromkeys(
+            candidate for args in args_list for candidate in args if candidate is not None and type(candidate) is str
+        ))
+        search_results = dict(zip(unique_candidates, self.sentence_transformer.search_ingredients(unique_candidates)))
+
+        # Score matrix of ingredient x candidate, 0 where the candidate is missing or under the threshold
+        max_candidates = max(len(args) for args in args_list)
+        scores = np.zeros((len(args_list), max_candidates), dtype=np.float32)
+        for row, args in enumerate(args_list):
+            for column, candidate in enumerate(args):
+                if candidate in search_results and search_results[candidate][0] is not None:
+                    scores[row, column] = search_results[candidate][1]
+
+        best_columns = np.argmax(scores, axis=1)
+        best_scores = scores[np.arange(len(args_list)), best_columns]
+
+        matched_names = []
+        for args, best_column, best_score in zip(args_list, best_columns, best_scores):
+            best_matched_string = search_results[args[best_column]][0] if best_score > 0 else None
+            matched_names.append(self.resolve_contextual_match(args, best_matched_string, best_score))
+        return matched_names
+
+    def resolve_contextual_match(self, args: Tuple, best_matched_string: str | None, highest_score: float) -> str | None:
+        """Logs the contextual match and converts it to the top-level ingredient name"""
         if not best_matched_string:
             # Nothing found, return None
             return None
 
-        with open(IngredientNormalizer.MATCHED_INGREDIENT_LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(f"Contextal match: best score is for '{args}' is {best_matched_string} with cosine score: {highest_score}\n")
+        IngredientNormalizer.MATCH_AUDIT_LOG.write("contextual_match", query=list(args), match=best_matched_string, score=float(highest_score))
 
         # Find and return top-level ingredient name
         normalized_string = self.find_top_level_ingredient_name(best_matched_string)
         return normalized_string
 
 
+class IngredientIndex(NamedTuple):
+    """Known ingredient strings with their embeddings and FAISS index, row i of each is known_ingredients[i]"""
+    known_ingredients: List[str]
+    embeddings: np.ndarray
+    index: "faiss.Index"
+
+
 class SentenceTransformerHandler:
     COSINE_SIMILARITY_THRESHOLD = 0.75
-    UNKNOWN_INGREDIENT_LOG_FILE = Path("unknown_ingredients_scores.log")
-    OVERWRITE_LOG_FILE = True  # Removes existing log file when instantiated if True. Easier for debugging.
-
-    def __init__(self, known_ingredients: List[str]):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+    MISS_AUDIT_LOG = AuditLogWriter("unknown_ingredients_scores.log")  # Queries under the threshold with their closest candidates
 
+    def __init__(self, known_ingredients: List[str], embedding_store: EmbeddingStore | None = None, index_config: FaissIndexConfig | None = None,
+                 embedding_backend: EmbeddingBackendInterface | None = None):
+        """
+        :param index_config: type and parameters of the FAISS index, read from faiss_index_config.json if None
+        :param embedding_backend: model used to encode ingredient strings, read from embedding_backend_config.json if None
+        """
         self.known_ingredients = known_ingredients  # Keep reference to ingredient list
+        self.embedding_store = embedding_store
+        self.index_config = index_config if index_config is not None else FaissIndexConfig.load()
+        self.embedding_backend = embedding_backend if embedding_backend is not None else EmbeddingBackendFactory.load()
+
+        # The model, embeddings and index are loaded on first use, see load_model and load_index. They are published
+        # together as one IngredientIndex, so a search never mixes the strings of one version with the index of another
+        self._ingredient_index = None
+        self._load_lock = threading.Lock()
+        self._update_lock = threading.Lock()
+
+    @property
+    def index(self):
+        return self.get_ingredient_index().index
+
+    def get_ingredient_index(self) -> IngredientIndex:
+        ingredient_index = self._ingredient_index
+        if ingredient_index is None:
+            self.load_index()
+            ingredient_index = self._ingredient_index
+        return ingredient_index
+
+    def load_model(self):
+        self.embedding_backend.load()
+
+    def load_index(self):
+        with self._load_lock:
+            if self._ingredient_index is not None:
+                return
+
+            import faiss
+
+            known_ingredients = self.known_ingredients
+            index_signature = self.index_config.signature
+            stored_embeddings = self.embedding_store.load(self.embedding_backend.name, known_ingredients, index_signature) if self.embedding_store else None
+            if stored_embeddings is not None:
+                # Memory-mapped embeddings and index, nothing to encode
+                ingredient_embeddings, index = stored_embeddings
+                self.index_config.configure_index(index)
+                self._ingredient_index = IngredientIndex(known_ingredients, ingredient_embeddings, index)
+                return
+
+        # Pre-encode ingredient embeddings, reusing any previously stored embedding of an unchanged ingredient.
+        # Done outside the lock, encoding a large vocabulary takes a while
+        ingredient_embeddings = self.encode_known_ingredients(known_ingredients)
+
+        # Build FAISS index for cosine similarity search for all known ingredients, of the configured type
+        index = self.index_config.build_index(ingredient_embeddings)
+
+        with self._load_lock:
+            if self._ingredient_index is None:
+                self._ingredient_index = IngredientIndex(known_ingredients, ingredient_embeddings, index)
+                if self.embedding_store:
+                    self.embedding_store.save(self.embedding_backend.name, known_ingredients, ingredient_embeddings, index, index_signature)
+
+    def warm_up(self):
+        """Loads the model and index and runs one search so the first request doesn't pay for it"""
+        self.search_ingredients(["warm up"])
+
+    def add_ingredients(self, ingredient_strings: List[str]) -> List[str]:
+        """
+        Encodes the strings that aren't known yet and appends them to a copy of the embeddings and index, then
+        publishes the copy in one assignment. Searches running meanwhile finish on the previous version, FAISS doesn't
+        support adding to an index while it's searched, and a loaded index may be memory-mapped read only.
+        Trained index types (ivf, pq, sq) keep their trained quantizer, the new vectors are only assigned to it.
+        :return: the strings that were added
+        """
+        import faiss
+
+        with self._update_lock:
+            ingredient_index = self.get_ingredient_index()
+            known_strings = set(ingredient_index.known_ingredients)
+            new_strings = [ingredient_string for ingredient_string in dict.fromkeys(ingredient_strings) if ingredient_string not in known_strings]
+            if not new_strings:
+                return []
 
-        # Pre-encode ingredient embeddings
-        self.ingredient_embeddings = self.model.encode(
-            known_ingredients,
-            convert_to_numpy=True,
-            normalize_embeddings=True,
-            show_progress_bar=False
-        ).astype("float32")
+            new_embeddings = np.asarray(self.embedding_backend.encode(new_strings), dtype=np.float32)
+            index = faiss.deserialize_index(faiss.serialize_index(ingredient_index.index))
+            index.add(new_embeddings)
+            self.index_config.configure_index(index)
+
+            self.known_ingredients = ingredient_index.known_ingredients + new_strings
+            self._ingredient_index = IngredientIndex(self.known_ingredients, np.concatenate([ingredient_index.embeddings, new_embeddings]), index)
+
+        logger.info(f"Added {len(new_strings)} ingredient embeddings, {len(self.known_ingredients)} known ingredients")
+        return new_strings
+
+    def encode_known_ingredients(self, known_ingredients: List[str]) -> np.ndarray:
+        """
+        Encodes the known ingredient list. Strings with an embedding in the embedding store are reused, only new or
+        changed ingredients are encoded.
+        """
+        reusable_embeddings = self.embedding_store.load_reusable_embeddings(self.embedding_backend.name) if self.embedding_store else {}
+        strings_to_encode = list(dict.fromkeys(ingredient for ingredient in known_ingredients if ingredient not in reusable_embeddings))
+        logger.info(f"Encoding {len(strings_to_encode)} of {len(known_ingredients)} known ingredients")
 
-        # Build FAISS index for cosine similarity search for all known ingredients.
-        self.index = faiss.IndexFlatIP(self.ingredient_embeddings.shape[1])
-        self.index.add(self.ingredient_embeddings)
+        new_embeddings = {}
+        if strings_to_encode:
+            encoded = self.embedding_backend.encode(strings_to_encode)
+            new_embeddings = dict(zip(strings_to_encode, encoded))
 
-        if SentenceTransformerHandler.OVERWRITE_LOG_FILE:
-            SentenceTransformerHandler.UNKNOWN_INGREDIENT_LOG_FILE.unlink(missing_ok=True)
+        return np.array([
+            new_embeddings[ingredient] if ingredient in new_embeddings else reusable_embeddings[ingredient]
+            for ingredient in known_ingredients
+        ], dtype=np.float32)
 
     def search_ingredient(self, query, k=5, debug_print=False) -> Tuple[str, float] | Tuple[None, None]:
-        # Encode query embedding
-        query_embedding = self.model.encode(
-            [query],
-            convert_to_numpy=True,
-            normalize_embeddings=True,
-            show_progress_bar=False
-        ).astype("float32")
-
-        # FAISS similarity search
-        scores, indices = self.index.search(query_embedding, k)
-
-        if debug_print:
-            print(f"\nQuery: '{query}'")
-            for rank, (score, idx) in enumerate(zip(scores[0], indices[0]), start=1):
-                print(f"{rank}. {self.known_ingredients[idx]} (score: {score:.4f})")
-
-        # Filter out anything below score threshold.
-        highest_score = scores[0][0]
-        if highest_score < self.COSINE_SIMILARITY_THRESHOLD:
-            log_string = f"QUERY FOR INGREDIENT: '{query}'\n"
-            for rank, (score, idx) in enumerate(zip(scores[0], indices[0]), start=1):
-                log_string += f"{rank}. {self.known_ingredients[idx]} (score: {score:.4f})\n"
-            log_string += "\n\n"
-            self.log_ingredient_miss(log_string, write_to_console=True)
-            return None, None
-
-        # Return string with the highest score and the score value
-        highest_score_idx = indices[0][0]
-        return self.known_ingredients[highest_score_idx], highest_score
+        return self.search_ingredients([query], k, debug_print)[0]
 
-    @staticmethod
-    def log_ingredient_miss(log_message: str, write_to_console: bool = False):
-        if write_to_console:
-            print(log_message)
+    def search_ingredients(self, queries: List[str], k=5, debug_print=False) -> List[Tuple[str, float] | Tuple[None, None]]:
+        """
+        Searches the closest known ingredient for every query with a single encode and a single FAISS search.
+        Returns one (matched string, score) tuple per query, (None, None) if the best score is under the threshold.
+        """
+        if not queries:
+            return []
+
+        # Encode all query embeddings at once
+        ENCODE_BATCH_SIZE.observe(len(queries))
+        with ENCODE_SECONDS.time():
+            query_embeddings = self.embedding_backend.encode(queries)
+
+        # FAISS similarity search, candidates of approximate indexes are re-scored exactly so the threshold below holds
+        ingredient_index = self.get_ingredient_index()
+        known_ingredients = ingredient_index.known_ingredients
+        with INDEX_SEARCH_SECONDS.time():
+            scores, indices = self.index_config.search(ingredient_index.index, ingredient_index.embeddings, query_embeddings, k)
+
+        results = []
+        for query, query_scores, query_indices in zip(queries, scores, indices):
+            if debug_print:
+                print(f"\nQuery: '{query}'")
+                for rank, (score, idx) in enumerate(zip(query_scores, query_indices), start=1):
+                    if idx >= 0:
+                        print(f"{rank}. {known_ingredients[idx]} (score: {score:.4f})")
+
+            # Filter out anything below score threshold.
+            highest_score = query_scores[0]
+            if highest_score < self.COSINE_SIMILARITY_THRESHOLD:
+                candidates = [(known_ingredients[idx], float(score)) for score, idx in zip(query_scores, query_indices) if idx >= 0]
+                self.log_ingredient_miss(query, candidates)
+                results.append((None, None))
+                continue
 
-        with open(SentenceTransformerHandler.UNKNOWN_INGREDIENT_LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(log_message)
+            # Keep string with the highest score and the score value
+            results.append((known_ingredients[query_indices[0]], highest_score))
+
+        return results
+
+    @staticmethod
+    def log_ingredient_miss(query: str, candidates: List[Tuple[str, float]]):
+        """Records a query without a match above the threshold, with its closest known ingredients and their scores"""
+        logger.debug(f"No ingredient above threshold for '{query}', closest: {candidates[:1]}")
+        SentenceTransformerHandler.MISS_AUDIT_LOG.write("ingredient_miss", query=query,
+                                                        candidates=[{"ingredient": ingredient, "score": score} for ingredient, score in candidates])
 
 
 if __name__ == "__main__":
+    from tests.ingredient_testing.raw_json_ingredient_reader import RawJsonIngredientReader
+
     ingredient_strings = [
         "1 teaspoon Mexican oregano",
         "2 tablespoons packed light brown sugar",
@@ -274,3 +711,23 @@ if __name__ == "__main__":
 
     generated_ingredient_string_list, unmatched_ingredient_list = ingredient_normalizer.generate_normalized_ingredients(ingredient_strings)
     print(generated_ingredient_string_list)
+
+    # Compare per-item and batched contextual matching on the sample list and on whole scraped recipes
+    recipe_output_path = Path(__file__).resolve().parent / "config" / "recipe_output.json"
+    with open(recipe_output_path, "r") as file:
+        scraped_recipes = [[ingredient["original"] for ingredient in recipe["extendedIngredients"]] for recipe in json.load(file)["recipes"]]
+
+    for sample_name, samples in [("sample list", [ingredient_strings]), ("scraped recipes", scraped_recipes)]:
+        timings = {}
+        outputs = {}
+        for batch in (False, True):
+            # Fresh normalizer for every pass, a shared one would serve the second pass from its normalization cache
+            timed_normalizer = IngredientNormalizer(raw_ingredient_reader)
+            timed_normalizer.warm_up()
+            start = time.perf_counter()
+            outputs[batch] = [timed_normalizer.normalize_ingredient_strings(sample, batch=batch) for sample in samples]
+            timings[batch] = time.perf_counter() - start
+            timed_normalizer.close()
+
+        print(f"{sample_name}: per-item {timings[False]:.3f}s, batched {timings[True]:.3f}s, "
+              f"speedup {timings[False] / timings[True]:.2f}x, outputs match: {outputs[False] == outputs[True]}")
@@ -0,0 +1,84 @@
+import hashlib
+import json
+from typing import Dict, List
+
+import logging_config, logging
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+class IngredientVocabulary:
+    """
+    Precomputed lookup structures for the known ingredients.
+    Maps every ingredient name and alias to its top-level (canonical) ingredient name in a single dict,
+    which is used both for exact match membership checks and for resolving aliases.
+    """
+    def __init__(self, all_ingredients: List[Dict]):
+        """
+        :param all_ingredients: ingredients in the format returned by IngredientReaderInterface.get_all_ingredients
+        { "name": "ingredient_name", "alias": [] }
+        """
+        self.alias_to_canonical: Dict[str, str] = {}  # Ingredient name or alias -> top-level ingredient name
+        self.canonical_to_aliases: Dict[str, List[str]] = {}  # Top-level ingredient name -> its aliases
+        self.conflicting_aliases: Dict[str, List[str]] = {}  # String -> every top-level name it was declared under
+        self.version = None
+
+        self._add_ingredients(all_ingredients)
+
+    def with_ingredients(self, new_ingredients: List[Dict]) -> "IngredientVocabulary":
+        """
+        Returns a copy of this vocabulary with new_ingredients added, this one is left unchanged for readers still
+        holding it. An ingredient with an existing top-level name adds aliases to that ingredient.
+        :param new_ingredients: ingredients in the same format as the constructor's
+        """
+        vocabulary = IngredientVocabulary([])
+        vocabulary.alias_to_canonical = dict(self.alias_to_canonical)
+        vocabulary.canonical_to_aliases = {canonical_name: list(aliases) for canonical_name, aliases in self.canonical_to_aliases.items()}
+        vocabulary.conflicting_aliases = {ingredient_string: list(canonical_names) for ingredient_string, canonical_names in self.conflicting_aliases.items()}
+        vocabulary._add_ingredients(new_ingredients)
+        return vocabulary
+
+    def _add_ingredients(self, ingredients: List[Dict]):
+        conflict_count = len(self.conflicting_aliases)
+        for ingredient_dict in ingredients:
+            canonical_name = ingredient_dict["name"]
+            aliases = ingredient_dict.get("alias", [])
+            known_aliases = self.canonical_to_aliases.setdefault(canonical_name, [])
+            known_aliases.extend([alias for alias in aliases if alias not in known_aliases])
+
+            for ingredient_string in [canonical_name, *aliases]:
+                self._add_mapping(ingredient_string, canonical_name)
+
+        if len(self.conflicting_aliases) > conflict_count:
+            logger.warning(f"Found {len(self.conflicting_aliases)} conflicting ingredient aliases: {self.conflicting_aliases}")
+
+        # Content hash of the lookup table, changes whenever an ingredient or alias is added, removed or remapped
+        serialized_lookup = json.dumps(sorted(self.alias_to_canonical.items()), ensure_ascii=False)
+        self.version = hashlib.sha256(serialized_lookup.encode("utf-8")).hexdigest()
+
+    def _add_mapping(self, ingredient_string: str, canonical_name: str):
+        existing_canonical_name = self.alias_to_canonical.get(ingredient_string)
+        if existing_canonical_name is None:
+            self.alias_to_canonical[ingredient_string] = canonical_name
+        elif existing_canonical_name != canonical_name:
+            # First declaration wins, matching the order of the ingredient list
+            self.conflicting_aliases.setdefault(ingredient_string, [existing_canonical_name]).append(canonical_name)
+
+    def __contains__(self, ingredient_string: str) -> bool:
+        return ingredient_string in self.alias_to_canonical
+
+    def __len__(self) -> int:
+        return len(self.alias_to_canonical)
+
+    def get_canonical_name(self, ingredient_string: str) -> str | None:
+        """Returns the top-level ingredient name for an ingredient name or alias, None if it isn't known"""
+        return self.alias_to_canonical.get(ingredient_string)
+
+    def get_all_ingredients(self) -> List[Dict]:
+        """Ingredients in the constructor's format, one entry per top-level name holding every alias added to it"""
+        return [{"name": canonical_name, "alias": list(aliases)} for canonical_name, aliases in self.canonical_to_aliases.items()]
+
+    def get_aliases(self, canonical_name: str) -> List[str]:
+        """Returns the aliases declared for a top-level ingredient name"""
+        return self.canonical_to_aliases.get(canonical_name, [])
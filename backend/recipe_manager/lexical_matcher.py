@@ -0,0 +1,106 @@
+import copy
+from typing import List, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+
+from recipe_manager.ingredient_vocabulary import IngredientVocabulary
+import logging_config, logging
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+class LexicalMatcher:
+    """
+    Fuzzy string matching of ingredient names against the known ingredient strings, for typos, plurals, hyphenation
+    and word order ("parmesan chese", "tomatoes", "lower-sodium beef broth", "pepper black").
+    Strings are lower cased, stripped of punctuation and plural "s" and compared with a word order insensitive ratio.
+    A match is only conclusive if it scores at least score_cutoff and beats the best string of any other top-level
+    ingredient by at least margin; anything else is left to the contextual (embedding) matching.
+    """
+    DEFAULT_SCORE_CUTOFF = 90.0
+    DEFAULT_MARGIN = 4.0
+    MINIMUM_QUERY_LENGTH = 5  # Shorter strings are too close to too many others ("rice" and "ice"), left to the model
+
+    def __init__(self, vocabulary: IngredientVocabulary, score_cutoff: float = DEFAULT_SCORE_CUTOFF,
+                 margin: float = DEFAULT_MARGIN, workers: int = 1):
+        """
+        :param score_cutoff: minimum score from 0 to 100 of a conclusive match
+        :param margin: minimum score difference between the best match and the best match of another top-level ingredient
+        :param workers: threads used to score a batch of strings, -1 for all cores
+        """
+        self.vocabulary = vocabulary
+        self.score_cutoff = score_cutoff
+        self.margin = margin
+        self.workers = workers
+
+        # Every known string once, with the id of its top-level ingredient to compare the best matches of different ingredients
+        self.known_strings = list(vocabulary.alias_to_canonical)
+        self._canonical_ids = {}  # Top-level ingredient name -> id
+        self.canonical_ids = self._get_canonical_ids(self.known_strings)
+        self.processed_known_strings = [self.process_string(known_string) for known_string in self.known_strings]
+
+    def with_vocabulary(self, vocabulary: IngredientVocabulary, new_strings: List[str]) -> "LexicalMatcher":
+        """
+        Returns a matcher over vocabulary, which extends this matcher's vocabulary with new_strings. Only the new
+        strings are processed, this matcher is left unchanged for readers still holding it.
+        """
+        lexical_matcher = copy.copy(self)
+        lexical_matcher.vocabulary = vocabulary
+        lexical_matcher._canonical_ids = dict(self._canonical_ids)
+        lexical_matcher.known_strings = self.known_strings + new_strings
+        lexical_matcher.canonical_ids = np.concatenate([self.canonical_ids, lexical_matcher._get_canonical_ids(new_strings)])
+        lexical_matcher.processed_known_strings = self.processed_known_strings + [self.process_string(new_string) for new_string in new_strings]
+        return lexical_matcher
+
+    def _get_canonical_ids(self, known_strings: List[str]) -> np.ndarray:
+        return np.array([
+            self._canonical_ids.setdefault(self.vocabulary.get_canonical_name(known_string), len(self._canonical_ids))
+            for known_string in known_strings
+        ], dtype=np.int64)
+
+    @property
+    def signature(self) -> str:
+        """Identifies the matching parameters, part of the normalization cache version"""
+        return f"lexical-{self.score_cutoff}-{self.margin}"
+
+    @staticmethod
+    def process_string(string: str) -> str:
+        """Lower cases, replaces punctuation with spaces and drops a trailing 's' of every word longer than 3 letters"""
+        return " ".join(word[:-1] if len(word) > 3 and word.endswith("s") else word for word in utils.default_process(string).split())
+
+    def match_strings(self, strings: List[str]) -> List[Tuple[str, float] | Tuple[None, None]]:
+        """
+        Scores every string against every known string in a single vectorized call.
+        Returns one (matched known string, score) tuple per string, (None, None) if no match is conclusive.
+        """
+        if not strings:
+            return []
+
+        # Scores under score_cutoff - margin can't change the outcome, rapidfuzz reports them as 0 and skips most of the work
+        scores = process.cdist(
+            [self.process_string(string) for string in strings],
+            self.processed_known_strings,
+            scorer=fuzz.token_sort_ratio,
+            score_cutoff=max(0.0, self.score_cutoff - self.margin),
+            workers=self.workers
+        )
+
+        best_columns = np.argmax(scores, axis=1)
+        results = []
+        for string, row, best_column in zip(strings, scores, best_columns):
+            best_score = float(row[best_column])
+            if len(string) < LexicalMatcher.MINIMUM_QUERY_LENGTH or best_score < self.score_cutoff:
+                results.append((None, None))
+                continue
+
+            # Best score of any string of another top-level ingredient, aliases of the same ingredient don't compete
+            runner_up_score = float(np.max(row, where=self.canonical_ids != self.canonical_ids[best_column], initial=0))
+            if best_score - runner_up_score < self.margin:
+                logger.debug(f"Inconclusive lexical match for '{string}': {self.known_strings[best_column]} ({best_score:.1f}), runner up {runner_up_score:.1f}")
+                results.append((None, None))
+                continue
+
+            results.append((self.known_strings[best_column], best_score))
+        return results
@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+import logging_config, logging
+from recipe_manager.lru_cache import LRUCache
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+class LinkChecker:
+    """
+    Checks whether recipe source URLs are still live, concurrently on a bounded thread pool.
+    All requests share one pooled session so connections to the same host are reused, each host has its own
+    concurrency limit, and URLs verified as live are cached for cache_ttl_seconds so they aren't re-checked.
+    """
+    DEFAULT_MAX_WORKERS = 16
+    DEFAULT_MAX_REQUESTS_PER_HOST = 2
+    DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) timeout in seconds
+    DEFAULT_CACHE_TTL_SECONDS = 24 * 60 * 60
+    DEFAULT_CACHE_SIZE = 10000
+    HEAD_REJECTED_STATUS_CODES = {403, 405, 501}  # Status codes of servers that don't accept HEAD requests, retried with GET
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, max_requests_per_host: int = DEFAULT_MAX_REQUESTS_PER_HOST,
+                 timeout: tuple = DEFAULT_TIMEOUT, cache_ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS):
+        self.max_requests_per_host = max_requests_per_host
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="link_checker")
+        self.live_url_cache = LRUCache(LinkChecker.DEFAULT_CACHE_SIZE, cache_ttl_seconds)
+
+        self._host_semaphores = {}
+        self._host_semaphores_lock = threading.Lock()
+
+    def check_urls(self, urls: List[str]) -> Dict[str, bool]:
+        """
+        Checks every URL concurrently
+        :param urls: URLs to check
+        :return: dict of URL -> True if the URL responded with status code 200
+        """
+        results = {}
+        urls_to_check = []
+        for url in dict.fromkeys(urls):
+            if self.live_url_cache.get(url):
+                results[url] = True
+            else:
+                urls_to_check.append(url)
+
+        for url, is_live in zip(urls_to_check, self.executor.map(self.is_url_live, urls_to_check)):
+            results[url] = is_live
+            if is_live:
+                self.live_url_cache.put(url, True)
+
+        logger.info(f"Checked {len(urls_to_check)} URLs ({len(results) - len(urls_to_check)} cached), {sum(results.values())} live")
+        return results
+
+    def is_url_live(self, url: str) -> bool:
+        """Sends a HEAD request to url, falling back to GET for servers that reject HEAD"""
+        with self._get_host_semaphore(url):
+            try:
+                response = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+                if response.status_code in LinkChecker.HEAD_REJECTED_STATUS_CODES:
+                    # Stream so only the headers are read, the body isn't needed
+                    with self.session.get(url, allow_redirects=True, timeout=self.timeout, stream=True) as response:
+                        return response.status_code == 200
+                return response.status_code == 200
+            except requests.RequestException as e:
+                logger.debug(f"Link check failed for '{url}': {e}")
+                return False
+
+    def close(self):
+        self.executor.shutdown()
+        self.session.close()
+
+    def _get_host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._host_semaphores_lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.max_requests_per_host)
+            return self._host_semaphores[host]
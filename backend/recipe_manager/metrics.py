@@ -0,0 +1,188 @@
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# Upper bounds of the latency histograms in seconds, from sub-millisecond lookups to multi-second model loads
+DEFAULT_LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the batch size histograms
+DEFAULT_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class Metric:
+    """
+    Base of the in-process metrics. Values are kept per combination of label values, recording is a dict update under
+    a lock and all formatting happens in render, so instrumented code pays next to nothing when nobody scrapes.
+    """
+    TYPE = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str, label_names: List[str] | Tuple[str, ...] = ()):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _get_key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric '{self.name}' expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[label_name]) for label_name in self.label_names)
+
+    def _format_labels(self, key: tuple, extra_labels: Dict[str, str] | None = None) -> str:
+        label_pairs = list(zip(self.label_names, key)) + list((extra_labels or {}).items())
+        if not label_pairs:
+            return ""
+        escaped = (f'{label_name}="{escape_label_value(value)}"' for label_name, value in label_pairs)
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {escape_help_text(self.help_text)}", f"# TYPE {self.name} {self.TYPE}"]
+        with self._lock:
+            values = [(key, self._copy_value(value)) for key, value in self._values.items()]
+        for key, value in sorted(values):
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _copy_value(self, value):
+        return value
+
+    def _render_value(self, key: tuple, value) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing count, e.g. requests served or ingredients matched"""
+    TYPE = "counter"
+
+    def increment(self, amount: float = 1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._get_key(labels), 0)
+
+    def _render_value(self, key: tuple, value) -> List[str]:
+        return [f"{self.name}{self._format_labels(key)} {format_number(value)}"]
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets, with their sum and count, e.g. stage latencies"""
+    TYPE = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str, label_names: List[str] | Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(registry, name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._get_key(labels)
+        # Buckets are inclusive upper bounds, values above the last one only count towards +Inf
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bucket_index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the with block in seconds"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def get_count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._get_key(labels))
+            return state[2] if state else 0
+
+    def get_sum(self, **labels) -> float:
+        with self._lock:
+            state = self._values.get(self._get_key(labels))
+            return state[1] if state else 0.0
+
+    def _copy_value(self, value):
+        return [list(value[0]), value[1], value[2]]
+
+    def _render_value(self, key: tuple, value) -> List[str]:
+        bucket_counts, total, count = value
+        lines = []
+        cumulative_count = 0
+        for upper_bound, bucket_count in zip([*self.buckets, "+Inf"], bucket_counts):
+            cumulative_count += bucket_count
+            bound = upper_bound if isinstance(upper_bound, str) else format_number(upper_bound)
+            lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': bound})} {cumulative_count}")
+        lines.append(f"{self.name}_sum{self._format_labels(key)} {format_number(total)}")
+        lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    All metrics of the process, rendered in the Prometheus text exposition format by render.
+    Metrics are created once at module level with counter or histogram, asking again for the same name returns the
+    existing metric. Recording is skipped entirely if the registry is disabled.
+    """
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, label_names: List[str] | Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, label_names)
+
+    def histogram(self, name: str, help_text: str, label_names: List[str] | Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def _get_or_create(self, metric_class, name: str, help_text: str, label_names, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(self, name, help_text, label_names, **kwargs)
+            elif type(metric) is not metric_class or metric.label_names != tuple(label_names):
+                raise ValueError(f"Metric '{name}' is already registered as a {metric.TYPE} with labels {metric.label_names}")
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in sorted(metrics, key=lambda metric: metric.name):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def escape_help_text(help_text: str) -> str:
+    return help_text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_number(value: float) -> str:
+    if math.isfinite(value) and value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+# Registry shared by the whole process, recording can be turned off with RECIPE_APP_METRICS=0
+REGISTRY = MetricsRegistry(enabled=os.getenv("RECIPE_APP_METRICS", "1") == "1")
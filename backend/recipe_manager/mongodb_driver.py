@@ -1,24 +1,63 @@
 import json
 import os
+from datetime import timedelta
 import logging_config, logging
+from bson import ObjectId
+from pymongo import ReturnDocument
 from pymongo.errors import BulkWriteError
 from pymongo.mongo_client import MongoClient
+from pymongo.monitoring import CommandListener
 from pymongo.server_api import ServerApi
 
+from recipe_manager.metrics import REGISTRY
+
 
 # Number of recipes to return from the recipe retrieval
 NUMBER_RECIPES_TO_RETURN = 1
 
+# MongoDB error code for unique index violations
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+# Config item holding the recipe corpus version, incremented whenever recipes are inserted
+CORPUS_VERSION_CONFIG_ITEM = "corpusVersion"
+
+# ObjectIds are created by each inserting client and start with its clock's time, so recipes inserted by another process
+# may sort slightly before the newest recipe already seen. Recipes this much older are fetched again, see get_recipes_inserted_after
+RECIPE_ID_OVERLAP_SECONDS = 60
+
+# Config item holding the pantry essentials, { "config_item", "ingredients_list", "version" }
+PANTRY_ESSENTIALS_CONFIG_ITEM = "pantryEssentials"
+
+# Config item holding ingredients and aliases added while the API runs, { "config_item", "ingredients", "version" }
+INGREDIENT_ADDITIONS_CONFIG_ITEM = "ingredientAdditions"
+
 # Get logger instance
 logger = logging.getLogger(__name__)
 
+COMMAND_SECONDS = REGISTRY.histogram("database_command_seconds", "Round-trip time of each MongoDB command, one observation per round-trip", ["command"])
+COMMAND_FAILURES = REGISTRY.counter("database_command_failures_total", "MongoDB commands that failed", ["command"])
+
+
+class DatabaseCommandMetrics(CommandListener):
+    """
+    Records every command the MongoDB client sends, including getMore round-trips of large cursors, so the number and
+    time of round-trips per request can be read from /metrics. Registered on both the blocking and the async client.
+    """
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event):
+        COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+        COMMAND_FAILURES.increment(command=event.command_name)
+
 
 class DatabaseDriver:
     def __init__(self):
         # Load Config file
-        config_path = os.path.join(os.path.dirname(__file__), 'config', 'mongo_config.json')
-        with open(config_path, 'r') as file:
-            config_data = json.load(file)
+        config_data = self.load_mongo_config()
 
         try:
             # Connect to MongoDB (use the default host and port)
@@ -33,47 +72,199 @@ class DatabaseDriver:
             if self.recipe_list_collection_name not in self.db.list_collection_names():
                 logger.info(f"Collection {self.recipe_list_collection_name} does not exist, creating with unique index")
                 self.db[self.recipe_list_collection_name].create_index("source_url", unique=True)
-                self.db[self.recipe_list_collection_name].create_index("ingredients")
+
+            # Indexes added after the collection was created, creating an index that already exists is a no-op
+            self.db[self.recipe_list_collection_name].create_index("ingredients")
+            self.db[self.recipe_list_collection_name].create_index("ingredient_count")
 
             # Set up all collection objects
             self.config_collection = self.db[self.config_collection_name]
             self.recipe_collection = self.db[self.recipe_list_collection_name]
             self.normalized_ingredients_collection = self.db[self.normalized_ingredients_name]
+
+            # Callbacks notified with the list of recipes that were actually inserted by insert_recipe_list
+            self.recipe_insert_listeners = []
+
+            # Last known version of the recipe corpus, used to invalidate cached query results
+            self.corpus_version = 0
+            self.get_corpus_version()
         except Exception as e:
             error_msg = f"MongoDB Error: {str(e)}"
             logger.error(error_msg)
             raise RuntimeError(error_msg)
 
-    def insert_recipe_list(self, recipe_list):
+    def insert_recipe_list(self, recipe_list) -> dict:
+        """
+        Inserts the recipes, skipping any recipe whose source URL already exists
+        :param recipe_list: list of recipe dicts to insert
+        :return: insertion report in the format below
+        {
+            "inserted": list[source_url],
+            "duplicates": list[source_url],
+            "failed": list[source_url]
+        }
+        """
+        recipe_documents = self.prepare_recipes_for_insert(recipe_list)
+
+        inserted_recipes = []
+        duplicate_indexes = set()
+        failed_indexes = set()
         try:
             # Insert entire provided recipe list, not inserting any duplicate entries (ordered=False)
-            result = self.recipe_collection.insert_many(recipe_list, ordered=False)
-            logger.info(f"Inserted {len(recipe_list)} new recipes")
+            result = self.recipe_collection.insert_many(recipe_documents, ordered=False)
+            inserted_recipes = recipe_list
         except BulkWriteError as bwe:
-            logger.info(f"{type(bwe)} occurred, likely due to duplicate source URLs. Rest of recipes still written")
+            duplicate_indexes, failed_indexes = self.get_bulk_write_error_indexes(bwe)
+            inserted_recipes = [recipe for index, recipe in enumerate(recipe_list) if index not in duplicate_indexes | failed_indexes]
         except Exception as e:
             # Print the type of the exception and the exception message
             logger.error(f"Exception type: {type(e)}")
             logger.error(f"Exception message: {e}")
+            failed_indexes = set(range(len(recipe_list)))
+
+        insert_report = self.build_insert_report(recipe_list, inserted_recipes, duplicate_indexes, failed_indexes)
+
+        if inserted_recipes:
+            self.increment_corpus_version()
+            for listener in self.recipe_insert_listeners:
+                listener(inserted_recipes)
 
-    def insert_pantry_essentials(self, ingredient_list: dict):
+        return insert_report
+
+    @staticmethod
+    def prepare_recipes_for_insert(recipe_list: list[dict]) -> list[dict]:
+        """
+        Builds the documents to insert, leaving the caller's recipe dicts untouched (insert_many also sets "_id" on them)
+        :return: copy of each recipe with the number of unique ingredients precomputed, so ranked queries don't have to
+        size the array per document
+        """
+        return [{**recipe, "ingredient_count": len(set(recipe["ingredients"]))} for recipe in recipe_list]
+
+    @staticmethod
+    def build_insert_report(recipe_list: list[dict], inserted_recipes: list[dict], duplicate_indexes: set[int], failed_indexes: set[int]) -> dict:
+        """Builds and logs the insertion report returned by insert_recipe_list"""
+        insert_report = {
+            "inserted": [recipe["source_url"] for recipe in inserted_recipes],
+            "duplicates": [recipe_list[index]["source_url"] for index in sorted(duplicate_indexes)],
+            "failed": [recipe_list[index]["source_url"] for index in sorted(failed_indexes)]
+        }
+        logger.info(f"Inserted {len(insert_report['inserted'])} new recipes, skipped {len(insert_report['duplicates'])} duplicates, "
+                    f"{len(insert_report['failed'])} failed")
+        if insert_report["duplicates"]:
+            logger.info(f"Duplicate source URLs: {insert_report['duplicates']}")
+        if insert_report["failed"]:
+            logger.error(f"Failed to insert source URLs: {insert_report['failed']}")
+        return insert_report
+
+    @staticmethod
+    def get_bulk_write_error_indexes(bulk_write_error: BulkWriteError) -> tuple[set[int], set[int]]:
+        """
+        Splits the failed writes of an unordered insert_many into duplicate key errors and other errors
+        :return: (indexes of duplicate recipes, indexes of recipes that failed for another reason)
+        """
+        duplicate_indexes = set()
+        failed_indexes = set()
+        for write_error in bulk_write_error.details.get("writeErrors", []):
+            if write_error.get("code") == DUPLICATE_KEY_ERROR_CODE:
+                duplicate_indexes.add(write_error["index"])
+            else:
+                failed_indexes.add(write_error["index"])
+        return duplicate_indexes, failed_indexes
+
+    def increment_corpus_version(self) -> int:
+        """
+        Atomically increments the stored corpus version so every process caching query results sees the change
+        :return: new corpus version
+        """
+        try:
+            corpus_version_item = self.config_collection.find_one_and_update(
+                {"config_item": CORPUS_VERSION_CONFIG_ITEM},
+                {"$inc": {"version": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            self.corpus_version = corpus_version_item["version"]
+        except Exception as e:
+            # Still invalidate this process' caches
+            logger.error(f"Exception message: {e}")
+            self.corpus_version += 1
+        return self.corpus_version
+
+    def get_corpus_version(self) -> int:
+        """Reads the stored corpus version, keeping the last known version if it can't be read"""
+        try:
+            corpus_version_item = self.config_collection.find_one({"config_item": CORPUS_VERSION_CONFIG_ITEM})
+            if corpus_version_item is not None:
+                self.corpus_version = corpus_version_item["version"]
+        except Exception as e:
+            logger.error(f"Exception message: {e}")
+        return self.corpus_version
+
+    def add_recipe_insert_listener(self, listener):
+        """
+        Registers a callback that is called with the list of newly inserted recipes after each insert_recipe_list call
+        :param listener: callable taking a list of recipe dicts
+        """
+        self.recipe_insert_listeners.append(listener)
+
+    def get_all_recipes(self, projection: dict | None = None) -> list[dict]:
+        """
+        Retrieves every recipe in the recipe collection
+        :param projection: optional MongoDB projection to limit the returned fields
+        :return: list of recipe dicts
+        """
+        return list(self.recipe_collection.find({}, projection))
+
+    def get_recipes_inserted_after(self, recipe_id: ObjectId | None, projection: dict | None = None) -> list[dict]:
+        """
+        Retrieves the recipes inserted after the recipe with _id recipe_id, used to catch up an in-process corpus with
+        recipes inserted by other processes. Recipes up to RECIPE_ID_OVERLAP_SECONDS older may be returned again.
+        :param recipe_id: newest _id already seen, every recipe is returned if None
+        :param projection: optional MongoDB projection to limit the returned fields, _id is always returned
+        :return: list of recipe dicts
+        """
+        return list(self.recipe_collection.find(DatabaseDriver.build_recipes_inserted_after_filter(recipe_id), projection))
+
+    @staticmethod
+    def build_recipes_inserted_after_filter(recipe_id: ObjectId | None) -> dict:
+        """Filter on the creation time leading every ObjectId, served by the _id index"""
+        if recipe_id is None:
+            return {}
+        since = recipe_id.generation_time - timedelta(seconds=RECIPE_ID_OVERLAP_SECONDS)
+        return {"_id": {"$gt": ObjectId.from_datetime(since)}}
+
+    def insert_pantry_essentials(self, ingredient_list: dict) -> dict | None:
         """
         Inserts an ingredient list to be stored as pantry essentials
         :param ingredient_list: dict containing list of ingredients
+        :return: stored config item, see insert_config_item
         """
-        self.insert_config_item("pantryEssentials", ingredient_list)
+        return self.insert_config_item(PANTRY_ESSENTIALS_CONFIG_ITEM, ingredient_list)
 
     def get_pantry_essentials(self):
         """
         Retrieves pantry essentials from database
         :return: dict holding list of ingredients
         """
+        return self.get_config_item(PANTRY_ESSENTIALS_CONFIG_ITEM)
+
+    def get_config_item(self, item_name: str) -> dict | None:
+        """Retrieves a config item, None if it doesn't exist or can't be read"""
         try:
-            return self.config_collection.find_one({"config_item": "pantryEssentials"})
+            return self.config_collection.find_one({"config_item": item_name})
         except Exception as e:
             # Print the type of the exception and the exception message
             logger.error(f"Exception occurred: {e}")
 
+    def get_config_item_version(self, item_name: str) -> int | None:
+        """
+        Reads only the version stamp of a config item, used to check a cached copy without transferring the item.
+        Errors are raised so a cache can tell them apart from a missing item.
+        :return: version, 0 for items written before versioning, None if the item doesn't exist
+        """
+        config_item = self.config_collection.find_one({"config_item": item_name}, {"version": 1})
+        return None if config_item is None else config_item.get("version", 0)
+
     def get_normalized_ingredients(self):
         """
         Retrieves normalized ingredients from database
@@ -96,19 +287,74 @@ class DatabaseDriver:
 
         self.normalized_ingredients_collection.insert_one(new_normalized_ingredient)
 
-    def insert_config_item(self, item_name: str, dict_to_insert: dict):
+    def insert_config_item(self, item_name: str, dict_to_insert: dict) -> dict | None:
+        """
+        Stores the fields of dict_to_insert on the config item and increments its version stamp in one atomic upsert,
+        so concurrent writers can't leave the item missing or duplicated and caches can detect the change
+        :return: stored config item, None if the write failed
+        """
         if type(dict_to_insert) is not dict:
             raise TypeError(f"Expected parameter to be of type 'dict' but got {type(dict_to_insert).__name__}")
 
         try:
-            # Delete existing item and add new item
-            self.config_collection.delete_one({"config_item": item_name})
-            result = self.config_collection.insert_one(dict_to_insert)
-            logger.info(f"Inserted item with ID: {result.inserted_id}")
+            config_item = self.config_collection.find_one_and_update(
+                {"config_item": item_name},
+                self.build_config_item_update(dict_to_insert),
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            logger.info(f"Stored config item '{item_name}' version {config_item['version']}")
+            return config_item
         except Exception as e:
             logger.error(f"Exception message: {e}")
 
+    def append_to_config_item(self, item_name: str, field: str, values: list) -> dict | None:
+        """
+        Appends values to a list field of the config item and increments its version stamp in one atomic upsert,
+        concurrent appends are all kept
+        :return: stored config item, None if the write failed
+        """
+        try:
+            config_item = self.config_collection.find_one_and_update(
+                {"config_item": item_name},
+                {"$push": {field: {"$each": values}}, "$inc": {"version": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            logger.info(f"Appended {len(values)} values to config item '{item_name}' version {config_item['version']}")
+            return config_item
+        except Exception as e:
+            logger.error(f"Exception message: {e}")
+
+    @staticmethod
+    def build_config_item_update(dict_to_insert: dict) -> dict:
+        """Update document of insert_config_item, the name, ID and version stamp are never taken from the caller"""
+        fields = {field: value for field, value in dict_to_insert.items() if field not in ("_id", "config_item", "version")}
+        update = {"$inc": {"version": 1}}
+        if fields:
+            update["$set"] = fields
+        return update
+
     def get_ingredient_set_difference(self, ingredient_list: list[str]):
+        return list(self.recipe_collection.aggregate(self.build_ingredient_set_difference_pipeline(ingredient_list)))
+
+    def get_ranked_recipes(self, ingredient_list: list[str], num_missing_ingredients_allowed: int, number_of_recipes: int, page: int = 0):
+        """
+        Ranks recipes by number of missing ingredients, only touching recipes that share at least one ingredient with
+        ingredient_list or are short enough to fit the budget without any. The multikey "ingredients" index and the
+        "ingredient_count" index back the initial $match, and the missing ingredient budget is applied before the sort
+        so only candidate documents are sorted.
+        :param ingredient_list: normalized ingredient names the user has
+        :param num_missing_ingredients_allowed: maximum number of missing ingredients for a recipe to be returned
+        :param number_of_recipes: page size
+        :param page: zero-based page index
+        :return: list of recipe dicts with "difference_ingredients" and "difference_count" added
+        """
+        pipeline = self.build_ranked_recipes_pipeline(ingredient_list, num_missing_ingredients_allowed, number_of_recipes, page)
+        return list(self.recipe_collection.aggregate(pipeline))
+
+    @staticmethod
+    def build_ingredient_set_difference_pipeline(ingredient_list: list[str]) -> list[dict]:
         # Define pipeline for aggregation
         pipeline = [
             {
@@ -133,23 +379,100 @@ class DatabaseDriver:
                 "$limit": NUMBER_RECIPES_TO_RETURN
             }
         ]
-        return list(self.recipe_collection.aggregate(pipeline))
+        return pipeline
+
+    @staticmethod
+    def build_ranked_recipes_pipeline(ingredient_list: list[str], num_missing_ingredients_allowed: int, number_of_recipes: int, page: int = 0) -> list[dict]:
+        """Aggregation pipeline used by get_ranked_recipes, shared with the async driver"""
+        pipeline = [
+            # Index-backed match, only recipes sharing at least one ingredient, or missing all of theirs within the
+            # budget. Recipes without ingredient_count (not backfilled yet) can't be ruled out by size
+            {
+                "$match": {"$or": [
+                    {"ingredients": {"$in": ingredient_list}},
+                    {"ingredient_count": {"$lte": num_missing_ingredients_allowed}},
+                    {"ingredient_count": {"$exists": False}}
+                ]}
+            },
+            # Missing count is the precomputed ingredient count minus the overlap. Fall back to sizing the array for
+            # recipes inserted before ingredient_count existed
+            {
+                "$addFields": {
+                    "difference_count": {
+                        "$subtract": [
+                            {"$ifNull": ["$ingredient_count", {"$size": {"$setUnion": ["$ingredients", []]}}]},
+                            {"$size": {"$setIntersection": ["$ingredients", ingredient_list]}}
+                        ]
+                    }
+                }
+            },
+            # Apply missing ingredient budget before sorting
+            {
+                "$match": {"difference_count": {"$lte": num_missing_ingredients_allowed}}
+            },
+            {
+                "$sort": {"difference_count": 1, "_id": 1}
+            },
+            {
+                "$skip": page * number_of_recipes
+            },
+            {
+                "$limit": number_of_recipes
+            },
+            # Only compute the missing ingredient list for the returned page
+            {
+                "$addFields": {
+                    "difference_ingredients": {
+                        "$setDifference": ["$ingredients", ingredient_list]
+                    }
+                }
+            }
+        ]
+        return pipeline
+
+    def backfill_ingredient_counts(self):
+        """Sets ingredient_count on recipes inserted before it was precomputed at insert time"""
+        result = self.recipe_collection.update_many(
+            {"ingredient_count": {"$exists": False}},
+            [{"$set": {"ingredient_count": {"$size": {"$setUnion": ["$ingredients", []]}}}}]
+        )
+        logger.info(f"Backfilled ingredient_count on {result.modified_count} recipes")
 
     def recipe_already_in_db(self, url_to_check: str) -> bool:
         """Checks if item already exists in database by comparing the URL."""
         return self.recipe_collection.find_one({"source_url": url_to_check}) is not None
 
+    def get_existing_source_urls(self, urls_to_check: list[str]) -> set[str]:
+        """
+        Checks which of the URLs already exist in the database with a single query backed by the unique source_url index
+        :param urls_to_check: source URLs to check
+        :return: set of the URLs that already exist
+        """
+        if not urls_to_check:
+            return set()
+
+        cursor = self.recipe_collection.find({"source_url": {"$in": list(set(urls_to_check))}}, {"source_url": 1, "_id": 0})
+        return {recipe["source_url"] for recipe in cursor}
+
     @staticmethod
-    def get_cloud_connection_client() -> MongoClient:
+    def load_mongo_config() -> dict:
+        config_path = os.path.join(os.path.dirname(__file__), 'config', 'mongo_config.json')
+        with open(config_path, 'r') as file:
+            return json.load(file)
+
+    @staticmethod
+    def get_cloud_connection_uri() -> str:
         username = os.getenv("MONGO_USER")
         password = os.getenv("MONGO_PASSWORD")
         cluster_name = os.getenv("MONGO_CLUSTER")
         appname = os.getenv("MONGO_APP")
 
-        uri = f"mongodb+srv://{username}:{password}@{cluster_name}.blbbn.mongodb.net/?retryWrites=true&w=majority&appName={appname}"
+        return f"mongodb+srv://{username}:{password}@{cluster_name}.blbbn.mongodb.net/?retryWrites=true&w=majority&appName={appname}"
 
+    @staticmethod
+    def get_cloud_connection_client() -> MongoClient:
         # Create a new client and connect to the server
-        client = MongoClient(uri, server_api=ServerApi('1'))
+        client = MongoClient(DatabaseDriver.get_cloud_connection_uri(), server_api=ServerApi('1'), event_listeners=[DatabaseCommandMetrics()])
 
         # Send a ping to confirm a successful connection
         try:
@@ -0,0 +1,149 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import logging_config, logging
+from recipe_manager.lru_cache import LRUCache
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+# Cached normalization result: ((ingredient_text, foundation_text), normalized_name). normalized_name is None for misses
+NormalizationEntry = Tuple[Tuple[str | None, str | None], str | None]
+
+
+class NormalizationCache:
+    """
+    Two tier cache for ingredient normalization results, keyed by the lowercased raw ingredient string.
+    The first tier is an in-memory LRU, the optional second tier is an SQLite file that survives restarts.
+    Entries store the parsed ingredient tuple and the final normalized name, including misses (normalized name None)
+    so known unmatchable strings skip parsing and the embedding search.
+    Entries are keyed by vocabulary version, only entries of the current version are read. The SQLite file is shared by
+    every process on the host (API workers, scraper), which may briefly run different vocabulary versions, so the entries
+    of other versions are kept until no process has used that version for version_retention_seconds.
+    """
+    DEFAULT_MAX_SIZE = 10000
+    DEFAULT_PERSISTENT_PATH = Path(__file__).resolve().parent / "cache" / "normalization_cache.sqlite3"
+    DEFAULT_VERSION_RETENTION_SECONDS = 7 * 24 * 3600
+    # How long a write waits for another process holding the SQLite write lock
+    PERSISTENT_TIMEOUT_SECONDS = 30.0
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, persistent_path: Path | None = None,
+                 version_retention_seconds: float = DEFAULT_VERSION_RETENTION_SECONDS):
+        self.memory_cache = LRUCache(max_size)
+        self.persistent_path = persistent_path
+        self.version_retention_seconds = version_retention_seconds
+        self.vocabulary_version = None
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._connection = None
+        if persistent_path is not None:
+            Path(persistent_path).parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(persistent_path, timeout=NormalizationCache.PERSISTENT_TIMEOUT_SECONDS, check_same_thread=False)
+            # Readers in other processes don't block on a writer, and a writer doesn't block on them
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS normalization_cache ("
+                "vocabulary_version TEXT NOT NULL, raw_string TEXT NOT NULL, ingredient_text TEXT, foundation_text TEXT, "
+                "normalized_name TEXT, PRIMARY KEY (vocabulary_version, raw_string))"
+            )
+            # When each vocabulary version was last set or written by any process
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS normalization_cache_versions (vocabulary_version TEXT PRIMARY KEY, last_used REAL NOT NULL)"
+            )
+            self._connection.commit()
+
+    @staticmethod
+    def make_key(ingredient_string: str) -> str:
+        return ingredient_string.lower()
+
+    def set_vocabulary_version(self, vocabulary_version: str):
+        """
+        Switches to the entries of vocabulary_version. The in-memory entries of the previous version are dropped, the
+        persistent entries of other versions are left to the processes still using them, and only the versions no
+        process has used for version_retention_seconds are deleted.
+        """
+        with self._lock:
+            if vocabulary_version == self.vocabulary_version:
+                return
+
+            self.vocabulary_version = vocabulary_version
+            self.memory_cache.clear()
+            if self._connection is not None:
+                now = time.time()
+                self._mark_version_used(now)
+                expired_before = now - self.version_retention_seconds
+                self._connection.execute(
+                    "DELETE FROM normalization_cache WHERE vocabulary_version IN "
+                    "(SELECT vocabulary_version FROM normalization_cache_versions WHERE last_used < ?)", (expired_before,)
+                )
+                self._connection.execute("DELETE FROM normalization_cache_versions WHERE last_used < ?", (expired_before,))
+                self._connection.commit()
+
+            logger.info(f"Normalization cache set to vocabulary version {vocabulary_version}")
+
+    def get(self, ingredient_string: str) -> NormalizationEntry | None:
+        """Returns the cached entry for ingredient_string, None if it isn't cached"""
+        key = self.make_key(ingredient_string)
+        entry = self.memory_cache.get(key)
+        if entry is not None:
+            self.memory_hits += 1
+            return entry
+
+        if self._connection is not None:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT ingredient_text, foundation_text, normalized_name FROM normalization_cache "
+                    "WHERE vocabulary_version = ? AND raw_string = ?", (self.vocabulary_version, key)
+                ).fetchone()
+
+            if row is not None:
+                entry = ((row[0], row[1]), row[2])
+                self.memory_cache.put(key, entry)
+                self.persistent_hits += 1
+                return entry
+
+        self.misses += 1
+        return None
+
+    def put_many(self, ingredient_strings: List[str], entries: List[NormalizationEntry], vocabulary_version: str | None = None):
+        """
+        Stores the normalization entries of ingredient_strings in both tiers
+        :param vocabulary_version: vocabulary version read before computing entries, they aren't stored if the
+        version changed while they were being computed
+        """
+        # Checked and stored under the lock, so set_vocabulary_version can't clear the cache in between
+        with self._lock:
+            if vocabulary_version is not None and vocabulary_version != self.vocabulary_version:
+                return
+
+            rows = []
+            for ingredient_string, entry in zip(ingredient_strings, entries):
+                key = self.make_key(ingredient_string)
+                self.memory_cache.put(key, entry)
+                rows.append((self.vocabulary_version, key, entry[0][0], entry[0][1], entry[1]))
+
+            if self._connection is not None and rows:
+                self._connection.executemany("INSERT OR REPLACE INTO normalization_cache VALUES (?, ?, ?, ?, ?)", rows)
+                self._mark_version_used(time.time())
+                self._connection.commit()
+
+    def _mark_version_used(self, now: float):
+        """Records that the current vocabulary version is in use, must be called with the lock held"""
+        self._connection.execute("INSERT OR REPLACE INTO normalization_cache_versions VALUES (?, ?)", (self.vocabulary_version, now))
+
+    def get_statistics(self) -> dict:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.memory_hits + self.persistent_hits) / lookups if lookups else 0.0,
+            "memory_size": len(self.memory_cache)
+        }
@@ -1,14 +1,110 @@
+import time
+from pathlib import Path
+
+from recipe_manager.async_mongodb_driver import AsyncDatabaseDriver
+from recipe_manager.config_cache import ConfigCache
+from recipe_manager.cpu_executor import BoundedCPUExecutor
+from recipe_manager.embedding_store import EmbeddingStore
 from recipe_manager.ingredient_normalizer import IngredientNormalizer
-from recipe_manager.mongodb_driver import DatabaseDriver
+from recipe_manager.mongodb_driver import INGREDIENT_ADDITIONS_CONFIG_ITEM, PANTRY_ESSENTIALS_CONFIG_ITEM, DatabaseDriver
+from recipe_manager.normalization_cache import NormalizationCache
+from recipe_manager.recipe_matcher import RecipeMatcher
+from recipe_manager.response_cache import RecipeResponseCache
+from recipe_manager.sharded_matcher import ShardedRecipeMatcher
 from tests.ingredient_testing.raw_json_ingredient_reader import RawJsonIngredientReader
 
 
+# Number of ranked recipes returned per page when the request doesn't specify one, and the maximum allowed page size
+DEFAULT_RANKED_RECIPES_TO_RETURN = 10
+MAXIMUM_RANKED_RECIPES_TO_RETURN = 50
+
+# Maximum number of pantries matched by one batch request
+MAXIMUM_BATCH_PANTRIES = 1000
+
+# How often the stored corpus version (or the snapshot's delta log) is checked for recipes inserted by other processes
+CORPUS_VERSION_REFRESH_SECONDS = 5.0
+
+
 class RecipeManager:
-    def __init__(self):
+    IN_PROCESS_QUERY_MODE = "in_process"  # Match against the in-process RecipeMatcher
+    DATABASE_QUERY_MODE = "database"  # Match with the index-pruned MongoDB pipeline
+    SHARDED_QUERY_MODE = "sharded"  # Match against a ShardedRecipeMatcher, the corpus split across worker processes
+    QUERY_MODES = [IN_PROCESS_QUERY_MODE, DATABASE_QUERY_MODE, SHARDED_QUERY_MODE]
+
+    # Request run by warm_up, the unusual strings make sure the parser, the encoder and the index search all run
+    WARM_UP_REQUEST = {
+        "num_missing_ingredients_allowed": 0,
+        "ingredients_list": ["2 large eggs", "1 cup shredded sharp cheddar cheese", "a pinch of smoked paprika flakes"]
+    }
+
+    def __init__(self, query_mode: str = IN_PROCESS_QUERY_MODE, cpu_executor: BoundedCPUExecutor | None = None,
+                 async_database_driver: AsyncDatabaseDriver | None = None, ingredient_normalizer: IngredientNormalizer | None = None,
+                 database_driver: DatabaseDriver | None = None, recipe_snapshot_directory: Path | str | None = None,
+                 shard_count: int = ShardedRecipeMatcher.DEFAULT_SHARD_COUNT):
+        """
+        :param query_mode: one of QUERY_MODES
+        :param cpu_executor: executor the async entry points run normalization and in-process matching on
+        :param async_database_driver: driver the async entry points query in DATABASE_QUERY_MODE, the blocking
+        driver is run on cpu_executor when not provided
+        :param ingredient_normalizer: already loaded normalizer, e.g. one preloaded before forking workers
+        :param database_driver: blocking driver, connects to MongoDB with the default config when not provided
+        :param recipe_snapshot_directory: in IN_PROCESS_QUERY_MODE, match against the memory-mapped snapshot exported
+        there instead of loading every recipe from the database, see RecipeSnapshotWriter
+        :param shard_count: number of matcher worker processes in SHARDED_QUERY_MODE
+        """
+        if query_mode not in RecipeManager.QUERY_MODES:
+            raise ValueError(f"Unknown query mode '{query_mode}'")
+        self.query_mode = query_mode
+
+        self.ingredient_normalizer = ingredient_normalizer if ingredient_normalizer is not None else self.build_ingredient_normalizer()
+
+        self.database_driver = database_driver if database_driver is not None else DatabaseDriver()
+        self.async_database_driver = async_database_driver
+        self.cpu_executor = cpu_executor if cpu_executor is not None else BoundedCPUExecutor()
+
+        self.recipe_matcher = None
+        self._last_recipe_id = None  # Newest recipe _id loaded into the matcher, see refresh_recipes
+        if self.query_mode == RecipeManager.IN_PROCESS_QUERY_MODE:
+            # Load every recipe into the in-process matcher once, then keep it in sync with new inserts
+            if recipe_snapshot_directory is not None:
+                self.recipe_matcher = RecipeMatcher.from_snapshot(recipe_snapshot_directory)
+                # Other workers on the host pick up this process' inserts from the snapshot's delta log
+                self.database_driver.add_recipe_insert_listener(self.recipe_matcher.snapshot.delta_log.append)
+            else:
+                self.recipe_matcher = RecipeMatcher(self.load_recipes())
+            self.database_driver.add_recipe_insert_listener(self.recipe_matcher.add_recipes)
+        elif self.query_mode == RecipeManager.SHARDED_QUERY_MODE:
+            self.recipe_matcher = ShardedRecipeMatcher(self.load_recipes(), shard_count)
+            self.database_driver.add_recipe_insert_listener(self.recipe_matcher.add_recipes)
+
+        # Responses of find_similar_recipe, invalidated whenever recipes are inserted. Registered after the matcher so
+        # a response is never cached under the new corpus version before the matcher holds the new recipes
+        self.response_cache = RecipeResponseCache()
+        self.response_cache.set_corpus_version(self.database_driver.corpus_version)
+        self._recipes_corpus_version = self.database_driver.corpus_version  # Stored corpus version at the last refresh_recipes
+        self._corpus_version_checked_at = time.monotonic()
+        self.add_response_cache_invalidation(self.database_driver)
+        if self.async_database_driver is not None:
+            self.add_response_cache_invalidation(self.async_database_driver)
+
+        # Config items such as the pantry essentials, checked for changes every ConfigCache.refresh_seconds
+        self.config_cache = ConfigCache(self.database_driver)
+
+    @staticmethod
+    def build_ingredient_normalizer() -> IngredientNormalizer:
         raw_ingredient_reader = RawJsonIngredientReader()
-        self.ingredient_normalizer = IngredientNormalizer(raw_ingredient_reader)
+        normalization_cache = NormalizationCache(persistent_path=NormalizationCache.DEFAULT_PERSISTENT_PATH)
+        return IngredientNormalizer(raw_ingredient_reader, normalization_cache, EmbeddingStore())
 
-        self.database_driver = DatabaseDriver()
+    def warm_up(self):
+        """Runs a query through parsing, encoding, index search and recipe matching so the first request runs at steady state"""
+        self.ingredient_normalizer.warm_up()
+        self.find_similar_recipe(RecipeManager.WARM_UP_REQUEST)
+
+    async def warm_up_async(self):
+        """Same as warm_up through the async entry points, which also starts the executor threads and the async driver's connections"""
+        await self.cpu_executor.run(self.ingredient_normalizer.warm_up)
+        await self.find_similar_recipe_async(RecipeManager.WARM_UP_REQUEST)
 
     def find_similar_recipe(self, ingredient_request: dict):
         """
@@ -16,7 +112,8 @@ class RecipeManager:
         :param ingredient_request: Ingredient request dict from the Request Handler in the format below
         {
             "num_missing_ingredients_allowed": integer,
-            "ingredients_list": list[string]
+            "ingredients_list": list[string],
+            "include_pantry_essentials": bool (optional, defaults to true)
         }
         :return: Response object in the format below
         {
@@ -26,26 +123,407 @@ class RecipeManager:
             "success": True/False
         }
         """
-        normalized_ingredient_list, _ = self.ingredient_normalizer.generate_normalized_ingredients(ingredient_request["ingredients_list"])
-        smallest_difference = self.database_driver.get_ingredient_set_difference(normalized_ingredient_list)
+        normalized_ingredient_list = self.normalize_request_ingredients(ingredient_request)
+        num_missing_ingredients_allowed = ingredient_request["num_missing_ingredients_allowed"]
+
+        if self.is_corpus_version_stale():
+            self.refresh_corpus()
+
+        cache_key = self.response_cache.make_key(normalized_ingredient_list, num_missing_ingredients_allowed)
+        cached_response = self.response_cache.get(cache_key)
+        if cached_response is not None:
+            return cached_response
+
+        corpus_version = self.response_cache.corpus_version
+        start_time = time.perf_counter()
+        if self.query_mode == RecipeManager.DATABASE_QUERY_MODE:
+            # Budget is applied inside the pipeline, so anything returned is already allowed
+            smallest_difference = self.database_driver.get_ranked_recipes(normalized_ingredient_list, num_missing_ingredients_allowed, 1)
+        else:
+            smallest_difference = self.recipe_matcher.get_ingredient_set_difference(normalized_ingredient_list)
+
+        response = self.build_similar_recipe_response(smallest_difference, num_missing_ingredients_allowed)
+        self.response_cache.put(cache_key, response, time.perf_counter() - start_time, corpus_version)
+        return response
+
+    async def find_similar_recipe_async(self, ingredient_request: dict):
+        """
+        Same as find_similar_recipe without blocking the event loop, CPU work runs on the executor and database
+        queries go through the async driver
+        """
+        normalized_ingredient_list = await self.cpu_executor.run(self.normalize_request_ingredients, ingredient_request)
+        num_missing_ingredients_allowed = ingredient_request["num_missing_ingredients_allowed"]
+
+        if self.is_corpus_version_stale():
+            if self.query_mode == RecipeManager.DATABASE_QUERY_MODE and self.async_database_driver is not None:
+                self.response_cache.set_corpus_version(await self.async_database_driver.get_corpus_version())
+            else:
+                await self.cpu_executor.run(self.refresh_corpus)
+
+        cache_key = self.response_cache.make_key(normalized_ingredient_list, num_missing_ingredients_allowed)
+        cached_response = self.response_cache.get(cache_key)
+        if cached_response is not None:
+            return cached_response
+
+        corpus_version = self.response_cache.corpus_version
+        start_time = time.perf_counter()
+        if self.query_mode == RecipeManager.DATABASE_QUERY_MODE:
+            smallest_difference = await self.get_ranked_recipes_from_database(normalized_ingredient_list, num_missing_ingredients_allowed, 1)
+        else:
+            smallest_difference = await self.cpu_executor.run(self.recipe_matcher.get_ingredient_set_difference, normalized_ingredient_list)
+
+        response = self.build_similar_recipe_response(smallest_difference, num_missing_ingredients_allowed)
+        self.response_cache.put(cache_key, response, time.perf_counter() - start_time, corpus_version)
+        return response
+
+    def add_response_cache_invalidation(self, database_driver: DatabaseDriver | AsyncDatabaseDriver):
+        """Drops the cached responses whenever database_driver inserts recipes, it bumps its corpus version before notifying"""
+        database_driver.add_recipe_insert_listener(lambda inserted_recipes: self.response_cache.set_corpus_version(database_driver.corpus_version))
+
+    def is_corpus_version_stale(self) -> bool:
+        """
+        True every CORPUS_VERSION_REFRESH_SECONDS, when the stored corpus version should be re-read to pick up recipes
+        inserted by other processes such as the scraper
+        """
+        now = time.monotonic()
+        if now - self._corpus_version_checked_at < CORPUS_VERSION_REFRESH_SECONDS:
+            return False
+        self._corpus_version_checked_at = now
+        return True
+
+    def refresh_corpus(self):
+        """Picks up the recipes inserted by other processes, called every CORPUS_VERSION_REFRESH_SECONDS"""
+        if self.query_mode == RecipeManager.DATABASE_QUERY_MODE:
+            self.response_cache.set_corpus_version(self.database_driver.get_corpus_version())
+        elif isinstance(self.recipe_matcher, RecipeMatcher) and self.recipe_matcher.snapshot is not None:
+            self.apply_snapshot_delta()
+        else:
+            self.refresh_recipes()
+
+    def load_recipes(self) -> list[dict]:
+        """Reads every recipe for the in-process matcher, remembering the newest _id for refresh_recipes"""
+        recipe_list = self.database_driver.get_all_recipes(RecipeMatcher.RECIPE_PROJECTION)
+        self.update_last_recipe_id(recipe_list)
+        return recipe_list
+
+    def refresh_recipes(self):
+        """
+        Adds the recipes other processes such as the scraper inserted since the last refresh to the in-process matcher,
+        only reading the recipe collection when the stored corpus version changed. Recipes the matcher already holds,
+        e.g. this process' own inserts, are skipped by source URL.
+        """
+        # Read before the recipes, so a recipe inserted in between is picked up by the next refresh at worst
+        corpus_version = self.database_driver.get_corpus_version()
+        if corpus_version == self._recipes_corpus_version:
+            return
+
+        recipe_list = self.database_driver.get_recipes_inserted_after(self._last_recipe_id, RecipeMatcher.RECIPE_PROJECTION)
+        recipe_count = len(self.recipe_matcher)
+        self.recipe_matcher.add_recipes(recipe_list)
+        self.update_last_recipe_id(recipe_list)
+        self._recipes_corpus_version = corpus_version
+        if len(self.recipe_matcher) != recipe_count:
+            self.response_cache.set_corpus_version(corpus_version)
+
+    def update_last_recipe_id(self, recipe_list: list[dict]):
+        if recipe_list:
+            newest_recipe_id = max(recipe["_id"] for recipe in recipe_list)
+            if self._last_recipe_id is None or newest_recipe_id > self._last_recipe_id:
+                self._last_recipe_id = newest_recipe_id
+
+    def apply_snapshot_delta(self):
+        """Adds the recipes other processes appended to the snapshot's delta log, and drops the cached responses if there were any"""
+        if self.recipe_matcher.apply_snapshot_delta():
+            self.response_cache.set_corpus_version(self.database_driver.get_corpus_version())
+
+    def close(self):
+        """Stops the CPU executor and the shard processes of SHARDED_QUERY_MODE"""
+        self.cpu_executor.close()
+        if isinstance(self.recipe_matcher, ShardedRecipeMatcher):
+            self.recipe_matcher.close()
+
+    def get_cache_statistics(self) -> dict:
+        return {
+            "response_cache": self.response_cache.get_statistics(),
+            "normalization_cache": self.ingredient_normalizer.normalization_cache.get_statistics(),
+            "ingredient_matching": self.ingredient_normalizer.get_match_statistics()
+        }
+
+    @staticmethod
+    def build_similar_recipe_response(smallest_difference: list[dict], num_missing_ingredients_allowed: int) -> dict:
+        """Builds the find_similar_recipe response from the best matching recipe"""
+        if not smallest_difference:
+            # No recipes to match against
+            return {"success": False}
+
         resulting_dict = smallest_difference[0]
 
-        if ingredient_request["num_missing_ingredients_allowed"] < resulting_dict["difference_count"]:
+        if num_missing_ingredients_allowed < resulting_dict["difference_count"]:
             # Not allowed this many differences, return None
             return {"success": False}
 
         # Generate the response dict to the Request Handler
-        recipe_dict = {
+        recipe_dict = RecipeManager.build_recipe_response(resulting_dict)
+        recipe_dict["success"] = True
+        return recipe_dict
+
+    def find_similar_recipes(self, ingredient_request: dict):
+        """
+        Returns a ranked, paginated list of the recipes that most closely match the requested ingredients.
+        Every recipe within the missing ingredient budget is returned, including ones sharing no ingredient with the request.
+        :param ingredient_request: Ingredient request dict from the Request Handler in the format below
+        {
+            "num_missing_ingredients_allowed": integer,
+            "ingredients_list": list[string],
+            "num_recipes": integer (optional, page size),
+            "page": integer (optional, zero-based page index),
+            "include_pantry_essentials": bool (optional, defaults to true)
+        }
+        :return: Response object in the format below
+        {
+            "recipes": list[{"recipe": recipe_dict, "number_missing_ingredients": integer, "missing_ingredients": list[string]}],
+            "page": integer,
+            "num_recipes": integer,
+            "success": True/False
+        }
+        """
+        number_of_recipes, page = self.get_request_pagination(ingredient_request)
+
+        normalized_ingredient_list = self.normalize_request_ingredients(ingredient_request)
+        num_missing_ingredients_allowed = ingredient_request["num_missing_ingredients_allowed"]
+
+        if self.query_mode == RecipeManager.DATABASE_QUERY_MODE:
+            ranked_recipes = self.database_driver.get_ranked_recipes(normalized_ingredient_list, num_missing_ingredients_allowed, number_of_recipes, page)
+        else:
+            ranked_recipes = self.recipe_matcher.get_ranked_recipes(normalized_ingredient_list, num_missing_ingredients_allowed, number_of_recipes, page)
+
+        return self.build_ranked_recipes_response(ranked_recipes, number_of_recipes, page)
+
+    async def find_similar_recipes_async(self, ingredient_request: dict):
+        """Same as find_similar_recipes without blocking the event loop"""
+        number_of_recipes, page = self.get_request_pagination(ingredient_request)
+
+        normalized_ingredient_list = await self.cpu_executor.run(self.normalize_request_ingredients, ingredient_request)
+        num_missing_ingredients_allowed = ingredient_request["num_missing_ingredients_allowed"]
+
+        if self.query_mode == RecipeManager.DATABASE_QUERY_MODE:
+            ranked_recipes = await self.get_ranked_recipes_from_database(normalized_ingredient_list, num_missing_ingredients_allowed, number_of_recipes, page)
+        else:
+            ranked_recipes = await self.cpu_executor.run(self.recipe_matcher.get_ranked_recipes, normalized_ingredient_list,
+                                                         num_missing_ingredients_allowed, number_of_recipes, page)
+
+        return self.build_ranked_recipes_response(ranked_recipes, number_of_recipes, page)
+
+    def find_similar_recipes_batch(self, batch_request: dict):
+        """
+        Ranks the recipes for many pantries at once. The ingredient strings of all pantries are normalized in one
+        deduplicated pass, and in the in-process modes all pantries are scored with a single sparse matrix product (per shard).
+        :param batch_request: Batch request dict in the format below
+        {
+            "num_missing_ingredients_allowed": integer,
+            "pantries": list[list[string]],
+            "num_recipes": integer (optional, top-K per pantry),
+            "include_pantry_essentials": bool (optional, defaults to true)
+        }
+        :return: Response object in the format below, one result per pantry in request order
+        {
+            "results": list[{"recipes": list[recipe response], "success": True/False}],
+            "num_recipes": integer,
+            "success": True/False
+        }
+        """
+        number_of_recipes, normalized_pantries = self.normalize_batch_request(batch_request)
+        num_missing_ingredients_allowed = batch_request["num_missing_ingredients_allowed"]
+
+        if self.query_mode == RecipeManager.DATABASE_QUERY_MODE:
+            ranked_recipe_lists = [self.database_driver.get_ranked_recipes(pantry, num_missing_ingredients_allowed, number_of_recipes)
+                                   for pantry in normalized_pantries]
+        else:
+            ranked_recipe_lists = self.recipe_matcher.get_ranked_recipes_batch(normalized_pantries, num_missing_ingredients_allowed, number_of_recipes)
+
+        return self.build_batch_response(ranked_recipe_lists, number_of_recipes)
+
+    async def find_similar_recipes_batch_async(self, batch_request: dict):
+        """Same as find_similar_recipes_batch without blocking the event loop"""
+        number_of_recipes, normalized_pantries = await self.cpu_executor.run(self.normalize_batch_request, batch_request)
+        num_missing_ingredients_allowed = batch_request["num_missing_ingredients_allowed"]
+
+        if self.query_mode == RecipeManager.DATABASE_QUERY_MODE:
+            ranked_recipe_lists = [await self.get_ranked_recipes_from_database(pantry, num_missing_ingredients_allowed, number_of_recipes)
+                                   for pantry in normalized_pantries]
+        else:
+            ranked_recipe_lists = await self.cpu_executor.run(self.recipe_matcher.get_ranked_recipes_batch, normalized_pantries,
+                                                              num_missing_ingredients_allowed, number_of_recipes)
+
+        return self.build_batch_response(ranked_recipe_lists, number_of_recipes)
+
+    def normalize_batch_request(self, batch_request: dict) -> tuple[int, list[list[str]]]:
+        """
+        Validates a batch request and normalizes the ingredient strings of every pantry with one normalizer call
+        :return: (number_of_recipes, normalized ingredient names of each pantry)
+        """
+        pantries = batch_request["pantries"]
+        if not isinstance(pantries, list) or not all(isinstance(pantry, list) for pantry in pantries):
+            raise ValueError("pantries must be a list of ingredient lists")
+        if len(pantries) > MAXIMUM_BATCH_PANTRIES:
+            raise ValueError(f"Too many pantries: {len(pantries)}, at most {MAXIMUM_BATCH_PANTRIES} per request")
+        number_of_recipes, _ = self.get_request_pagination(batch_request)
+
+        # The normalizer parses and matches each distinct string once, however many pantries share it
+        self.refresh_ingredient_additions()
+        all_strings = [ingredient_string for pantry in pantries for ingredient_string in pantry]
+        normalized_names = iter(self.ingredient_normalizer.normalize_ingredient_strings(all_strings))
+        normalized_pantries = []
+        for pantry in pantries:
+            pantry_names = [next(normalized_names) for _ in pantry]
+            normalized_pantries.append(self.add_pantry_essentials([name for name in pantry_names if name], batch_request))
+        return number_of_recipes, normalized_pantries
+
+    @staticmethod
+    def build_batch_response(ranked_recipe_lists: list[list[dict]], number_of_recipes: int) -> dict:
+        results = [
+            {"recipes": [RecipeManager.build_recipe_response(resulting_dict) for resulting_dict in ranked_recipes], "success": len(ranked_recipes) > 0}
+            for ranked_recipes in ranked_recipe_lists
+        ]
+        return {"results": results, "num_recipes": number_of_recipes, "success": any(result["success"] for result in results)}
+
+    async def get_ranked_recipes_from_database(self, ingredient_list: list[str], num_missing_ingredients_allowed: int, number_of_recipes: int, page: int = 0):
+        if self.async_database_driver is not None:
+            return await self.async_database_driver.get_ranked_recipes(ingredient_list, num_missing_ingredients_allowed, number_of_recipes, page)
+        return await self.cpu_executor.run(self.database_driver.get_ranked_recipes, ingredient_list, num_missing_ingredients_allowed, number_of_recipes, page)
+
+    def normalize_request_ingredients(self, ingredient_request: dict) -> list[str]:
+        self.refresh_ingredient_additions()
+        normalized_ingredient_list, _ = self.ingredient_normalizer.generate_normalized_ingredients(ingredient_request["ingredients_list"])
+        return self.add_pantry_essentials(normalized_ingredient_list, ingredient_request)
+
+    def refresh_ingredient_additions(self):
+        """
+        Adds the ingredients and aliases stored by add_ingredients_async, from any worker process, to this process'
+        normalizer. The stored additions are only re-read when their version changes, see ConfigCache
+        """
+        self.config_cache.get_derived(INGREDIENT_ADDITIONS_CONFIG_ITEM, self.apply_ingredient_additions)
+
+    def apply_ingredient_additions(self, config_item: dict | None) -> list[str]:
+        if config_item is None:
+            return []
+        return self.ingredient_normalizer.add_ingredients(config_item.get("ingredients", []))
+
+    async def add_ingredients_async(self, ingredients: list[dict]) -> list[str]:
+        """
+        Adds ingredients, or aliases of known ingredients, to the running normalizer and stores them so the other
+        worker processes add them within ConfigCache.refresh_seconds, and every process adds them again after a restart
+        :param ingredients: list[{"name": string, "alias": list[string]}]
+        :return: the ingredient strings that weren't known before
+        """
+        self.validate_ingredient_additions(ingredients)
+        new_strings = await self.cpu_executor.run(self.ingredient_normalizer.add_ingredients, ingredients)
+        if new_strings:
+            await self.store_ingredient_additions(ingredients)
+        return new_strings
+
+    async def add_ingredient_aliases_async(self, ingredient_name: str, aliases: list[str]) -> list[str]:
+        """Adds aliases to a known top-level ingredient, see add_ingredients_async"""
+        self.validate_ingredient_additions([{"name": ingredient_name, "alias": aliases}])
+        new_strings = await self.cpu_executor.run(self.ingredient_normalizer.add_aliases, ingredient_name, aliases)
+        if new_strings:
+            await self.store_ingredient_additions([{"name": ingredient_name, "alias": aliases}])
+        return new_strings
+
+    async def store_ingredient_additions(self, ingredients: list[dict]):
+        if self.async_database_driver is not None:
+            config_item = await self.async_database_driver.append_to_config_item(INGREDIENT_ADDITIONS_CONFIG_ITEM, "ingredients", ingredients)
+        else:
+            config_item = await self.cpu_executor.run(self.database_driver.append_to_config_item, INGREDIENT_ADDITIONS_CONFIG_ITEM, "ingredients", ingredients)
+        if config_item is None:
+            raise RuntimeError("Ingredients were added to this process but couldn't be stored for the other processes")
+        self.config_cache.put(INGREDIENT_ADDITIONS_CONFIG_ITEM, config_item)
+
+    @staticmethod
+    def validate_ingredient_additions(ingredients: list[dict]):
+        if not isinstance(ingredients, list) or not all(
+                isinstance(ingredient, dict) and isinstance(ingredient.get("name"), str)
+                and isinstance(ingredient.get("alias", []), list) and all(isinstance(alias, str) for alias in ingredient.get("alias", []))
+                for ingredient in ingredients):
+            raise ValueError('ingredients must be a list of {"name": string, "alias": list[string]}')
+
+    def add_pantry_essentials(self, normalized_ingredient_list: list[str], ingredient_request: dict) -> list[str]:
+        """
+        Appends the stored pantry essentials to a request's normalized ingredients, unless the request sets
+        "include_pantry_essentials" to false. Ingredients already in the request aren't repeated.
+        """
+        if not ingredient_request.get("include_pantry_essentials", True):
+            return normalized_ingredient_list
+        pantry_essentials = self.get_pantry_essentials()
+        if not pantry_essentials:
+            return normalized_ingredient_list
+        return list(dict.fromkeys(normalized_ingredient_list + pantry_essentials))
+
+    def get_pantry_essentials(self) -> list[str]:
+        """
+        Normalized pantry essentials, stored as { "ingredients_list": list[string] } by set_pantry_essentials. They are
+        normalized once per version of the config item, not on every request.
+        """
+        return self.config_cache.get_derived(PANTRY_ESSENTIALS_CONFIG_ITEM, self.normalize_pantry_essentials)
+
+    def normalize_pantry_essentials(self, config_item: dict | None) -> list[str]:
+        ingredient_strings = config_item.get("ingredients_list", []) if config_item is not None else []
+        if not ingredient_strings:
+            return []
+        normalized_names = self.ingredient_normalizer.normalize_ingredient_strings(ingredient_strings)
+        return list(dict.fromkeys(name for name in normalized_names if name))
+
+    async def set_pantry_essentials_async(self, pantry_essentials: dict) -> dict | None:
+        """
+        Stores the pantry essentials and makes them visible to this process' next request, other processes pick them
+        up within ConfigCache.refresh_seconds
+        :param pantry_essentials: { "ingredients_list": list[string] }
+        :return: stored config item, None if the write failed
+        """
+        if not isinstance(pantry_essentials, dict) or not isinstance(pantry_essentials.get("ingredients_list"), list):
+            raise ValueError("ingredients_list must be a list of ingredient strings")
+
+        if self.async_database_driver is not None:
+            config_item = await self.async_database_driver.insert_pantry_essentials(pantry_essentials)
+        else:
+            config_item = await self.cpu_executor.run(self.database_driver.insert_pantry_essentials, pantry_essentials)
+        if config_item is not None:
+            self.config_cache.put(PANTRY_ESSENTIALS_CONFIG_ITEM, config_item)
+        return config_item
+
+    @staticmethod
+    def get_request_pagination(ingredient_request: dict) -> tuple[int, int]:
+        """
+        Reads the page size and page index of a ranked request
+        :return: (number_of_recipes, page)
+        """
+        number_of_recipes = min(int(ingredient_request.get("num_recipes", DEFAULT_RANKED_RECIPES_TO_RETURN)), MAXIMUM_RANKED_RECIPES_TO_RETURN)
+        page = int(ingredient_request.get("page", 0))
+        if number_of_recipes <= 0 or page < 0:
+            raise ValueError(f"Invalid pagination: num_recipes={number_of_recipes}, page={page}")
+        return number_of_recipes, page
+
+    @staticmethod
+    def build_ranked_recipes_response(ranked_recipes: list[dict], number_of_recipes: int, page: int) -> dict:
+        return {
+            "recipes": [RecipeManager.build_recipe_response(resulting_dict) for resulting_dict in ranked_recipes],
+            "page": page,
+            "num_recipes": number_of_recipes,
+            "success": len(ranked_recipes) > 0
+        }
+
+    @staticmethod
+    def build_recipe_response(resulting_dict: dict) -> dict:
+        """Converts a recipe dict with difference fields into the response format sent to the Request Handler"""
+        return {
             "recipe": {
                 "recipe_name": resulting_dict["recipe_name"],
                 "source_url": resulting_dict["source_url"],
                 "ingredients": resulting_dict["ingredients"]
             },
             "number_missing_ingredients": resulting_dict["difference_count"],
-            "missing_ingredients": resulting_dict["difference_ingredients"],
-            "success": True
+            "missing_ingredients": resulting_dict["difference_ingredients"]
         }
-        return recipe_dict
 
 
 
@@ -0,0 +1,276 @@
+import threading
+from pathlib import Path
+from typing import Dict, List, Iterable
+
+import numpy as np
+import scipy.sparse
+import logging_config, logging
+from recipe_manager.mongodb_driver import NUMBER_RECIPES_TO_RETURN
+from recipe_manager.recipe_snapshot import RecipeSnapshot
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+class RecipeMatcher:
+    """
+    In-process matching engine used to find the recipes with the fewest missing ingredients.
+    Every normalized ingredient name is mapped to an integer ID, every recipe is kept as a sorted array of ingredient IDs
+    and an inverted index maps each ingredient ID to the recipes that use it.
+    A query only walks the posting lists of the requested ingredients to count the overlap with each recipe,
+    the number of missing ingredients for a recipe is then its ingredient count minus the overlap.
+
+    When built from a RecipeSnapshot, the snapshot's recipes come first and are read from its memory-mapped arrays,
+    recipes added afterwards are kept in the Python structures below.
+    """
+    RECIPE_PROJECTION = {"recipe_name": 1, "source_url": 1, "ingredients": 1}
+
+    def __init__(self, recipe_list: Iterable[dict] | None = None, snapshot: RecipeSnapshot | None = None):
+        """
+        :param recipe_list: recipe dicts in the DB schema, added after the snapshot's recipes
+        :param snapshot: exported recipe corpus to share instead of copying, see from_snapshot
+        """
+        self.snapshot = snapshot
+        self.snapshot_recipe_count = snapshot.recipe_count if snapshot is not None else 0
+        self.delta_offset = snapshot.delta_offset if snapshot is not None else 0  # Delta log position already applied
+
+        # Normalized ingredient name <-> ingredient ID, the snapshot's IDs are kept as they are
+        self.ingredient_names: List[str] = list(snapshot.vocabulary) if snapshot is not None else []
+        self.ingredient_ids: Dict[str, int] = {name: ingredient_id for ingredient_id, name in enumerate(self.ingredient_names)}
+
+        # Recipes not in the snapshot, recipe index snapshot_recipe_count + i
+        self.recipes: List[dict] = []  # Recipe document
+        self.recipe_ingredient_ids: List[np.ndarray] = []  # Sorted unique ingredient IDs
+        self.source_urls = set()
+
+        self.postings: List[List[int]] = [[] for _ in self.ingredient_names]  # Ingredient ID -> indexes of non-snapshot recipes using it
+        self._posting_arrays: Dict[int, np.ndarray] = {}  # Lazily converted postings, dropped when a posting changes
+        self._recipe_lengths = snapshot.get_recipe_lengths() if snapshot is not None else np.zeros(0, dtype=np.int32)
+        self._ingredient_recipe_matrix = None  # Ingredient x recipe incidence matrix used by batch queries, built on first use
+
+        self._lock = threading.Lock()
+        self._delta_lock = threading.Lock()
+
+        if recipe_list:
+            self.add_recipes(recipe_list)
+
+    @classmethod
+    def from_snapshot(cls, directory: Path | str) -> "RecipeMatcher":
+        """
+        Opens the latest recipe snapshot exported to directory and applies the recipes inserted since, see RecipeSnapshotWriter.
+        Nothing is read from the database, and the snapshot's pages are shared with every other process that opened it.
+        """
+        recipe_matcher = cls(snapshot=RecipeSnapshot.open(directory))
+        recipe_matcher.apply_snapshot_delta()
+        return recipe_matcher
+
+    def apply_snapshot_delta(self) -> int:
+        """
+        Adds the recipes appended to the snapshot's delta log since the last call, e.g. by a scraper in another process
+        :return: number of recipes added
+        """
+        if self.snapshot is None:
+            return 0
+
+        with self._delta_lock:
+            recipe_list, self.delta_offset = self.snapshot.delta_log.read(self.delta_offset)
+            if not recipe_list:
+                return 0
+            recipe_count = len(self)
+            self.add_recipes(recipe_list)
+            return len(self) - recipe_count
+
+    def __len__(self) -> int:
+        return len(self._recipe_lengths)
+
+    def add_recipes(self, recipe_list: Iterable[dict]):
+        """
+        Adds recipes to the matching structures. Recipes with a source URL that is already indexed are skipped.
+        :param recipe_list: recipe dicts in the DB schema, { "recipe_name", "source_url", "ingredients" }
+        """
+        with self._lock:
+            new_lengths = []
+            for recipe in recipe_list:
+                if recipe["source_url"] in self.source_urls or (self.snapshot is not None and self.snapshot.contains_source_url(recipe["source_url"])):
+                    continue
+
+                recipe_index = self.snapshot_recipe_count + len(self.recipes)
+                ingredient_ids = np.array(sorted({self._get_or_create_ingredient_id(name) for name in recipe["ingredients"]}), dtype=np.int32)
+                for ingredient_id in ingredient_ids:
+                    self.postings[ingredient_id].append(recipe_index)
+                    self._posting_arrays.pop(int(ingredient_id), None)
+
+                self.recipes.append(recipe)
+                self.recipe_ingredient_ids.append(ingredient_ids)
+                self.source_urls.add(recipe["source_url"])
+                new_lengths.append(len(ingredient_ids))
+
+            if new_lengths:
+                self._ingredient_recipe_matrix = None
+                self._recipe_lengths = np.concatenate([self._recipe_lengths, np.array(new_lengths, dtype=np.int32)])
+                logger.info(f"Added {len(new_lengths)} recipes to recipe matcher, {len(self)} recipes indexed")
+
+    def get_ingredient_set_difference(self, ingredient_list: list[str], number_of_recipes: int = NUMBER_RECIPES_TO_RETURN) -> List[dict]:
+        """
+        In-process equivalent of DatabaseDriver.get_ingredient_set_difference.
+        Returns the recipes with the fewest ingredients missing from ingredient_list, sorted ascending by that count.
+        Ties are broken by insertion order.
+        :param ingredient_list: normalized ingredient names the user has
+        :param number_of_recipes: maximum number of recipes to return
+        :return: list of recipe dicts with "difference_ingredients" and "difference_count" added
+        """
+        with self._lock:
+            recipe_count = len(self)
+            if recipe_count == 0 or number_of_recipes <= 0:
+                return []
+
+            pantry_ids = self._get_ingredient_ids(ingredient_list)
+            missing_counts = self._recipe_lengths - self._count_overlap(pantry_ids, recipe_count)
+
+            top_indexes = self._select_top_indexes(missing_counts, np.arange(recipe_count), number_of_recipes)
+            return [self._build_difference_result(int(recipe_index), pantry_ids) for recipe_index in top_indexes]
+
+    def get_ranked_recipes(self, ingredient_list: list[str], num_missing_ingredients_allowed: int, number_of_recipes: int, page: int = 0) -> List[dict]:
+        """
+        In-process equivalent of DatabaseDriver.get_ranked_recipes.
+        Recipes missing at most num_missing_ingredients_allowed ingredients are ranked, ascending by missing ingredient
+        count. That includes recipes sharing no ingredient with ingredient_list whose length fits the budget.
+        :param ingredient_list: normalized ingredient names the user has
+        :param num_missing_ingredients_allowed: maximum number of missing ingredients for a recipe to be returned
+        :param number_of_recipes: page size
+        :param page: zero-based page index
+        :return: list of recipe dicts with "difference_ingredients" and "difference_count" added
+        """
+        with self._lock:
+            recipe_count = len(self)
+            if recipe_count == 0 or number_of_recipes <= 0:
+                return []
+
+            pantry_ids = self._get_ingredient_ids(ingredient_list)
+            missing_counts = self._recipe_lengths - self._count_overlap(pantry_ids, recipe_count)
+
+            candidate_indexes = np.flatnonzero(missing_counts <= num_missing_ingredients_allowed)
+            first_result = page * number_of_recipes
+            top_indexes = self._select_top_indexes(missing_counts, candidate_indexes, first_result + number_of_recipes)[first_result:]
+            return [self._build_difference_result(int(recipe_index), pantry_ids) for recipe_index in top_indexes]
+
+    def get_ranked_recipes_batch(self, ingredient_lists: List[list[str]], num_missing_ingredients_allowed: int, number_of_recipes: int) -> List[List[dict]]:
+        """
+        get_ranked_recipes for many pantries at once, the first page of each.
+        The overlap of every (pantry, recipe) pair is one sparse product of the pantry x ingredient matrix with the
+        ingredient x recipe matrix, only pairs sharing at least one ingredient are ever materialized. Recipes short
+        enough to fit the budget without sharing an ingredient are added to every pantry's candidates separately.
+        :param ingredient_lists: normalized ingredient names of each pantry
+        :param num_missing_ingredients_allowed: maximum number of missing ingredients for a recipe to be returned
+        :param number_of_recipes: maximum number of recipes returned per pantry
+        :return: one list of recipe dicts per pantry, in the order of ingredient_lists
+        """
+        with self._lock:
+            recipe_count = len(self)
+            if recipe_count == 0 or number_of_recipes <= 0 or not ingredient_lists:
+                return [[] for _ in ingredient_lists]
+
+            pantry_ids = [self._get_ingredient_ids(ingredient_list) for ingredient_list in ingredient_lists]
+            pantry_indptr = np.zeros(len(pantry_ids) + 1, dtype=np.int64)
+            np.cumsum([len(ids) for ids in pantry_ids], out=pantry_indptr[1:])
+            pantry_indices = np.concatenate(pantry_ids)
+            pantry_matrix = scipy.sparse.csr_matrix((np.ones(len(pantry_indices), dtype=np.int32), pantry_indices, pantry_indptr),
+                                                    shape=(len(pantry_ids), len(self.ingredient_names)))
+
+            # Pantry x recipe overlap counts, missing ingredient count is the recipe length minus the overlap
+            overlap_matrix = (pantry_matrix @ self._get_ingredient_recipe_matrix()).tocsr()
+            overlap_matrix.sort_indices()
+
+            # Recipes that fit the budget even when the pantry has none of their ingredients
+            short_indexes = np.flatnonzero(self._recipe_lengths <= num_missing_ingredients_allowed)
+
+            results = []
+            for pantry_index, ids in enumerate(pantry_ids):
+                row = slice(overlap_matrix.indptr[pantry_index], overlap_matrix.indptr[pantry_index + 1])
+                recipe_indexes = overlap_matrix.indices[row]
+                missing_counts = self._recipe_lengths[recipe_indexes] - overlap_matrix.data[row]
+
+                within_budget = missing_counts <= num_missing_ingredients_allowed
+                unmatched_short_indexes = short_indexes[~np.isin(short_indexes, recipe_indexes, assume_unique=True)]
+                candidate_indexes = np.concatenate([recipe_indexes[within_budget], unmatched_short_indexes])
+                candidate_missing_counts = np.concatenate([missing_counts[within_budget], self._recipe_lengths[unmatched_short_indexes]])
+                top_indexes = self._select_top(candidate_missing_counts, candidate_indexes, recipe_count, number_of_recipes)
+                results.append([self._build_difference_result(int(recipe_index), ids) for recipe_index in top_indexes])
+            return results
+
+    def _get_ingredient_recipe_matrix(self) -> scipy.sparse.csr_matrix:
+        """Binary ingredient x recipe matrix, the transpose of the recipe x ingredient matrix, rebuilt after recipes are added"""
+        if self._ingredient_recipe_matrix is None:
+            postings = [self._get_posting_array(ingredient_id) for ingredient_id in range(len(self.ingredient_names))]
+            indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+            np.cumsum([len(posting) for posting in postings], out=indptr[1:])
+            indices = np.concatenate(postings) if postings else np.zeros(0, dtype=np.int32)
+            self._ingredient_recipe_matrix = scipy.sparse.csr_matrix((np.ones(len(indices), dtype=np.int32), indices, indptr),
+                                                                     shape=(len(self.ingredient_names), len(self)))
+        return self._ingredient_recipe_matrix
+
+    @staticmethod
+    def _select_top_indexes(missing_counts: np.ndarray, candidate_indexes: np.ndarray, number_of_recipes: int) -> np.ndarray:
+        """
+        Returns the number_of_recipes candidate indexes with the fewest missing ingredients, sorted ascending.
+        """
+        return RecipeMatcher._select_top(missing_counts[candidate_indexes], candidate_indexes, len(missing_counts), number_of_recipes)
+
+    @staticmethod
+    def _select_top(candidate_missing_counts: np.ndarray, candidate_indexes: np.ndarray, recipe_count: int, number_of_recipes: int) -> np.ndarray:
+        """
+        Returns the number_of_recipes candidate indexes with the fewest missing ingredients, sorted ascending.
+        Uses a unique sort key so ties keep insertion order, and only fully sorts the selected entries.
+        """
+        sort_keys = candidate_missing_counts.astype(np.int64) * recipe_count + candidate_indexes
+        if number_of_recipes < len(candidate_indexes):
+            selected = np.argpartition(sort_keys, number_of_recipes - 1)[:number_of_recipes]
+        else:
+            selected = np.arange(len(candidate_indexes))
+        return candidate_indexes[selected[np.argsort(sort_keys[selected])]]
+
+    def _get_or_create_ingredient_id(self, ingredient_name: str) -> int:
+        ingredient_id = self.ingredient_ids.get(ingredient_name)
+        if ingredient_id is None:
+            ingredient_id = len(self.ingredient_names)
+            self.ingredient_ids[ingredient_name] = ingredient_id
+            self.ingredient_names.append(ingredient_name)
+            self.postings.append([])
+        return ingredient_id
+
+    def _get_ingredient_ids(self, ingredient_list: Iterable[str]) -> np.ndarray:
+        """Maps ingredient names to their IDs, ingredients that no recipe uses are dropped"""
+        ids = {self.ingredient_ids[name] for name in ingredient_list if name in self.ingredient_ids}
+        return np.array(sorted(ids), dtype=np.int32)
+
+    def _get_posting_array(self, ingredient_id: int) -> np.ndarray:
+        posting_array = self._posting_arrays.get(ingredient_id)
+        if posting_array is None:
+            posting_array = np.array(self.postings[ingredient_id], dtype=np.int32)
+            if self.snapshot is not None and ingredient_id < len(self.snapshot.vocabulary):
+                # Use the mapped posting as is unless recipes were added since the snapshot
+                snapshot_posting = self.snapshot.get_posting(ingredient_id)
+                posting_array = np.concatenate([snapshot_posting, posting_array]) if len(posting_array) else snapshot_posting
+            self._posting_arrays[ingredient_id] = posting_array
+        return posting_array
+
+    def _count_overlap(self, pantry_ids: np.ndarray, recipe_count: int) -> np.ndarray:
+        """Counts how many of the pantry ingredients each recipe uses"""
+        if len(pantry_ids) == 0:
+            return np.zeros(recipe_count, dtype=np.int32)
+
+        matched_recipes = np.concatenate([self._get_posting_array(int(ingredient_id)) for ingredient_id in pantry_ids])
+        return np.bincount(matched_recipes, minlength=recipe_count).astype(np.int32)
+
+    def _build_difference_result(self, recipe_index: int, pantry_ids: np.ndarray) -> dict:
+        if recipe_index < self.snapshot_recipe_count:
+            recipe_ids = self.snapshot.get_recipe_ingredient_ids(recipe_index)
+            result = self.snapshot.get_recipe(recipe_index)
+        else:
+            recipe_ids = self.recipe_ingredient_ids[recipe_index - self.snapshot_recipe_count]
+            result = dict(self.recipes[recipe_index - self.snapshot_recipe_count])
+        missing_ids = recipe_ids[~np.isin(recipe_ids, pantry_ids, assume_unique=True)]
+
+        result["difference_ingredients"] = sorted(self.ingredient_names[ingredient_id] for ingredient_id in missing_ids)
+        result["difference_count"] = len(missing_ids)
+        return result
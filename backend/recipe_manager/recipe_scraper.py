@@ -1,9 +1,18 @@
+import argparse
 import requests
 import os
+import time
+from pathlib import Path
+from typing import List
 import logging_config, logging
+from recipe_manager.embedding_store import EmbeddingStore
+from recipe_manager.ingest_pipeline import IngestPipeline, StageCounters
 from recipe_manager.ingredient_normalizer import IngredientNormalizer
+from recipe_manager.link_checker import LinkChecker
+from recipe_manager.normalization_cache import NormalizationCache
+from recipe_manager.recipe_snapshot import RecipeDeltaLog
 from tests.ingredient_testing.raw_json_ingredient_reader import RawJsonIngredientReader
-from mongodb_driver import DatabaseDriver
+from recipe_manager.mongodb_driver import DatabaseDriver
 
 # Get logger instance
 logger = logging.getLogger(__name__)
@@ -14,22 +23,67 @@ API_KEY = os.getenv("SPOONACULAR_APP_ID")
 # Base URL for the Spoonacular API
 BASE_URL = 'https://api.spoonacular.com'
 
+# Snapshot directory the API workers map, scraped recipes are appended to its delta log so the workers pick them up
+RECIPE_SNAPSHOT_DIRECTORY = os.getenv("RECIPE_APP_RECIPE_SNAPSHOT") or None
+
 
 class RecipeScraper:
     MAXIMUM_NUMBER_UNKNOWN_INGREDIENTS = 3  # Number of unknown ingredients to tolerate before scrapping recipe.
+    STAGE_NAMES = ["fetch", "transform", "check_and_normalize", "insert"]  # Stages of scrape_and_insert_recipes
 
-    def __init__(self, ingredient_normalizer: IngredientNormalizer):
+    def __init__(self, ingredient_normalizer: IngredientNormalizer, database_driver: DatabaseDriver | None = None,
+                 link_checker: LinkChecker | None = None, base_url: str = BASE_URL, api_key: str | None = API_KEY,
+                 recipe_snapshot_directory: Path | str | None = None):
+        """
+        :param database_driver: driver recipes are inserted with, connects to the configured cluster if None
+        :param recipe_snapshot_directory: snapshot directory whose delta log every inserted recipe is appended to, so
+        API workers matching against the snapshot see scraped recipes without a new export
+        :param base_url: Spoonacular API base URL, overridden to point at a local stub in tests
+        """
         self.ingredient_normalizer = ingredient_normalizer
+        self.base_url = base_url
+        self.api_key = api_key
 
-        self.database_driver = DatabaseDriver()
+        self.database_driver = database_driver if database_driver is not None else DatabaseDriver()
+        if recipe_snapshot_directory is not None:
+            # Registered on the driver, so both the plain and the pipelined scrape write the delta log
+            self.database_driver.add_recipe_insert_listener(RecipeDeltaLog(recipe_snapshot_directory).append)
+
+        self.link_checker = link_checker if link_checker is not None else LinkChecker()
+
+        # Throughput of scrape_and_insert_recipes over every call, the pipelined scrape keeps its own per run
+        self.stage_counters = {name: StageCounters(name) for name in RecipeScraper.STAGE_NAMES}
+
+    def scrape_and_insert_recipes_pipelined(self, num_recipes: int, **pipeline_options) -> dict:
+        """
+        Scrapes and inserts recipes with fetch, transform, link check, normalize and insert running concurrently,
+        resuming an interrupted run of the same size from its checkpoint
+        :param pipeline_options: IngestPipeline keyword arguments (batch sizes, queue size, checkpoint path)
+        :return: insertion report with per-stage statistics, see IngestPipeline.run
+        """
+        return IngestPipeline(self, **pipeline_options).run(num_recipes)
 
     def scrape_and_insert_recipes(self, num_recipes: int):
         # Get random recipes and transform to remove unused data
+        start_time = time.perf_counter()
         random_recipe_list = self.get_random_recipes(num_recipes)
+        if random_recipe_list is None:
+            raise RuntimeError("Could not get random recipes")
+        fetched_count = len(random_recipe_list["recipes"])
+        self.stage_counters["fetch"].record(fetched_count, fetched_count, time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
         transformed_random_recipes = self.transform_recipe_structure(random_recipe_list)
+        self.stage_counters["transform"].record(fetched_count, len(transformed_random_recipes), time.perf_counter() - start_time)
 
+        start_time = time.perf_counter()
         valid_recipe_list = self.check_and_normalize_recipes(transformed_random_recipes)
-        self.database_driver.insert_recipe_list(valid_recipe_list)
+        self.stage_counters["check_and_normalize"].record(len(transformed_random_recipes), len(valid_recipe_list), time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        insert_report = self.database_driver.insert_recipe_list(valid_recipe_list)
+        self.stage_counters["insert"].record(len(valid_recipe_list), len(insert_report["inserted"]), time.perf_counter() - start_time)
+        return insert_report
 
     def get_random_recipes(self, num_recipes: int) -> dict | None:
         """
@@ -38,12 +92,12 @@ class RecipeScraper:
         :return: dict of "num_recipes" number of random recipes
         """
         endpoint = '/recipes/random'
-        url = f'{BASE_URL}{endpoint}'
+        url = f'{self.base_url}{endpoint}'
 
         # Parameters for the request
         params = {
             'number': num_recipes,  # Number of recipes to return
-            'apiKey': API_KEY,  # Your Spoonacular API key
+            'apiKey': self.api_key,  # Your Spoonacular API key
             'includeNutrition': False,
             'exclude-tags': "foodista.com"
         }
@@ -64,12 +118,21 @@ class RecipeScraper:
         :param recipe_list_obj: list of recipes with API schema
         :return: List of recipes ready to be inserted into DB
         """
+        # Resolve every URL of the batch in one query instead of one round-trip per recipe
+        existing_urls = self.database_driver.get_existing_source_urls([recipe["sourceUrl"] for recipe in recipe_list_obj["recipes"]])
+
         recipes_list = []
+        batch_urls = set()
         for recipe in recipe_list_obj["recipes"]:
-            if self.database_driver.recipe_already_in_db(recipe["sourceUrl"]):
+            if recipe["sourceUrl"] in existing_urls:
                 logger.warning(f"Recipe with URL '{recipe["sourceUrl"]}' already exists.")
                 continue
 
+            if recipe["sourceUrl"] in batch_urls:
+                logger.warning(f"Recipe with URL '{recipe["sourceUrl"]}' is duplicated in this batch.")
+                continue
+            batch_urls.add(recipe["sourceUrl"])
+
             new_recipe = {
                 "recipe_name": recipe["title"],
                 "source_url": recipe["sourceUrl"],
@@ -85,36 +148,52 @@ class RecipeScraper:
         :param recipe_list: List of recipes to check for validity and transform
         :return: List of recipes that are valid and normalized
         """
-        filtered_recipes = []
+        # Check every source URL concurrently
+        live_urls = self.link_checker.check_urls([recipe_dict["source_url"] for recipe_dict in recipe_list])
+        live_recipes = [recipe_dict for recipe_dict in recipe_list if live_urls[recipe_dict["source_url"]]]
+
+        # Normalize ingredients of every live recipe in one pass
+        return self.normalize_recipe_list(live_recipes)
+
+    def normalize_recipe_list(self, recipe_list):
+        """
+        Normalizes the ingredients of every recipe with a single normalizer call, so large scrapes can be parsed in
+        parallel and contextually matched in one batch. Recipes with too many unknown ingredients are dropped.
+        :param recipe_list: List of recipes to normalize
+        :return: List of normalized recipes
+        """
+        all_ingredients = [ingredient for recipe_dict in recipe_list for ingredient in recipe_dict["ingredients"]]
+        all_ingredient_names = self.ingredient_normalizer.normalize_ingredient_strings(all_ingredients)
+
+        normalized_recipes = []
+        offset = 0
         for recipe_dict in recipe_list:
+            ingredient_names = all_ingredient_names[offset:offset + len(recipe_dict["ingredients"])]
+            offset += len(recipe_dict["ingredients"])
             try:
-                response = requests.head(recipe_dict["source_url"], allow_redirects=True, stream=True)
-                if response.status_code == 200:
-                    # Normalize ingredients then append
-                    normalized_recipe = self.normalize_ingredients_from_dict(recipe_dict)
-                    filtered_recipes.append(normalized_recipe)
-            except requests.RequestException as e:
-                continue
+                normalized_recipes.append(self.normalize_ingredients_from_dict(recipe_dict, ingredient_names))
             except RuntimeError as e:
                 error_msg = f"Could not add recipe at URL '{recipe_dict["source_url"]}' due to exception: {e}"
                 logger.error(error_msg)
                 continue
-        return filtered_recipes
+        return normalized_recipes
 
-    def normalize_ingredients_from_dict(self, recipe_dict):
+    def normalize_ingredients_from_dict(self, recipe_dict, ingredient_names: List[str | None] | None = None):
         """
         Iterates through the ingredients in the recipe and normalizes each of the ingredients
         :param recipe_dict: recipe dict to normalize
+        :param ingredient_names: already normalized names aligned with the recipe ingredients, normalized here if None
         :return: recipe dict with ingredients normalized
         """
         number_unknown_ingredients = 0
         new_ingredients = []
-        for ingredient in recipe_dict["ingredients"]:
-            # Normalize and append ingredient names
-            ingredient_names, _ = self.ingredient_normalizer.generate_normalized_ingredients(ingredient)
 
-            if len(ingredient_names):
-                ingredient_name = ingredient_names[0]
+        if ingredient_names is None:
+            # Normalize the whole recipe at once so contextual matches are encoded in a single batch
+            ingredient_names = self.ingredient_normalizer.normalize_ingredient_strings(recipe_dict["ingredients"])
+
+        for ingredient, ingredient_name in zip(recipe_dict["ingredients"], ingredient_names):
+            if ingredient_name:
                 new_ingredients.append(ingredient_name)
             else:
                 number_unknown_ingredients += 1  # Ingredient unknown, add to running count
@@ -134,13 +213,13 @@ class RecipeScraper:
     def search_recipes_by_ingredient(self, ingredients: str) -> dict | None:
         # Method to search for recipes based on ingredients
         endpoint = '/recipes/findByIngredients'
-        url = f'{BASE_URL}{endpoint}'
+        url = f'{self.base_url}{endpoint}'
 
         # Parameters for the request
         params = {
             'ingredients': ingredients,  # A comma-separated list of ingredients
             'number': 5,  # Number of recipes to return
-            'apiKey': API_KEY  # Your Spoonacular API key
+            'apiKey': self.api_key  # Your Spoonacular API key
         }
 
         # Make the GET request to Spoonacular API
@@ -156,9 +235,20 @@ class RecipeScraper:
 
 if __name__ == "__main__":
     raw_ingredient_reader = RawJsonIngredientReader()
-    ingredient_normalizer = IngredientNormalizer(raw_ingredient_reader)
+    normalization_cache = NormalizationCache(persistent_path=NormalizationCache.DEFAULT_PERSISTENT_PATH)
+    ingredient_normalizer = IngredientNormalizer(raw_ingredient_reader, normalization_cache, EmbeddingStore(), parse_workers=os.cpu_count())
 
-    # Init recipe scraper
-    recipe_scraper = RecipeScraper(ingredient_normalizer)
+    parser = argparse.ArgumentParser(description="Scrape random recipes and insert them into the database")
+    parser.add_argument("num_recipes", type=int, nargs="?", default=10)
+    parser.add_argument("--pipelined", action="store_true", help="stream through concurrent stages, resumable from a checkpoint")
+    args = parser.parse_args()
 
-    recipe_scraper.scrape_and_insert_recipes(10)  # Scrape 10 recipes
+    # Init recipe scraper
+    recipe_scraper = RecipeScraper(ingredient_normalizer, recipe_snapshot_directory=RECIPE_SNAPSHOT_DIRECTORY)
+
+    if args.pipelined:
+        recipe_scraper.scrape_and_insert_recipes_pipelined(args.num_recipes)
+    else:
+        recipe_scraper.scrape_and_insert_recipes(args.num_recipes)
+    recipe_scraper.link_checker.close()
+    ingredient_normalizer.close()
@@ -0,0 +1,354 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+import numpy as np
+from filelock import FileLock
+import logging_config, logging
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+def hash_source_url(source_url: str) -> int:
+    """64-bit hash of a source URL, lets a snapshot check for duplicates without decoding its URLs"""
+    return int.from_bytes(hashlib.blake2b(source_url.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class RecipeDeltaLog:
+    """
+    JSON lines file of the recipes inserted after a snapshot was exported, shared by every snapshot version in a
+    directory. Each snapshot remembers the log offset when its export started, so a reader only replays what the
+    snapshot may be missing. Replaying a recipe the snapshot already holds is harmless, RecipeMatcher skips known source URLs.
+    Offsets are logical positions that keep growing across compactions: once no kept snapshot version needs the start of
+    the log, RecipeSnapshotWriter drops it and the file starts with a header line holding the offset of its first recipe.
+    """
+    FILE_NAME = "delta.jsonl"
+    LOCK_FILE_NAME = "delta.jsonl.lock"
+    HEADER_PREFIX = b'{"base_offset": '
+
+    def __init__(self, directory: Path | str):
+        self.path = Path(directory) / RecipeDeltaLog.FILE_NAME
+        # Held by appends, get_size and compact across processes, so offsets always fall on a line boundary and no
+        # append lands in a file that compaction is replacing. Reads don't take it
+        self._file_lock = FileLock(Path(directory) / RecipeDeltaLog.LOCK_FILE_NAME)
+
+    def append(self, recipe_list: List[dict]):
+        """
+        Appends the recipes in a single write. Registered as a recipe insert listener on the driver of every process that
+        inserts recipes: the API workers (RecipeManager) and the scraper (RecipeScraper with a recipe_snapshot_directory)
+        :param recipe_list: inserted recipe dicts, only "recipe_name", "source_url" and "ingredients" are kept
+        """
+        if not recipe_list:
+            return
+        lines = "".join(
+            json.dumps({"recipe_name": recipe["recipe_name"], "source_url": recipe["source_url"], "ingredients": recipe["ingredients"]},
+                       ensure_ascii=False) + "\n"
+            for recipe in recipe_list
+        )
+        with self._file_lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+    def get_size(self) -> int:
+        """Logical offset of the end of the log"""
+        with self._file_lock:
+            try:
+                with open(self.path, "rb") as f:
+                    base_offset, header_length = self._read_header(f)
+                    return base_offset + os.fstat(f.fileno()).st_size - header_length
+            except FileNotFoundError:
+                return 0
+
+    def read(self, offset: int) -> Tuple[List[dict], int]:
+        """
+        Reads the recipes appended after offset. A line that is still being written is left for the next call.
+        :return: (recipe dicts, offset to continue from)
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return [], offset
+
+        # The file opened is read consistently even if compaction replaces it meanwhile
+        with f:
+            base_offset, header_length = self._read_header(f)
+            if offset < base_offset:
+                logger.warning(f"Delta log offset {offset} was compacted, replaying from {base_offset}. Reopen the latest snapshot to pick up the recipes in between")
+                offset = base_offset
+            f.seek(header_length + offset - base_offset)
+            data = f.read()
+
+        complete_length = data.rfind(b"\n") + 1
+        recipe_list = [json.loads(line) for line in data[:complete_length].splitlines() if line.strip()]
+        return recipe_list, offset + complete_length
+
+    def compact(self, offset: int) -> int:
+        """
+        Drops the recipes before offset, rewriting the rest of the log under a header line
+        :param offset: oldest offset any reader still needs, a line boundary returned by get_size or read
+        :return: number of bytes dropped
+        """
+        with self._file_lock:
+            try:
+                with open(self.path, "rb") as f:
+                    base_offset, header_length = self._read_header(f)
+                    if offset <= base_offset:
+                        return 0
+                    f.seek(header_length + offset - base_offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return 0
+
+            temporary_path = self.path.with_name(f".{RecipeDeltaLog.FILE_NAME}.{os.getpid()}.tmp")
+            with open(temporary_path, "wb") as f:
+                f.write(RecipeDeltaLog.HEADER_PREFIX + str(offset).encode() + b"}\n")
+                f.write(data)
+            os.replace(temporary_path, self.path)
+
+        logger.info(f"Compacted recipe delta log to offset {offset}, dropped {offset - base_offset} bytes")
+        return offset - base_offset
+
+    @staticmethod
+    def _read_header(f) -> Tuple[int, int]:
+        """
+        Reads the header line of a compacted log, f must be positioned at the start of the file
+        :return: (logical offset of the first recipe line, length of the header line)
+        """
+        first_line = f.readline()
+        if not first_line.startswith(RecipeDeltaLog.HEADER_PREFIX) or not first_line.endswith(b"\n"):
+            return 0, 0
+        return json.loads(first_line)["base_offset"], len(first_line)
+
+
+class RecipeSnapshot:
+    """
+    Read-only recipe corpus written by RecipeSnapshotWriter and opened memory-mapped, so every worker process on a host
+    shares the same pages instead of loading its own copy of the recipe collection. Files of one snapshot version:
+        recipe_indptr.npy             int64, recipe i uses recipe_ingredient_ids[recipe_indptr[i]:recipe_indptr[i + 1]]
+        recipe_ingredient_ids.npy     int32, sorted unique ingredient IDs of every recipe (CSR recipe x ingredient matrix)
+        posting_indptr.npy            int64, same layout for the transposed matrix
+        posting_recipe_indexes.npy    int32, ascending indexes of the recipes using each ingredient ID
+        metadata.npy                  uint8, UTF-8 recipe_name, source_url and JSON ingredient list of every recipe back to back
+        metadata_offsets.npy          int64, field j of recipe i is metadata[metadata_offsets[3i + j]:metadata_offsets[3i + j + 1]]
+        source_url_hashes.npy         uint64, sorted hashes of every source URL, see hash_source_url
+        vocabulary.json               ingredient ID -> normalized ingredient name
+        manifest.json                 recipe count, corpus version and delta log offset of the export
+    """
+    CURRENT_FILE_NAME = "CURRENT"  # Name of the latest snapshot version directory, replaced atomically by the writer
+    MANIFEST_FILE_NAME = "manifest.json"
+    VOCABULARY_FILE_NAME = "vocabulary.json"
+    ARRAY_NAMES = ["recipe_indptr", "recipe_ingredient_ids", "posting_indptr", "posting_recipe_indexes", "metadata",
+                   "metadata_offsets", "source_url_hashes"]
+    FIELD_NAMES = ["recipe_name", "source_url", "ingredients"]  # Stored per recipe, ingredients keep their original order
+
+    def __init__(self, version_directory: Path, delta_log: RecipeDeltaLog):
+        self.version_directory = Path(version_directory)
+        self.delta_log = delta_log
+
+        with open(self.version_directory / RecipeSnapshot.MANIFEST_FILE_NAME, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        with open(self.version_directory / RecipeSnapshot.VOCABULARY_FILE_NAME, "r", encoding="utf-8") as f:
+            self.vocabulary: List[str] = json.load(f)
+
+        # Zero-copy views of the mapped files, nothing is read until a query touches it
+        arrays = {name: np.load(self.version_directory / f"{name}.npy", mmap_mode="r") for name in RecipeSnapshot.ARRAY_NAMES}
+        self.recipe_indptr = arrays["recipe_indptr"]
+        self.recipe_ingredient_ids = arrays["recipe_ingredient_ids"]
+        self.posting_indptr = arrays["posting_indptr"]
+        self.posting_recipe_indexes = arrays["posting_recipe_indexes"]
+        self.metadata = arrays["metadata"]
+        self.metadata_offsets = arrays["metadata_offsets"]
+        self.source_url_hashes = arrays["source_url_hashes"]
+
+    @staticmethod
+    def open(directory: Path | str) -> "RecipeSnapshot":
+        """Opens the latest snapshot version exported to directory"""
+        directory = Path(directory)
+        try:
+            version_name = (directory / RecipeSnapshot.CURRENT_FILE_NAME).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            raise RuntimeError(f"No recipe snapshot exported to {directory}")
+
+        snapshot = RecipeSnapshot(directory / version_name, RecipeDeltaLog(directory))
+        logger.info(f"Opened recipe snapshot {version_name} with {snapshot.recipe_count} recipes")
+        return snapshot
+
+    @property
+    def recipe_count(self) -> int:
+        return self.manifest["recipe_count"]
+
+    @property
+    def corpus_version(self) -> int:
+        return self.manifest["corpus_version"]
+
+    @property
+    def delta_offset(self) -> int:
+        return self.manifest["delta_offset"]
+
+    def get_recipe_lengths(self) -> np.ndarray:
+        return np.diff(self.recipe_indptr).astype(np.int32)
+
+    def get_recipe_ingredient_ids(self, recipe_index: int) -> np.ndarray:
+        return self.recipe_ingredient_ids[self.recipe_indptr[recipe_index]:self.recipe_indptr[recipe_index + 1]]
+
+    def get_posting(self, ingredient_id: int) -> np.ndarray:
+        return self.posting_recipe_indexes[self.posting_indptr[ingredient_id]:self.posting_indptr[ingredient_id + 1]]
+
+    def get_recipe(self, recipe_index: int) -> dict:
+        """Decodes one recipe in the DB schema, { "recipe_name", "source_url", "ingredients" }"""
+        field_count = len(RecipeSnapshot.FIELD_NAMES)
+        offsets = self.metadata_offsets[field_count * recipe_index:field_count * (recipe_index + 1) + 1]
+        fields = [self.metadata[start:end].tobytes().decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+        recipe = dict(zip(RecipeSnapshot.FIELD_NAMES, fields))
+        recipe["ingredients"] = json.loads(recipe["ingredients"])
+        return recipe
+
+    def contains_source_url(self, source_url: str) -> bool:
+        url_hash = np.uint64(hash_source_url(source_url))
+        position = np.searchsorted(self.source_url_hashes, url_hash)
+        return bool(position < len(self.source_url_hashes) and self.source_url_hashes[position] == url_hash)
+
+
+class RecipeSnapshotWriter:
+    """
+    Exports the recipe corpus to a new snapshot version in directory and points CURRENT at it.
+    Workers that already opened an older version keep using it, the two newest versions are kept on disk, and the delta
+    log is compacted to the oldest offset they need.
+    """
+    DEFAULT_DIRECTORY = Path(__file__).resolve().parent / "cache" / "recipe_snapshot"
+    VERSIONS_KEPT = 2
+
+    def __init__(self, directory: Path | str = DEFAULT_DIRECTORY):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.delta_log = RecipeDeltaLog(self.directory)
+
+    def export(self, recipe_list: Iterable[dict], corpus_version: int = 0, delta_offset: int | None = None) -> Path:
+        """
+        Writes recipe_list as a new snapshot version
+        :param recipe_list: recipe dicts in the DB schema, recipes with an already exported source URL are skipped
+        :param corpus_version: stored corpus version the recipes were read at
+        :param delta_offset: delta log size before recipe_list was read, the current size if None. Recipes inserted
+        while the export runs are then replayed from the delta log by readers of this version
+        :return: directory of the new snapshot version
+        """
+        if delta_offset is None:
+            delta_offset = self.delta_log.get_size()
+
+        ingredient_ids = {}
+        vocabulary = []
+        recipe_lengths = []
+        recipe_ingredient_ids = []
+        metadata = bytearray()
+        metadata_offsets = [0]
+        source_url_hashes = set()
+        for recipe in recipe_list:
+            url_hash = hash_source_url(recipe["source_url"])
+            if url_hash in source_url_hashes:
+                continue
+            source_url_hashes.add(url_hash)
+
+            ids = set()
+            for ingredient_name in recipe["ingredients"]:
+                ingredient_id = ingredient_ids.get(ingredient_name)
+                if ingredient_id is None:
+                    ingredient_id = ingredient_ids[ingredient_name] = len(vocabulary)
+                    vocabulary.append(ingredient_name)
+                ids.add(ingredient_id)
+            recipe_ingredient_ids.extend(sorted(ids))
+            recipe_lengths.append(len(ids))
+
+            for field_value in [recipe["recipe_name"], recipe["source_url"], json.dumps(recipe["ingredients"], ensure_ascii=False)]:
+                metadata += field_value.encode("utf-8")
+                metadata_offsets.append(len(metadata))
+
+        recipe_indptr = np.zeros(len(recipe_lengths) + 1, dtype=np.int64)
+        np.cumsum(recipe_lengths, out=recipe_indptr[1:])
+        recipe_ingredient_ids = np.array(recipe_ingredient_ids, dtype=np.int32)
+
+        # Transpose: a stable sort of the entries by ingredient ID keeps each posting in ascending recipe order
+        entry_recipe_indexes = np.repeat(np.arange(len(recipe_lengths), dtype=np.int32), recipe_lengths)
+        order = np.argsort(recipe_ingredient_ids, kind="stable")
+        posting_indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(recipe_ingredient_ids, minlength=len(vocabulary)), out=posting_indptr[1:])
+
+        arrays = {
+            "recipe_indptr": recipe_indptr,
+            "recipe_ingredient_ids": recipe_ingredient_ids,
+            "posting_indptr": posting_indptr,
+            "posting_recipe_indexes": entry_recipe_indexes[order],
+            "metadata": np.frombuffer(bytes(metadata), dtype=np.uint8),
+            "metadata_offsets": np.array(metadata_offsets, dtype=np.int64),
+            "source_url_hashes": np.array(sorted(source_url_hashes), dtype=np.uint64),
+        }
+        manifest = {"recipe_count": len(recipe_lengths), "corpus_version": corpus_version, "delta_offset": delta_offset,
+                    "exported_at": time.time()}
+        return self._write_version(arrays, vocabulary, manifest)
+
+    def export_from_database(self, database_driver) -> Path:
+        """Exports every recipe of the recipe collection"""
+        delta_offset = self.delta_log.get_size()
+        corpus_version = database_driver.get_corpus_version()
+        return self.export(database_driver.get_all_recipes({"recipe_name": 1, "source_url": 1, "ingredients": 1}), corpus_version, delta_offset)
+
+    def _write_version(self, arrays: dict, vocabulary: List[str], manifest: dict) -> Path:
+        version_name = f"snapshot-{time.time_ns()}"
+        # Written under a temporary name and renamed so CURRENT never points at a partial version
+        temporary_directory = self.directory / f".{version_name}.{os.getpid()}.tmp"
+        temporary_directory.mkdir()
+        for name, array in arrays.items():
+            with open(temporary_directory / f"{name}.npy", "wb") as f:
+                np.save(f, array)
+        (temporary_directory / RecipeSnapshot.VOCABULARY_FILE_NAME).write_text(json.dumps(vocabulary, ensure_ascii=False), encoding="utf-8")
+        (temporary_directory / RecipeSnapshot.MANIFEST_FILE_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+
+        version_directory = self.directory / version_name
+        os.replace(temporary_directory, version_directory)
+        current_path = self.directory / RecipeSnapshot.CURRENT_FILE_NAME
+        temporary_current_path = self.directory / f".{RecipeSnapshot.CURRENT_FILE_NAME}.{os.getpid()}.tmp"
+        temporary_current_path.write_text(version_name, encoding="utf-8")
+        os.replace(temporary_current_path, current_path)
+        logger.info(f"Exported recipe snapshot {version_name} with {manifest['recipe_count']} recipes and {len(vocabulary)} ingredients")
+
+        kept_versions = self._remove_old_versions()
+        self._compact_delta_log(kept_versions)
+        return version_directory
+
+    def _remove_old_versions(self) -> List[Path]:
+        """:return: directories of the versions kept"""
+        # Removing the files of a version a worker still has mapped is safe, the pages stay valid until it unmaps them
+        versions = sorted((path for path in self.directory.glob("snapshot-*") if path.is_dir()), key=lambda path: int(path.name.split("-")[1]))
+        for version_directory in versions[:-RecipeSnapshotWriter.VERSIONS_KEPT]:
+            shutil.rmtree(version_directory, ignore_errors=True)
+        return versions[-RecipeSnapshotWriter.VERSIONS_KEPT:]
+
+    def _compact_delta_log(self, kept_versions: List[Path]):
+        """
+        Drops the delta log recipes every kept version already holds. Workers that opened a removed version have read
+        the log up to their last refresh, usually far past the oldest kept version's offset
+        """
+        try:
+            delta_offsets = [json.loads((version_directory / RecipeSnapshot.MANIFEST_FILE_NAME).read_text(encoding="utf-8"))["delta_offset"]
+                             for version_directory in kept_versions]
+        except (FileNotFoundError, KeyError, ValueError) as e:
+            # A version being removed by another writer, or written by an older version of this code
+            logger.warning(f"Not compacting the recipe delta log, a snapshot manifest couldn't be read: {e}")
+            return
+        if delta_offsets:
+            self.delta_log.compact(min(delta_offsets))
+
+
+if __name__ == "__main__":
+    import argparse
+    from recipe_manager.mongodb_driver import DatabaseDriver
+
+    parser = argparse.ArgumentParser(description="Export the recipe collection to a memory-mapped snapshot")
+    parser.add_argument("directory", nargs="?", type=Path, default=RecipeSnapshotWriter.DEFAULT_DIRECTORY)
+    args = parser.parse_args()
+
+    print(RecipeSnapshotWriter(args.directory).export_from_database(DatabaseDriver()))
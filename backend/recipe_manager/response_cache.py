@@ -0,0 +1,75 @@
+import threading
+from typing import Hashable, List, Tuple
+
+import logging_config, logging
+from recipe_manager.lru_cache import LRUCache
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+class RecipeResponseCache:
+    """
+    Cache of recipe query responses keyed by the canonical (sorted, deduplicated) set of normalized ingredients and the
+    missing ingredient budget, so pantries listing the same ingredients in any order or wording share one entry.
+    Entries are evicted least recently used, expire after ttl_seconds, and are all dropped when the recipe corpus
+    version changes. Each entry remembers how long its response took to compute, reported as saved time on hits.
+    """
+    DEFAULT_MAX_SIZE = 5000
+    DEFAULT_TTL_SECONDS = 10 * 60
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl_seconds: float | None = DEFAULT_TTL_SECONDS):
+        self.responses = LRUCache(max_size, ttl_seconds)
+        self.corpus_version = None
+        self.saved_seconds = 0.0
+
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(normalized_ingredients: List[str], num_missing_ingredients_allowed: int) -> Tuple[Tuple[str, ...], int]:
+        return tuple(sorted(set(normalized_ingredients))), num_missing_ingredients_allowed
+
+    def set_corpus_version(self, corpus_version: int):
+        """Drops every cached response if corpus_version differs from the version they were computed with"""
+        with self._lock:
+            if corpus_version == self.corpus_version:
+                return
+
+            self.corpus_version = corpus_version
+            self.responses.clear()
+            logger.info(f"Recipe response cache set to corpus version {corpus_version}")
+
+    def get(self, key: Hashable) -> dict | None:
+        """Returns the cached response for key, None if it isn't cached or has expired"""
+        entry = self.responses.get(key)
+        if entry is None:
+            return None
+
+        response, compute_seconds = entry
+        with self._lock:
+            self.saved_seconds += compute_seconds
+        return response
+
+    def put(self, key: Hashable, response: dict, compute_seconds: float, corpus_version: int | None):
+        """
+        :param compute_seconds: time taken to compute response, added to saved_seconds on every later hit
+        :param corpus_version: corpus version read before computing response, the response isn't stored if the
+        version changed while it was being computed
+        """
+        with self._lock:
+            if corpus_version != self.corpus_version:
+                return
+            self.responses.put(key, (response, compute_seconds))
+
+    def get_statistics(self) -> dict:
+        lookups = self.responses.hits + self.responses.misses
+        return {
+            "hits": self.responses.hits,
+            "misses": self.responses.misses,
+            "hit_ratio": self.responses.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+            "average_saved_seconds": self.saved_seconds / self.responses.hits if self.responses.hits else 0.0,
+            "size": len(self.responses),
+            "max_size": self.responses.max_size,
+            "corpus_version": self.corpus_version
+        }
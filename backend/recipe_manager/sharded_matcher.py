@@ -0,0 +1,183 @@
+import heapq
+import itertools
+import multiprocessing
+import os
+import threading
+import zlib
+from typing import Dict, Iterable, List, Tuple
+
+import logging_config, logging
+from recipe_manager.mongodb_driver import NUMBER_RECIPES_TO_RETURN
+from recipe_manager.recipe_matcher import RecipeMatcher
+
+# Get logger instance
+logger = logging.getLogger(__name__)
+
+
+def run_shard_worker(connection):
+    """
+    Main loop of one shard process. Holds a RecipeMatcher of the shard's recipes and answers the coordinator's
+    commands, every result carries the recipe's global insertion sequence so the coordinator can merge ties in order.
+    """
+    recipe_matcher = RecipeMatcher()
+    sequences: Dict[str, int] = {}  # Source URL -> global insertion sequence
+
+    def with_sequences(results: List[dict]) -> List[Tuple[int, int, dict]]:
+        return [(result["difference_count"], sequences[result["source_url"]], result) for result in results]
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+
+        command, args = message
+        try:
+            if command == "add":
+                new_recipes = []
+                for recipe, sequence in args:
+                    if recipe["source_url"] not in sequences:
+                        sequences[recipe["source_url"]] = sequence
+                        new_recipes.append(recipe)
+                recipe_matcher.add_recipes(new_recipes)
+                response = len(new_recipes)
+            elif command == "difference":
+                response = with_sequences(recipe_matcher.get_ingredient_set_difference(*args))
+            elif command == "ranked":
+                response = with_sequences(recipe_matcher.get_ranked_recipes(*args))
+            elif command == "ranked_batch":
+                response = [with_sequences(results) for results in recipe_matcher.get_ranked_recipes_batch(*args)]
+            else:
+                raise ValueError(f"Unknown shard command '{command}'")
+            connection.send(("ok", response))
+        except Exception as e:
+            connection.send(("error", f"{type(e).__name__}: {e}"))
+    connection.close()
+
+
+class ShardedRecipeMatcher:
+    """
+    Same interface as RecipeMatcher, with the corpus partitioned across local worker processes so each process only
+    holds and scans its shard. Recipes are assigned to a shard by a hash of their source URL, the collection's unique key,
+    so duplicate inserts always reach the shard that already holds the recipe.
+
+    A query is scattered to every shard, each returns its own top-K sorted by (missing count, insertion sequence), and
+    the coordinator merges the sorted lists with a heap. The merge stops as soon as K results are taken, a shard whose
+    best remaining result can't beat the current K-th is never read further. Results and tie order are the same as
+    a single RecipeMatcher holding every recipe.
+    """
+    DEFAULT_SHARD_COUNT = min(4, os.cpu_count() or 1)
+    LOAD_CHUNK_SIZE = 10000  # Recipes sent to a shard per message while loading
+
+    def __init__(self, recipe_list: Iterable[dict] | None = None, shard_count: int = DEFAULT_SHARD_COUNT):
+        if shard_count <= 0:
+            raise ValueError(f"Invalid shard count: {shard_count}")
+
+        # Spawned rather than forked, the parent may already hold model threads and database connections
+        context = multiprocessing.get_context("spawn")
+        self.connections = []
+        self.processes = []
+        for shard_number in range(shard_count):
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(target=run_shard_worker, args=(child_connection,), name=f"recipe_shard_{shard_number}", daemon=True)
+            process.start()
+            child_connection.close()
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+
+        self.recipe_count = 0
+        self._next_sequence = 0
+        # One query at a time owns every shard's pipe, a query needs all shards anyway
+        self._lock = threading.Lock()
+
+        if recipe_list:
+            self.add_recipes(recipe_list)
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.connections)
+
+    def __len__(self) -> int:
+        return self.recipe_count
+
+    def get_shard_number(self, source_url: str) -> int:
+        return zlib.crc32(source_url.encode("utf-8")) % self.shard_count
+
+    def add_recipes(self, recipe_list: Iterable[dict]):
+        """
+        Adds recipes to their shards. Recipes with a source URL that is already indexed are skipped.
+        :param recipe_list: recipe dicts in the DB schema, { "recipe_name", "source_url", "ingredients" }
+        """
+        with self._lock:
+            shard_recipes = [[] for _ in range(self.shard_count)]
+            for recipe in recipe_list:
+                shard_recipes[self.get_shard_number(recipe["source_url"])].append((recipe, self._next_sequence))
+                self._next_sequence += 1
+
+            added_count = 0
+            for chunk_start in range(0, max(map(len, shard_recipes)), ShardedRecipeMatcher.LOAD_CHUNK_SIZE):
+                chunks = [recipes[chunk_start:chunk_start + ShardedRecipeMatcher.LOAD_CHUNK_SIZE] for recipes in shard_recipes]
+                added_count += sum(self._scatter([("add", chunk) for chunk in chunks]))
+
+            self.recipe_count += added_count
+            if added_count:
+                logger.info(f"Added {added_count} recipes to {self.shard_count} recipe matcher shards, {self.recipe_count} recipes indexed")
+
+    def get_ingredient_set_difference(self, ingredient_list: list[str], number_of_recipes: int = NUMBER_RECIPES_TO_RETURN) -> List[dict]:
+        """Sharded equivalent of RecipeMatcher.get_ingredient_set_difference"""
+        if number_of_recipes <= 0:
+            return []
+        with self._lock:
+            shard_results = self._scatter([("difference", (ingredient_list, number_of_recipes))] * self.shard_count)
+        return self.merge_shard_results(shard_results, number_of_recipes)
+
+    def get_ranked_recipes(self, ingredient_list: list[str], num_missing_ingredients_allowed: int, number_of_recipes: int, page: int = 0) -> List[dict]:
+        """Sharded equivalent of RecipeMatcher.get_ranked_recipes, every shard returns the results up to the end of the page"""
+        if number_of_recipes <= 0:
+            return []
+        first_result = page * number_of_recipes
+        with self._lock:
+            shard_results = self._scatter([("ranked", (ingredient_list, num_missing_ingredients_allowed, first_result + number_of_recipes, 0))] * self.shard_count)
+        return self.merge_shard_results(shard_results, first_result + number_of_recipes)[first_result:]
+
+    def get_ranked_recipes_batch(self, ingredient_lists: List[list[str]], num_missing_ingredients_allowed: int, number_of_recipes: int) -> List[List[dict]]:
+        """Sharded equivalent of RecipeMatcher.get_ranked_recipes_batch, each shard scores every pantry with its own sparse product"""
+        if number_of_recipes <= 0 or not ingredient_lists:
+            return [[] for _ in ingredient_lists]
+        with self._lock:
+            shard_results = self._scatter([("ranked_batch", (ingredient_lists, num_missing_ingredients_allowed, number_of_recipes))] * self.shard_count)
+        return [self.merge_shard_results(pantry_results, number_of_recipes) for pantry_results in zip(*shard_results)]
+
+    @staticmethod
+    def merge_shard_results(shard_results: Iterable[List[Tuple[int, int, dict]]], number_of_recipes: int) -> List[dict]:
+        """
+        Merges the sorted (missing count, sequence, result) lists of the shards into the global top number_of_recipes.
+        heapq.merge is lazy, only the heads of the shard lists are compared and merging stops after number_of_recipes.
+        """
+        merged = heapq.merge(*shard_results, key=lambda shard_result: (shard_result[0], shard_result[1]))
+        return [result for _, _, result in itertools.islice(merged, number_of_recipes)]
+
+    def _scatter(self, messages: List[tuple]) -> list:
+        """Sends one message to every shard, then gathers the responses in shard order. Must be called holding _lock."""
+        for connection, message in zip(self.connections, messages):
+            connection.send(message)
+
+        responses = [connection.recv() for connection in self.connections]
+        errors = [response for status, response in responses if status == "error"]
+        if errors:
+            raise RuntimeError(f"Recipe matcher shard failed: {errors[0]}")
+        return [response for _, response in responses]
+
+    def close(self):
+        """Stops the shard processes"""
+        with self._lock:
+            for connection, process in zip(self.connections, self.processes):
+                if process.is_alive():
+                    try:
+                        connection.send(None)
+                    except OSError:
+                        pass
+            for connection, process in zip(self.connections, self.processes):
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+                connection.close()
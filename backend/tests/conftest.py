@@ -0,0 +1,5 @@
+import os
+from pathlib import Path
+
+# Test data such as baseline_ingredient_list.json is located relative to the backend root
+os.environ.setdefault("RECIPE_APP_BACKEND_ROOT", str(Path(__file__).resolve().parents[1]))
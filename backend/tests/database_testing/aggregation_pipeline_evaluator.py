@@ -0,0 +1,121 @@
+class AggregationPipelineEvaluator:
+    """
+    Runs MongoDB aggregation pipelines over a list of documents in memory, so tests can execute the pipelines built by
+    DatabaseDriver instead of checking their shape. Only implements the stages, query operators and expression operators
+    those pipelines use, anything else raises NotImplementedError.
+    Sorting is stable, documents tied on every sort key keep their collection (insertion) order.
+    """
+    def __init__(self, documents: list[dict]):
+        self.documents = documents
+
+    def aggregate(self, pipeline: list[dict]) -> list[dict]:
+        # $addFields copies the documents it changes, the collection itself is never modified
+        documents = list(self.documents)
+        for stage in pipeline:
+            (stage_name, stage_spec), = stage.items()
+            if stage_name == "$match":
+                documents = [document for document in documents if self.matches(document, stage_spec)]
+            elif stage_name == "$addFields":
+                documents = [self.add_fields(document, stage_spec) for document in documents]
+            elif stage_name == "$sort":
+                documents = self.sort(documents, stage_spec)
+            elif stage_name == "$skip":
+                documents = documents[stage_spec:]
+            elif stage_name == "$limit":
+                documents = documents[:stage_spec]
+            else:
+                raise NotImplementedError(f"Unsupported stage {stage_name}")
+        return documents
+
+    def matches(self, document: dict, query: dict) -> bool:
+        for key, condition in query.items():
+            if key == "$or":
+                if not any(self.matches(document, sub_query) for sub_query in condition):
+                    return False
+            elif key.startswith("$"):
+                raise NotImplementedError(f"Unsupported query operator {key}")
+            elif not self.field_matches(document, key, condition):
+                return False
+        return True
+
+    @staticmethod
+    def field_matches(document: dict, field: str, condition) -> bool:
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        exists = field in document
+        value = document.get(field)
+        # Query operators on an array field match if any element matches
+        values = value if isinstance(value, list) else [value]
+        for operator, operand in condition.items():
+            if operator == "$exists":
+                matched = exists == bool(operand)
+            elif operator == "$eq":
+                matched = value == operand or any(element == operand for element in values)
+            elif operator == "$in":
+                matched = any(element in operand for element in values)
+            elif operator == "$lte":
+                matched = exists and any(element is not None and element <= operand for element in values)
+            else:
+                raise NotImplementedError(f"Unsupported query operator {operator}")
+            if not matched:
+                return False
+        return True
+
+    def add_fields(self, document: dict, fields: dict) -> dict:
+        document = dict(document)
+        for field, expression in fields.items():
+            document[field] = self.evaluate(document, expression)
+        return document
+
+    @staticmethod
+    def sort(documents: list[dict], sort_spec: dict) -> list[dict]:
+        # Missing and null values sort before every number, as in MongoDB
+        for field, direction in reversed(list(sort_spec.items())):
+            documents = sorted(documents, key=lambda document: (document.get(field) is not None, document.get(field) or 0), reverse=direction == -1)
+        return documents
+
+    def evaluate(self, document: dict, expression):
+        if isinstance(expression, str) and expression.startswith("$"):
+            return document.get(expression[1:])
+        if isinstance(expression, list):
+            return [self.evaluate(document, element) for element in expression]
+        if not isinstance(expression, dict):
+            return expression
+
+        (operator, arguments), = expression.items()
+        if operator == "$ifNull":
+            *values, replacement = arguments
+            for value in values:
+                value = self.evaluate(document, value)
+                if value is not None:
+                    return value
+            return self.evaluate(document, replacement)
+
+        arguments = self.evaluate(document, arguments)
+        if operator == "$size":
+            if not isinstance(arguments, list):
+                raise TypeError(f"The argument to $size must be an array, got {arguments!r}")
+            return len(arguments)
+        if operator == "$subtract":
+            minuend, subtrahend = arguments
+            return None if minuend is None or subtrahend is None else minuend - subtrahend
+        if operator in ("$setUnion", "$setIntersection", "$setDifference"):
+            return self.evaluate_set_operator(operator, arguments)
+        raise NotImplementedError(f"Unsupported expression operator {operator}")
+
+    @staticmethod
+    def evaluate_set_operator(operator: str, arrays: list):
+        # Any null or missing argument makes the result null
+        if any(array is None for array in arrays):
+            return None
+
+        # MongoDB leaves the order of set results unspecified, these keep the first array's order
+        if operator == "$setUnion":
+            elements = [element for array in arrays for element in array]
+        elif operator == "$setIntersection":
+            elements = [element for element in arrays[0] if all(element in array for array in arrays[1:])]
+        else:
+            first_array, second_array = arrays
+            elements = [element for element in first_array if element not in second_array]
+        return list(dict.fromkeys(elements))
@@ -0,0 +1,135 @@
+import copy
+import threading
+
+from recipe_manager.mongodb_driver import PANTRY_ESSENTIALS_CONFIG_ITEM, DatabaseDriver
+from recipe_manager.recipe_matcher import RecipeMatcher
+
+
+class InMemoryDatabaseDriver:
+    """
+    Local stand-in for DatabaseDriver with the same methods, keeping the collections in memory.
+    The recipe collection enforces the unique source_url index, and ranked queries are answered by a RecipeMatcher,
+    which returns the same results as the MongoDB pipelines.
+    """
+    def __init__(self, recipes: list[dict] | None = None):
+        self.recipes = []
+        self.config_items = {}
+        self.normalized_ingredients = []
+        self.recipe_insert_listeners = []
+        self.corpus_version = 0
+
+        self.insert_many_batch_sizes = []  # Size of every insert_many call, for tests checking batching
+        self.config_item_reads = 0  # Full and version-only config item reads, for tests checking caching
+        self.config_item_version_reads = 0
+
+        self._source_urls = set()
+        self._recipe_matcher = RecipeMatcher()
+        self._lock = threading.Lock()
+
+        if recipes:
+            self.insert_recipe_list(recipes)
+
+    def insert_recipe_list(self, recipe_list) -> dict:
+        recipe_documents = DatabaseDriver.prepare_recipes_for_insert(recipe_list)
+
+        inserted_recipes = []
+        duplicate_indexes = set()
+        with self._lock:
+            self.insert_many_batch_sizes.append(len(recipe_list))
+            for index, (recipe, recipe_document) in enumerate(zip(recipe_list, recipe_documents)):
+                if recipe["source_url"] in self._source_urls:
+                    duplicate_indexes.add(index)
+                    continue
+
+                self._source_urls.add(recipe["source_url"])
+                self.recipes.append({"_id": len(self.recipes), **copy.deepcopy(recipe_document)})
+                inserted_recipes.append(recipe)
+
+        insert_report = DatabaseDriver.build_insert_report(recipe_list, inserted_recipes, duplicate_indexes, set())
+
+        if inserted_recipes:
+            self._recipe_matcher.add_recipes(inserted_recipes)
+            self.increment_corpus_version()
+            for listener in self.recipe_insert_listeners:
+                listener(inserted_recipes)
+
+        return insert_report
+
+    def increment_corpus_version(self) -> int:
+        with self._lock:
+            self.corpus_version += 1
+            return self.corpus_version
+
+    def get_corpus_version(self) -> int:
+        return self.corpus_version
+
+    def add_recipe_insert_listener(self, listener):
+        self.recipe_insert_listeners.append(listener)
+
+    def get_all_recipes(self, projection: dict | None = None) -> list[dict]:
+        with self._lock:
+            recipes = copy.deepcopy(self.recipes)
+        if projection is None:
+            return recipes
+        return [{field: recipe[field] for field in ["_id", *projection] if field in recipe} for recipe in recipes]
+
+    def get_recipes_inserted_after(self, recipe_id: int | None, projection: dict | None = None) -> list[dict]:
+        # Recipe IDs are insertion indexes here, so there is no clock skew to allow for
+        recipes = self.get_all_recipes(projection)
+        return recipes if recipe_id is None else recipes[recipe_id + 1:]
+
+    def insert_pantry_essentials(self, ingredient_list: dict) -> dict | None:
+        return self.insert_config_item(PANTRY_ESSENTIALS_CONFIG_ITEM, ingredient_list)
+
+    def get_pantry_essentials(self):
+        return self.get_config_item(PANTRY_ESSENTIALS_CONFIG_ITEM)
+
+    def get_config_item(self, item_name: str) -> dict | None:
+        self.config_item_reads += 1
+        return copy.deepcopy(self.config_items.get(item_name))
+
+    def get_config_item_version(self, item_name: str) -> int | None:
+        self.config_item_version_reads += 1
+        config_item = self.config_items.get(item_name)
+        return None if config_item is None else config_item.get("version", 0)
+
+    def get_normalized_ingredients(self):
+        return copy.deepcopy(self.normalized_ingredients)
+
+    def insert_normalized_ingredient(self, new_normalized_ingredient_name):
+        self.normalized_ingredients.append({"normalized_name": new_normalized_ingredient_name, "alias": []})
+
+    def insert_config_item(self, item_name: str, dict_to_insert: dict) -> dict | None:
+        if type(dict_to_insert) is not dict:
+            raise TypeError(f"Expected parameter to be of type 'dict' but got {type(dict_to_insert).__name__}")
+        update = DatabaseDriver.build_config_item_update(dict_to_insert)
+        with self._lock:
+            config_item = self.config_items.setdefault(item_name, {"config_item": item_name})
+            config_item.update(copy.deepcopy(update.get("$set", {})))
+            config_item["version"] = config_item.get("version", 0) + update["$inc"]["version"]
+            return copy.deepcopy(config_item)
+
+    def append_to_config_item(self, item_name: str, field: str, values: list) -> dict | None:
+        with self._lock:
+            config_item = self.config_items.setdefault(item_name, {"config_item": item_name})
+            config_item.setdefault(field, []).extend(copy.deepcopy(values))
+            config_item["version"] = config_item.get("version", 0) + 1
+            return copy.deepcopy(config_item)
+
+    def get_ingredient_set_difference(self, ingredient_list: list[str]):
+        return self._recipe_matcher.get_ingredient_set_difference(ingredient_list)
+
+    def get_ranked_recipes(self, ingredient_list: list[str], num_missing_ingredients_allowed: int, number_of_recipes: int, page: int = 0):
+        return self._recipe_matcher.get_ranked_recipes(ingredient_list, num_missing_ingredients_allowed, number_of_recipes, page)
+
+    def backfill_ingredient_counts(self):
+        with self._lock:
+            for recipe in self.recipes:
+                recipe.setdefault("ingredient_count", len(set(recipe["ingredients"])))
+
+    def recipe_already_in_db(self, url_to_check: str) -> bool:
+        return url_to_check in self._source_urls
+
+    def get_existing_source_urls(self, urls_to_check: list[str]) -> set[str]:
+        with self._lock:
+            return {url for url in urls_to_check if url in self._source_urls}
@@ -0,0 +1,40 @@
+import argparse
+import json
+
+from benchmarks.benchmark_suite import compare_results, run_benchmarks
+
+
+def make_results(metrics: dict, status: str = "ok") -> dict:
+    return {"metadata": {}, "benchmarks": {"example": {"status": status, "metrics": metrics}}}
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = make_results({"p50_milliseconds": 10.0, "strings_per_second": 1000.0, "build_seconds": 1.0, "corpus_size": 1000})
+    results = make_results({"p50_milliseconds": 13.0, "strings_per_second": 900.0, "build_seconds": 1.1, "corpus_size": 2000})
+
+    comparisons = {comparison["metric"]: comparison for comparison in compare_results(results, baseline, tolerance=0.25)}
+    assert comparisons["p50_milliseconds"]["regression"]
+    assert not comparisons["strings_per_second"]["regression"]
+    assert not comparisons["build_seconds"]["regression"]
+    assert "corpus_size" not in comparisons  # Informational
+
+    comparisons = {comparison["metric"]: comparison for comparison in compare_results(results, baseline, tolerance=0.05)}
+    assert comparisons["strings_per_second"]["regression"]
+
+
+def test_compare_ignores_noise_and_skipped_benchmarks():
+    # Tripled, but by less than the noise floor
+    comparisons = compare_results(make_results({"p50_milliseconds": 0.03}), make_results({"p50_milliseconds": 0.01}))
+    assert not comparisons[0]["regression"]
+
+    assert compare_results(make_results({}, status="skipped"), make_results({"p50_milliseconds": 1.0})) == []
+
+
+def test_run_writes_serializable_results():
+    options = argparse.Namespace(only=["recipe_matcher_set_difference", "exact_and_lexical_match"], corpus_sizes=[500], contextual=False, seed=0)
+    results = run_benchmarks(options)
+
+    assert set(results["benchmarks"]) == {"recipe_matcher_set_difference_500", "exact_and_lexical_match"}
+    assert results["benchmarks"]["recipe_matcher_set_difference_500"]["status"] == "ok"
+    assert results["benchmarks"]["recipe_matcher_set_difference_500"]["metrics"]["corpus_size"] == 500
+    assert all(comparison["change"] == 0 for comparison in compare_results(results, json.loads(json.dumps(results))))
@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+import httpx
+
+import recipe_app
+from recipe_manager.async_mongodb_driver import AsyncDatabaseDriver
+from recipe_manager.cpu_executor import BoundedCPUExecutor
+from recipe_manager.recipe_managers import RecipeManager
+from recipe_manager.recipe_matcher import RecipeMatcher
+from tests.database_testing.in_memory_database_driver import InMemoryDatabaseDriver
+
+# Simulated cost of normalizing one request (CPU) and of one aggregation round-trip to the cluster
+NORMALIZATION_SECONDS = 0.05
+DATABASE_ROUND_TRIP_SECONDS = 0.05
+
+CONCURRENT_REQUESTS = 16
+CPU_WORKERS = 4
+
+RECIPES = [
+    {"recipe_name": "omelette", "source_url": "https://example.com/omelette", "ingredients": ["egg", "salt", "pepper"]},
+    {"recipe_name": "toast", "source_url": "https://example.com/toast", "ingredients": ["bread", "butter"]},
+]
+
+
+class SlowNormalizer:
+    """Stand-in for the ingredient normalizer that blocks its thread like parsing and encoding do"""
+    def __init__(self):
+        self.warmed_up = False
+
+    def warm_up(self):
+        time.sleep(NORMALIZATION_SECONDS)
+        self.warmed_up = True
+
+    def generate_normalized_ingredients(self, ingredient_strings):
+        time.sleep(NORMALIZATION_SECONDS)
+        return list(ingredient_strings), []
+
+
+class AsyncCursorStandIn:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return self.documents
+
+
+class RemoteRecipeCollectionStandIn:
+    """Local stand-in for the Atlas recipe collection, answers the ranked pipeline after a network round-trip delay"""
+    def __init__(self, recipes):
+        self.recipe_matcher = RecipeMatcher(recipes)
+
+    async def aggregate(self, pipeline):
+        await asyncio.sleep(DATABASE_ROUND_TRIP_SECONDS)
+        ingredient_list = pipeline[0]["$match"]["$or"][0]["ingredients"]["$in"]
+        num_missing_ingredients_allowed = pipeline[2]["$match"]["difference_count"]["$lte"]
+        number_of_recipes = pipeline[5]["$limit"]
+        page = pipeline[4]["$skip"] // number_of_recipes
+        return AsyncCursorStandIn(self.recipe_matcher.get_ranked_recipes(ingredient_list, num_missing_ingredients_allowed, number_of_recipes, page))
+
+
+class MongoClientStandIn(dict):
+    def __getitem__(self, name):
+        return self.setdefault(name, MongoClientStandIn())
+
+
+def make_recipe_manager(max_queue_depth=BoundedCPUExecutor.DEFAULT_MAX_QUEUE_DEPTH):
+    async_database_driver = AsyncDatabaseDriver(client=MongoClientStandIn())
+    async_database_driver.recipe_collection = RemoteRecipeCollectionStandIn(RECIPES)
+
+    return RecipeManager(RecipeManager.DATABASE_QUERY_MODE, cpu_executor=BoundedCPUExecutor(CPU_WORKERS, max_queue_depth),
+                         async_database_driver=async_database_driver, ingredient_normalizer=SlowNormalizer(),
+                         database_driver=InMemoryDatabaseDriver(RECIPES))
+
+
+async def timed_get(client, url, payload=None):
+    start_time = time.perf_counter()
+    response = await client.request("GET", url, json=payload)
+    return response, time.perf_counter() - start_time
+
+
+async def run_concurrent_requests(manager, number_of_requests):
+    recipe_app.recipe_manager = manager
+    # A different pantry per request, so none of them is answered from the response cache
+    request_objects = [{"num_missing_ingredients_allowed": 1, "ingredients_list": ["egg", "salt", f"spice {index}"]} for index in range(number_of_requests)]
+
+    transport = httpx.ASGITransport(app=recipe_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        recipe_requests = [timed_get(client, "/get_recipe_links", request_object) for request_object in request_objects]
+        # A cheap route requested while the slow requests are in flight must not wait behind them
+        results = await asyncio.gather(*recipe_requests, timed_get(client, "/get_recipes"))
+    return results[:-1], results[-1]
+
+
+def test_concurrent_latency_stays_flat():
+    manager = make_recipe_manager()
+    recipe_results, (_, cheap_latency) = asyncio.run(run_concurrent_requests(manager, CONCURRENT_REQUESTS))
+    manager.cpu_executor.close()
+
+    assert all(response.status_code == 200 for response, _ in recipe_results)
+    assert '"recipe_name": "omelette"' in recipe_results[0][0].json()
+
+    # Serialized on the event loop the slowest request would wait for every other one
+    serialized_latency = CONCURRENT_REQUESTS * (NORMALIZATION_SECONDS + DATABASE_ROUND_TRIP_SECONDS)
+    expected_latency = -(-CONCURRENT_REQUESTS // CPU_WORKERS) * NORMALIZATION_SECONDS + DATABASE_ROUND_TRIP_SECONDS
+    slowest_latency = max(latency for _, latency in recipe_results)
+    assert slowest_latency < min(2 * expected_latency, serialized_latency / 2)
+    assert cheap_latency < NORMALIZATION_SECONDS
+
+
+def test_saturated_executor_rejects_requests():
+    manager = make_recipe_manager(max_queue_depth=CPU_WORKERS)
+    recipe_results, _ = asyncio.run(run_concurrent_requests(manager, 3 * CPU_WORKERS))
+    manager.cpu_executor.close()
+
+    status_codes = [response.status_code for response, _ in recipe_results]
+    assert status_codes.count(200) >= CPU_WORKERS
+    assert 503 in status_codes
+    assert manager.cpu_executor.rejected == status_codes.count(503)
+
+
+async def check_readiness_around_warm_up(manager):
+    recipe_app.recipe_manager = manager
+    recipe_app.is_ready = False
+
+    transport = httpx.ASGITransport(app=recipe_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        before_warm_up = (await client.get("/ready")).status_code
+        await recipe_app.warm_up_recipe_manager()
+        after_warm_up = (await client.get("/ready")).status_code
+    return before_warm_up, after_warm_up
+
+
+def test_ready_after_warm_up():
+    manager = make_recipe_manager()
+    assert asyncio.run(check_readiness_around_warm_up(manager)) == (503, 200)
+    manager.cpu_executor.close()
+
+    assert manager.ingredient_normalizer.warmed_up
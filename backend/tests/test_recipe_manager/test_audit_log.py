@@ -0,0 +1,63 @@
+import json
+
+from recipe_manager.audit_log import AUDIT_RECORDS, AuditLogWriter
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_records_are_appended_in_order(tmp_path):
+    log_path = tmp_path / "matches.log"
+    log_path.write_text(json.dumps({"event": "from_previous_run"}) + "\n", encoding="utf-8")
+
+    audit_log = AuditLogWriter(log_path)
+    for number in range(500):
+        assert audit_log.write("contextual_match", query=[f"ingredient {number}", None], score=0.8)
+    audit_log.close()
+
+    records = read_records(log_path)
+    # History from before the restart is kept
+    assert records[0] == {"event": "from_previous_run"}
+    assert [record["query"][0] for record in records[1:]] == [f"ingredient {number}" for number in range(500)]
+    assert all(record["event"] == "contextual_match" and "timestamp" in record for record in records[1:])
+
+    assert not audit_log.write("contextual_match")  # Closed
+
+
+class PausedAuditLogWriter(AuditLogWriter):
+    """Never starts the writer thread, so records stay on the queue"""
+    def _ensure_writer_thread(self):
+        pass
+
+
+def test_rotation_keeps_backup_count_files(tmp_path):
+    log_path = tmp_path / "misses.log"
+    audit_log = AuditLogWriter(log_path, max_bytes=200, backup_count=2)
+    for number in range(20):
+        audit_log.write("ingredient_miss", query="x" * 100, number=number)
+        audit_log.flush()
+    audit_log.close()
+
+    assert {path.name for path in tmp_path.iterdir()} <= {"misses.log", "misses.log.1", "misses.log.2"}
+    # Oldest records were deleted with the oldest backup, the rest are in order from the last backup to the live file
+    log_paths = [path for path in (audit_log.get_backup_path(2), audit_log.get_backup_path(1), log_path) if path.exists()]
+    numbers = [record["number"] for path in log_paths for record in read_records(path)]
+    assert 0 < len(numbers) < 20
+    assert numbers == list(range(20 - len(numbers), 20))
+
+
+def test_sampling_under_load(tmp_path):
+    audit_log = PausedAuditLogWriter(tmp_path / "sampled.log", max_queue_size=10, sample_rate=0.0, sampling_queue_depth=4)
+    sampled_out_before = AUDIT_RECORDS.get(log="sampled", outcome="sampled_out")
+
+    assert [audit_log.write("ingredient_miss", number=number) for number in range(5)] == [True] * 4 + [False]
+    assert AUDIT_RECORDS.get(log="sampled", outcome="sampled_out") == sampled_out_before + 1
+
+
+def test_full_queue_drops_records(tmp_path):
+    audit_log = PausedAuditLogWriter(tmp_path / "dropped.log", max_queue_size=2, sample_rate=1.0)
+    dropped_before = AUDIT_RECORDS.get(log="dropped", outcome="dropped")
+
+    assert [audit_log.write("ingredient_miss", number=number) for number in range(3)] == [True, True, False]
+    assert AUDIT_RECORDS.get(log="dropped", outcome="dropped") == dropped_before + 1
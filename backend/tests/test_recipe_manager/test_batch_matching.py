@@ -0,0 +1,102 @@
+import asyncio
+import json
+import random
+
+import httpx
+
+import recipe_app
+from recipe_manager.recipe_managers import RecipeManager
+from recipe_manager.recipe_matcher import RecipeMatcher
+from tests.database_testing.in_memory_database_driver import InMemoryDatabaseDriver
+from tests.test_recipe_manager.test_recipe_matcher import generate_recipes, load_baseline_ingredient_names
+
+
+class CountingNormalizer:
+    """Stand-in for the ingredient normalizer that lower-cases strings, drops "water" and counts its calls"""
+    def __init__(self):
+        self.normalized_strings = []
+
+    def normalize_ingredient_strings(self, ingredient_strings):
+        self.normalized_strings.append(list(ingredient_strings))
+        return [ingredient_string.lower() if ingredient_string != "water" else None for ingredient_string in ingredient_strings]
+
+    def generate_normalized_ingredients(self, ingredient_strings):
+        normalized_names = self.normalize_ingredient_strings(ingredient_strings)
+        return [name for name in normalized_names if name], [string for string, name in zip(ingredient_strings, normalized_names) if not name]
+
+
+def test_batch_matches_single_queries():
+    ingredient_names = load_baseline_ingredient_names()
+    recipe_matcher = RecipeMatcher(generate_recipes(3000, ingredient_names))
+
+    rng = random.Random(5)
+    pantries = [rng.sample(ingredient_names, rng.randint(0, 60)) + ["not a known ingredient"] for _ in range(100)] + [[]]
+    for budget in [0, 2, 5]:
+        batch_results = recipe_matcher.get_ranked_recipes_batch(pantries, budget, 8)
+        assert len(batch_results) == len(pantries)
+        for pantry, batch_result in zip(pantries, batch_results):
+            assert batch_result == recipe_matcher.get_ranked_recipes(pantry, budget, 8)
+
+    # Recipes added after the first batch are part of the next one
+    recipe_matcher.add_recipes([{"recipe_name": "new", "source_url": "https://example.com/new", "ingredients": ["not a known ingredient"]}])
+    assert recipe_matcher.get_ranked_recipes_batch([["not a known ingredient"]], 0, 8)[0][0]["recipe_name"] == "new"
+
+
+def make_recipe_manager():
+    database_driver = InMemoryDatabaseDriver([
+        {"recipe_name": "toast", "source_url": "https://example.com/toast", "ingredients": ["bread", "butter"]},
+        {"recipe_name": "boiled egg", "source_url": "https://example.com/egg", "ingredients": ["egg"]},
+        {"recipe_name": "egg toast", "source_url": "https://example.com/egg-toast", "ingredients": ["bread", "butter", "egg"]},
+    ])
+    return RecipeManager(database_driver=database_driver, ingredient_normalizer=CountingNormalizer())
+
+
+async def post_batch(batch_request):
+    transport = httpx.ASGITransport(app=recipe_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/get_ranked_recipe_links_batch", json=batch_request)
+
+
+def test_batch_route():
+    recipe_manager = make_recipe_manager()
+    recipe_app.recipe_manager = recipe_manager
+    try:
+        batch_request = {"num_missing_ingredients_allowed": 1, "num_recipes": 2, "pantries": [["Egg", "water"], ["Bread", "Egg"], ["Salt"]]}
+        response = asyncio.run(post_batch(batch_request))
+        assert response.status_code == 200
+        results = json.loads(response.json())["results"]
+
+        assert [[recipe["recipe"]["recipe_name"] for recipe in result["recipes"]] for result in results] == [["boiled egg"], ["boiled egg", "toast"], ["boiled egg"]]
+        assert results[1]["recipes"][1]["missing_ingredients"] == ["butter"]
+        # No shared ingredient, but the one missing ingredient fits the budget
+        assert results[2]["recipes"][0]["missing_ingredients"] == ["egg"]
+        # All pantries normalized with one call
+        assert recipe_manager.ingredient_normalizer.normalized_strings == [["Egg", "water", "Bread", "Egg", "Salt"]]
+
+        results = json.loads(asyncio.run(post_batch({**batch_request, "num_missing_ingredients_allowed": 0})).json())["results"]
+        assert [result["success"] for result in results] == [True, True, False]
+
+        assert asyncio.run(post_batch({"num_missing_ingredients_allowed": 1, "pantries": "egg"})).status_code == 400
+    finally:
+        recipe_manager.cpu_executor.close()
+
+
+async def get_ranked(ingredient_request):
+    transport = httpx.ASGITransport(app=recipe_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.request("GET", "/get_ranked_recipe_links", json=ingredient_request)
+
+
+def test_ranked_route_rejects_malformed_requests():
+    recipe_manager = make_recipe_manager()
+    recipe_app.recipe_manager = recipe_manager
+    try:
+        response = asyncio.run(get_ranked({"num_missing_ingredients_allowed": 1, "ingredients_list": ["Egg"], "num_recipes": 2}))
+        assert response.status_code == 200
+        assert json.loads(response.json())["recipes"][0]["recipe"]["recipe_name"] == "boiled egg"
+
+        assert asyncio.run(get_ranked({"ingredients_list": ["Egg"]})).status_code == 400
+        assert asyncio.run(get_ranked({"num_missing_ingredients_allowed": 1, "ingredients_list": ["Egg"], "page": -1})).status_code == 400
+        assert asyncio.run(get_ranked({"num_missing_ingredients_allowed": 1, "ingredients_list": ["Egg"], "num_recipes": "many"})).status_code == 400
+    finally:
+        recipe_manager.cpu_executor.close()
@@ -0,0 +1,49 @@
+import asyncio
+
+from recipe_manager.config_cache import ConfigCache
+from recipe_manager.mongodb_driver import PANTRY_ESSENTIALS_CONFIG_ITEM
+from tests.database_testing.in_memory_database_driver import InMemoryDatabaseDriver
+from tests.test_recipe_manager.test_batch_matching import make_recipe_manager
+
+
+def test_config_cache_reads_item_once_per_version():
+    database_driver = InMemoryDatabaseDriver()
+    config_cache = ConfigCache(database_driver, refresh_seconds=60)
+    assert config_cache.get(PANTRY_ESSENTIALS_CONFIG_ITEM) is None
+
+    # Written by another process, not visible until the refresh interval passes
+    database_driver.insert_pantry_essentials({"ingredients_list": ["salt"]})
+    assert config_cache.get(PANTRY_ESSENTIALS_CONFIG_ITEM) is None
+
+    config_cache.refresh_seconds = 0
+    assert config_cache.get(PANTRY_ESSENTIALS_CONFIG_ITEM)["ingredients_list"] == ["salt"]
+    reads = database_driver.config_item_reads
+    for _ in range(5):
+        config_cache.get(PANTRY_ESSENTIALS_CONFIG_ITEM)
+    # Unchanged version, only the version stamp is read
+    assert database_driver.config_item_reads == reads
+
+    database_driver.insert_pantry_essentials({"ingredients_list": ["salt", "pepper"]})
+    assert config_cache.get(PANTRY_ESSENTIALS_CONFIG_ITEM)["ingredients_list"] == ["salt", "pepper"]
+    assert database_driver.config_item_reads == reads + 1
+
+
+def test_pantry_essentials_merged_into_queries():
+    recipe_manager = make_recipe_manager()
+    try:
+        ingredient_request = {"num_missing_ingredients_allowed": 0, "ingredients_list": ["Bread"]}
+        assert recipe_manager.find_similar_recipe(ingredient_request) == {"success": False}
+
+        asyncio.run(recipe_manager.set_pantry_essentials_async({"ingredients_list": ["Butter", "water", "Bread"]}))
+        assert recipe_manager.find_similar_recipe(ingredient_request)["recipe"]["recipe_name"] == "toast"
+        assert recipe_manager.find_similar_recipe({**ingredient_request, "include_pantry_essentials": False}) == {"success": False}
+
+        batch_response = recipe_manager.find_similar_recipes_batch({"num_missing_ingredients_allowed": 0, "pantries": [["Egg"], []]})
+        assert [[recipe["recipe"]["recipe_name"] for recipe in result["recipes"]] for result in batch_response["results"]] == \
+               [["toast", "boiled egg", "egg toast"], ["toast"]]
+
+        # Essentials normalized once, not per request
+        normalized_strings = recipe_manager.ingredient_normalizer.normalized_strings
+        assert normalized_strings.count(["Butter", "water", "Bread"]) == 1
+    finally:
+        recipe_manager.cpu_executor.close()
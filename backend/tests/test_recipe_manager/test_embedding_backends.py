@@ -0,0 +1,87 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from benchmarks.embedding_backend_parity import check_parity, load_known_ingredients, QUERY_INGREDIENTS
+from recipe_manager.embedding_backends import EmbeddingBackendFactory, EmbeddingBackendInterface, QuantizedSentenceTransformerBackend, SentenceTransformerBackend
+from recipe_manager.embedding_store import EmbeddingStore
+from recipe_manager.faiss_index import FaissIndexConfig
+from recipe_manager.ingredient_normalizer import SentenceTransformerHandler
+
+
+class HashEmbeddingBackend(EmbeddingBackendInterface):
+    """Stand-in for the sentence transformer, every word maps to a fixed random vector"""
+    def __init__(self, name: str = "hash-model", noise: float = 0.0):
+        self._name = name
+        self.noise = noise
+        self.encoded_strings = []
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def load(self):
+        pass
+
+    def encode(self, strings):
+        self.encoded_strings.extend(strings)
+        embeddings = []
+        for string in strings:
+            vector = np.zeros(32)
+            for word in string.split():
+                seed = int.from_bytes(hashlib.sha256(word.encode("utf-8")).digest()[:4], "little")
+                vector += np.random.default_rng(seed).standard_normal(32)
+            seed = int.from_bytes(hashlib.sha256(string.encode("utf-8")).digest()[:4], "little")
+            vector += self.noise * np.random.default_rng(seed).standard_normal(32)
+            embeddings.append(vector / np.linalg.norm(vector))
+        return np.array(embeddings, dtype=np.float32)
+
+
+def test_handler_encodes_through_backend(tmp_path):
+    known_ingredients = ["butter", "olive oil", "salted butter", "green olives"]
+    backend = HashEmbeddingBackend()
+    handler = SentenceTransformerHandler(known_ingredients, EmbeddingStore(tmp_path), FaissIndexConfig(), embedding_backend=backend)
+
+    matched_string, score = handler.search_ingredient("olive oil")
+    assert matched_string == "olive oil"
+    assert score == pytest.approx(1.0, abs=1e-5)
+    assert sorted(backend.encoded_strings) == sorted(known_ingredients + ["olive oil"])
+
+    # Stored embeddings are keyed by the backend name, another backend doesn't reuse them
+    assert EmbeddingStore(tmp_path).load("hash-model", known_ingredients) is not None
+    other_backend = HashEmbeddingBackend("other-hash-model")
+    SentenceTransformerHandler(known_ingredients, EmbeddingStore(tmp_path), FaissIndexConfig(), embedding_backend=other_backend).load_index()
+    assert other_backend.encoded_strings == known_ingredients
+
+
+def test_backend_factory():
+    assert isinstance(EmbeddingBackendFactory.create(), SentenceTransformerBackend)
+    quantized_backend = EmbeddingBackendFactory.create({"backend": "dynamic_int8", "intra_op_threads": 2})
+    assert isinstance(quantized_backend, QuantizedSentenceTransformerBackend)
+    assert quantized_backend.intra_op_threads == 2
+    # The default backend keeps the model name, so embeddings stored before backends existed are still used
+    assert EmbeddingBackendFactory.load().name == SentenceTransformerBackend.DEFAULT_MODEL_NAME
+    assert quantized_backend.name != SentenceTransformerBackend.DEFAULT_MODEL_NAME
+    with pytest.raises(ValueError):
+        EmbeddingBackendFactory.create({"backend": "onnx"})
+
+
+def test_parity_check_detects_drift():
+    known_ingredients = load_known_ingredients()[:200]
+    queries = known_ingredients + QUERY_INGREDIENTS
+
+    report = check_parity(HashEmbeddingBackend(), HashEmbeddingBackend("hash-model-copy", noise=0.01), known_ingredients, queries)
+    assert report["passed"]
+    assert report["max_score_difference"] <= report["tolerance"]
+
+    report = check_parity(HashEmbeddingBackend(), HashEmbeddingBackend("hash-model-noisy", noise=1.0), known_ingredients, queries)
+    assert not report["passed"]
+
+
+def test_quantized_backend_parity():
+    pytest.importorskip("sentence_transformers")
+    known_ingredients = load_known_ingredients()
+    report = check_parity(SentenceTransformerBackend(), QuantizedSentenceTransformerBackend(intra_op_threads=1),
+                          known_ingredients, known_ingredients + QUERY_INGREDIENTS)
+    assert report["passed"], report
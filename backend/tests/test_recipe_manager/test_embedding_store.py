@@ -0,0 +1,44 @@
+import faiss
+import numpy as np
+
+from recipe_manager.embedding_store import EmbeddingStore
+
+
+def build_embeddings(num_strings, dimension=16, seed=0):
+    embeddings = np.random.default_rng(seed).random((num_strings, dimension), dtype=np.float32)
+    faiss.normalize_L2(embeddings)
+    index = faiss.IndexFlatIP(dimension)
+    index.add(embeddings)
+    return embeddings, index
+
+
+def test_embedding_store_round_trip(tmp_path):
+    embedding_store = EmbeddingStore(tmp_path)
+    ingredient_strings = ["butter", "olive oil", "salted butter"]
+    embeddings, index = build_embeddings(len(ingredient_strings))
+
+    assert embedding_store.load("test-model", ingredient_strings) is None
+    embedding_store.save("test-model", ingredient_strings, embeddings, index)
+
+    loaded_embeddings, loaded_index = embedding_store.load("test-model", ingredient_strings)
+    assert isinstance(loaded_embeddings, np.memmap)
+    np.testing.assert_array_equal(loaded_embeddings, embeddings)
+
+    scores, indices = loaded_index.search(embeddings[1:2], 1)
+    assert indices[0][0] == 1
+
+    # Any change of model or strings is a different key
+    assert embedding_store.load("other-model", ingredient_strings) is None
+    assert embedding_store.load("test-model", ingredient_strings + ["pesto"]) is None
+
+
+def test_embedding_store_reusable_embeddings(tmp_path):
+    embedding_store = EmbeddingStore(tmp_path)
+    ingredient_strings = ["butter", "olive oil"]
+    embeddings, index = build_embeddings(len(ingredient_strings))
+    embedding_store.save("test-model", ingredient_strings, embeddings, index)
+
+    reusable_embeddings = embedding_store.load_reusable_embeddings("test-model")
+    assert set(reusable_embeddings) == {"butter", "olive oil"}
+    np.testing.assert_array_equal(reusable_embeddings["olive oil"], embeddings[1])
+    assert embedding_store.load_reusable_embeddings("other-model") == {}
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from recipe_manager.faiss_index import FaissIndexConfig
+
+DIMENSION = 64
+NUMBER_OF_VECTORS = 12000
+COSINE_SIMILARITY_THRESHOLD = 0.75
+
+INDEX_CONFIGS = {
+    "hnsw": {"index_type": "hnsw", "rerank_candidates": 32, "hnsw": {"m": 16, "ef_construction": 100, "ef_search": 64}},
+    "ivf": {"index_type": "ivf", "rerank_candidates": 32, "ivf": {"nlist": 64, "nprobe": 16}},
+    "sq": {"index_type": "sq", "rerank_candidates": 32, "sq": {"quantizer_type": "QT_8bit"}},
+    "pq": {"index_type": "pq", "rerank_candidates": 64, "pq": {"nlist": 64, "nprobe": 16, "m": 16, "nbits": 8}},
+}
+
+
+def normalize(vectors):
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def embeddings_and_queries():
+    rng = np.random.default_rng(0)
+    embeddings = normalize(rng.standard_normal((NUMBER_OF_VECTORS, DIMENSION)))
+    # Half the queries are close to a known vector (above the threshold), half are unrelated (below it)
+    close_queries = normalize(embeddings[:100] + 0.3 * rng.standard_normal((100, DIMENSION)) / np.sqrt(DIMENSION))
+    unrelated_queries = normalize(rng.standard_normal((100, DIMENSION)))
+    return embeddings, np.vstack([close_queries, unrelated_queries])
+
+
+@pytest.mark.parametrize("index_type", INDEX_CONFIGS.keys())
+def test_approximate_search_matches_exact_search(index_type, embeddings_and_queries):
+    embeddings, queries = embeddings_and_queries
+    flat_config = FaissIndexConfig()
+    exact_scores, exact_indices = flat_config.search(flat_config.build_index(embeddings), embeddings, queries, 5)
+
+    index_config = FaissIndexConfig(INDEX_CONFIGS[index_type])
+    scores, indices = index_config.search(index_config.build_index(embeddings), embeddings, queries, 5)
+
+    # Unrelated queries have no meaningful neighbour on unclustered random data, only measure recall on the close ones
+    found = indices[:, 0] == exact_indices[:, 0]
+    assert np.mean(found[:100]) >= 0.95
+    # Scores are exact inner products, never above the true best score, so missing an unrelated query's neighbour
+    # can't push it over the threshold
+    np.testing.assert_allclose(scores[found, 0], exact_scores[found, 0], rtol=1e-5)
+    assert np.array_equal(scores[:, 0] >= COSINE_SIMILARITY_THRESHOLD, exact_scores[:, 0] >= COSINE_SIMILARITY_THRESHOLD)
+
+
+def test_too_few_vectors_falls_back_to_flat(embeddings_and_queries):
+    embeddings, queries = embeddings_and_queries
+    index_config = FaissIndexConfig(INDEX_CONFIGS["pq"])
+    index = index_config.build_index(embeddings[:500])
+
+    assert index.ntotal == 500
+    _, indices = index_config.search(index, embeddings[:500], embeddings[:10], 1)
+    assert indices[:, 0].tolist() == list(range(10))
+
+
+def test_signature_changes_with_parameters():
+    assert FaissIndexConfig().signature == "flat"
+    assert FaissIndexConfig(INDEX_CONFIGS["ivf"]).signature != FaissIndexConfig({**INDEX_CONFIGS["ivf"], "ivf": {"nlist": 32}}).signature
+    with pytest.raises(ValueError):
+        FaissIndexConfig({"index_type": "lsh"})
+
+
+def test_default_config_loads():
+    assert FaissIndexConfig.load().index_type in FaissIndexConfig.INDEX_TYPES
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+
+# Modules that must only be imported when contextual matching or parsing is first needed
+HEAVY_MODULES = ["torch", "transformers", "sentence_transformers", "faiss", "ingredient_parser"]
+
+# Generous cumulative import budget for the entry points, the heavy modules alone take several seconds
+MAXIMUM_IMPORT_SECONDS = 3.0
+
+
+def get_import_times(module_name):
+    """Runs python -X importtime for module_name and returns {imported module: cumulative microseconds}"""
+    environment = dict(os.environ, PYTHONPATH=str(BACKEND_ROOT), RECIPE_APP_BACKEND_ROOT=str(BACKEND_ROOT))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=BACKEND_ROOT, env=environment, capture_output=True, text=True, check=True
+    )
+
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, imported_module = line[len("import time:"):].split("|")
+        import_times[imported_module.strip()] = int(cumulative)
+    return import_times
+
+
+@pytest.mark.parametrize("module_name", ["recipe_app", "recipe_manager.recipe_managers", "recipe_manager.ingredient_normalizer"])
+def test_entry_point_import_is_lazy(module_name):
+    import_times = get_import_times(module_name)
+
+    imported_heavy_modules = [name for name in import_times if name.split(".")[0] in HEAVY_MODULES]
+    assert imported_heavy_modules == []
+    assert import_times[module_name] / 1e6 < MAXIMUM_IMPORT_SECONDS
@@ -1,5 +1,8 @@
 import recipe_manager
+from recipe_manager.embedding_store import EmbeddingStore
 from recipe_manager.ingredient_normalizer import IngredientNormalizer
+from tests.ingredient_testing.raw_json_ingredient_reader import RawJsonIngredientReader
+from tests.test_recipe_manager.test_embedding_backends import HashEmbeddingBackend
 
 
 def test_ingredient_trimmer():
@@ -8,4 +11,46 @@ def test_ingredient_trimmer():
     ingredient_strings = ["1 cup flour", "butter, 1 tbsp", "chicken breasts"]
 
     for ingredient in ingredient_strings:
-        ingredient_trimmer.trim_ingredient_string(ingredient)
\ No newline at end of file
+        ingredient_trimmer.trim_ingredient_string(ingredient)
+
+
+def make_stub_normalizer(tmp_path):
+    """Normalizer with the stub embedding backend, contextual matching runs without loading the transformer model"""
+    return IngredientNormalizer(RawJsonIngredientReader(), embedding_store=EmbeddingStore(tmp_path), embedding_backend=HashEmbeddingBackend())
+
+
+def test_batch_normalization_matches_per_item(tmp_path):
+    ingredient_strings = [
+        "1 teaspoon Mexican oregano",
+        "2 tablespoons packed light brown sugar",
+        "cooking spray",
+        "2 pounds ground chuck",
+        "butter or olive oil, 1 tbsp",
+        "1 (16 ounce) package pasta",
+        "2 ½ tablespoons pesto",
+        "salt to taste",
+        "1 (12-ounce) package frozen mixed vegetables",
+        "1 1/2 cups lower-sodium beef broth",
+        "parmigiano reggiano",
+        "somerandomingredient sasdf",
+        "1 cup water"
+    ]
+
+    # Every pass gets its own normalizer, a shared one would serve the second pass from its normalization cache
+    per_item = make_stub_normalizer(tmp_path).normalize_ingredient_strings(ingredient_strings, batch=False)
+    batched = make_stub_normalizer(tmp_path).normalize_ingredient_strings(ingredient_strings, batch=True)
+    assert batched == per_item
+    assert make_stub_normalizer(tmp_path).generate_normalized_ingredients(ingredient_strings, batch=True) == \
+        make_stub_normalizer(tmp_path).generate_normalized_ingredients(ingredient_strings, batch=False)
+
+
+def test_parallel_trim_matches_sequential():
+    ingredient_normalizer = IngredientNormalizer(RawJsonIngredientReader(), contextual_matching=False, parse_workers=2)
+
+    ingredient_strings = ["1 cup flour", "butter, 1 tbsp", "chicken breasts", "2 tablespoons olive oil"] * 100
+    try:
+        parallel_tuples = ingredient_normalizer.trim_ingredient_string_list(ingredient_strings)
+    finally:
+        ingredient_normalizer.close()
+
+    assert parallel_tuples == [IngredientNormalizer.trim_ingredient_string(ingredient) for ingredient in ingredient_strings]
@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+from recipe_manager.ingredient_vocabulary import IngredientVocabulary
+
+BASELINE_INGREDIENT_FILE = Path(__file__).resolve().parents[1] / "ingredient_testing" / "baseline_ingredient_list.json"
+
+
+def linear_top_level_name(all_ingredients, ingredient_to_find):
+    """Previous linear scan from IngredientNormalizer.find_top_level_ingredient_name"""
+    for ingredient_dict in all_ingredients:
+        if ingredient_dict["name"] == ingredient_to_find:
+            return ingredient_to_find
+        for alias in ingredient_dict["alias"]:
+            if alias == ingredient_to_find:
+                return ingredient_dict["name"]
+    return None
+
+
+def test_vocabulary_matches_linear_scan():
+    with open(BASELINE_INGREDIENT_FILE, 'r') as f:
+        all_ingredients = json.load(f)
+    vocabulary = IngredientVocabulary(all_ingredients)
+
+    for ingredient_dict in all_ingredients:
+        for ingredient_string in [ingredient_dict["name"], *ingredient_dict["alias"]]:
+            assert ingredient_string in vocabulary
+            assert vocabulary.get_canonical_name(ingredient_string) == linear_top_level_name(all_ingredients, ingredient_string)
+
+    assert "somerandomingredient" not in vocabulary
+    assert vocabulary.get_canonical_name("somerandomingredient") is None
+
+
+def test_vocabulary_detects_conflicting_aliases():
+    vocabulary = IngredientVocabulary([
+        {"name": "sugar", "alias": ["white sugar", "granulated sugar"]},
+        {"name": "white sugar", "alias": ["granulated sugar"]},
+    ])
+
+    assert vocabulary.get_canonical_name("granulated sugar") == "sugar"
+    assert vocabulary.get_canonical_name("white sugar") == "sugar"
+    assert vocabulary.conflicting_aliases == {
+        "white sugar": ["sugar", "white sugar"],
+        "granulated sugar": ["sugar", "white sugar"],
+    }
+    assert vocabulary.get_aliases("white sugar") == ["granulated sugar"]
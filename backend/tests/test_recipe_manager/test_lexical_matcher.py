@@ -0,0 +1,55 @@
+import pytest
+
+from recipe_manager.ingredient_normalizer import IngredientNormalizer
+from recipe_manager.ingredient_vocabulary import IngredientVocabulary
+from recipe_manager.lexical_matcher import LexicalMatcher
+from tests.ingredient_testing.raw_json_ingredient_reader import RawJsonIngredientReader
+
+
+@pytest.fixture(scope="module")
+def lexical_matcher():
+    return LexicalMatcher(IngredientVocabulary(RawJsonIngredientReader().get_all_ingredients()))
+
+
+@pytest.mark.parametrize("query, expected_match", [
+    ("tomatoes", "tomato"),
+    ("parmesan chese", "parmesan cheese"),
+    ("lower-sodium beef broth", "low sodium beef broth"),
+    ("pepper black", "black pepper"),
+    ("chicken thigh", "chicken thighs"),
+])
+def test_lexical_variants_match(lexical_matcher, query, expected_match):
+    assert lexical_matcher.match_strings([query])[0][0] == expected_match
+
+
+@pytest.mark.parametrize("query", ["rice", "peas", "somerandomingredient sasdf", "grated parmesan cheese"])
+def test_inconclusive_strings_fall_through(lexical_matcher, query):
+    assert lexical_matcher.match_strings([query]) == [(None, None)]
+
+
+def test_margin_between_ingredients():
+    vocabulary = IngredientVocabulary([{"name": "pearl onion", "alias": []}, {"name": "pearl onions mix", "alias": []}])
+    assert LexicalMatcher(vocabulary, score_cutoff=80, margin=0).match_strings(["pearl onion mi"])[0][0] == "pearl onions mix"
+    assert LexicalMatcher(vocabulary, score_cutoff=80, margin=10).match_strings(["pearl onion mi"]) == [(None, None)]
+
+    # Aliases of the same ingredient don't compete with each other
+    vocabulary = IngredientVocabulary([{"name": "pearl onion", "alias": ["pearl onions mix"]}])
+    assert LexicalMatcher(vocabulary, score_cutoff=80, margin=10).match_strings(["pearl onion mi"])[0][0] == "pearl onions mix"
+
+
+def test_tier_counts():
+    ingredient_normalizer = IngredientNormalizer(RawJsonIngredientReader(), contextual_matching=False)
+    ingredient_tuples = [("butter", "butter"), ("parmesan chese", None), (None, "tomatoes"), ("somerandomingredient", None), ("water", None)]
+    matched_names = ingredient_normalizer.match_ingredient_tuples(ingredient_tuples, ["unused"] * len(ingredient_tuples))
+
+    assert matched_names == ["butter", ingredient_normalizer.vocabulary.get_canonical_name("parmesan cheese"),
+                             ingredient_normalizer.vocabulary.get_canonical_name("tomato"), None, None]
+    statistics = ingredient_normalizer.get_match_statistics()
+    assert statistics["tier_counts"] == {"ignored": 1, "exact": 1, "lexical": 2, "contextual": 0, "unmatched": 1}
+    assert statistics["tier_hit_rates"]["lexical"] == pytest.approx(0.4)
+    assert statistics["contextual_lookups_avoided"] == 2
+
+    # Without the lexical tier the same variants go unmatched, and the normalization cache version differs
+    exact_only_normalizer = IngredientNormalizer(RawJsonIngredientReader(), contextual_matching=False, lexical_matching=False)
+    assert exact_only_normalizer.match_ingredient_tuples(ingredient_tuples[1:3], ["unused"] * 2) == [None, None]
+    assert exact_only_normalizer.get_cache_version() != ingredient_normalizer.get_cache_version()
@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import recipe_app
+from recipe_manager.ingest_pipeline import StageCounters
+from recipe_manager.metrics import REGISTRY, MetricsRegistry
+from recipe_manager.mongodb_driver import COMMAND_FAILURES, COMMAND_SECONDS, DatabaseCommandMetrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("stage_seconds", "Time per stage", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, stage="parse")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP stage_seconds Time per stage", "# TYPE stage_seconds histogram"]
+    assert 'stage_seconds_bucket{stage="parse",le="0.1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="parse",le="1"} 3' in lines
+    assert 'stage_seconds_bucket{stage="parse",le="+Inf"} 4' in lines
+    assert 'stage_seconds_sum{stage="parse"} 3.65' in lines
+    assert 'stage_seconds_count{stage="parse"} 4' in lines
+
+
+def test_counter_labels_and_registration():
+    registry = MetricsRegistry()
+    counter = registry.counter("matches_total", "Matches", ["tier"])
+    counter.increment(tier="exact")
+    counter.increment(2, tier='quoted "tier"')
+
+    assert registry.counter("matches_total", "Matches", ["tier"]) is counter
+    assert counter.get(tier="exact") == 1
+    assert 'matches_total{tier="quoted \\"tier\\""} 2' in registry.render().splitlines()
+
+    with pytest.raises(ValueError):
+        counter.increment(stage="exact")
+    with pytest.raises(ValueError):
+        registry.histogram("matches_total", "Matches", ["tier"])
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    counter = registry.counter("requests_total", "Requests")
+    histogram = registry.histogram("request_seconds", "Request time")
+    counter.increment()
+    with histogram.time():
+        pass
+
+    assert counter.get() == 0
+    assert histogram.get_count() == 0
+
+
+def test_database_command_listener():
+    listener = DatabaseCommandMetrics()
+    count_before = COMMAND_SECONDS.get_count(command="getMore")
+    failures_before = COMMAND_FAILURES.get(command="getMore")
+
+    listener.succeeded(SimpleNamespace(command_name="getMore", duration_micros=2500))
+    listener.failed(SimpleNamespace(command_name="getMore", duration_micros=1000))
+
+    assert COMMAND_SECONDS.get_count(command="getMore") == count_before + 2
+    assert COMMAND_FAILURES.get(command="getMore") == failures_before + 1
+
+
+def test_stage_counters_record_items():
+    counters = StageCounters("test_stage")
+    counters.record(10, 8, 0.5)
+
+    assert (counters.items_in, counters.items_out) == (10, 8)
+    assert counters.busy_seconds == pytest.approx(0.5)
+    assert 'scrape_stage_items_total{stage="test_stage",direction="out"} 8' in REGISTRY.render().splitlines()
+
+
+async def get_metrics_page():
+    transport = httpx.ASGITransport(app=recipe_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.get("/get_recipes")
+        return await client.get("/metrics")
+
+
+def test_metrics_route_reports_requests():
+    requests_before = recipe_app.REQUESTS.get(route="/get_recipes", status=200)
+    response = asyncio.run(get_metrics_page())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert recipe_app.REQUESTS.get(route="/get_recipes", status=200) == requests_before + 1
+    assert 'http_request_seconds_count{route="/get_recipes"}' in response.text
+    assert "# TYPE ingredient_matches_total counter" in response.text
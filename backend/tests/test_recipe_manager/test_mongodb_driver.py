@@ -0,0 +1,192 @@
+import random
+from datetime import timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from recipe_manager.mongodb_driver import DatabaseDriver, DUPLICATE_KEY_ERROR_CODE, RECIPE_ID_OVERLAP_SECONDS
+from recipe_manager.recipe_matcher import RecipeMatcher
+from tests.database_testing.aggregation_pipeline_evaluator import AggregationPipelineEvaluator
+from tests.test_recipe_manager.test_recipe_matcher import generate_recipes, load_baseline_ingredient_names
+
+
+class UniqueUrlCollection:
+    """Minimal stand-in for a recipe collection with a unique source_url index"""
+    def __init__(self, source_urls=()):
+        self.source_urls = set(source_urls)
+        self.documents = []
+
+    def insert_many(self, documents, ordered=True):
+        write_errors = []
+        for index, document in enumerate(documents):
+            if document["source_url"] in self.source_urls:
+                write_errors.append({"index": index, "code": DUPLICATE_KEY_ERROR_CODE})
+            elif document["recipe_name"] is None:
+                write_errors.append({"index": index, "code": 121})
+            else:
+                self.source_urls.add(document["source_url"])
+                # insert_many sets _id on the documents it is given
+                document["_id"] = ObjectId()
+                self.documents.append(document)
+
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors, "nInserted": len(documents) - len(write_errors)})
+
+    def find(self, query, projection=None):
+        return [{"source_url": url} for url in query["source_url"]["$in"] if url in self.source_urls]
+
+
+class ConfigCollection:
+    """Minimal stand-in for the config collection, supports the corpus version counter and versioned config items"""
+    def __init__(self):
+        self.items = {}
+
+    def find_one(self, query, projection=None):
+        item = self.items.get(query["config_item"])
+        if item is None or projection is None:
+            return item
+        return {field: item[field] for field in projection if field in item}
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        item = self.items.setdefault(query["config_item"], dict(query))
+        item.update(update.get("$set", {}))
+        for field, increment in update["$inc"].items():
+            item[field] = item.get(field, 0) + increment
+        return dict(item)
+
+
+def make_driver(collection):
+    # Skip __init__, which connects to MongoDB
+    driver = DatabaseDriver.__new__(DatabaseDriver)
+    driver.recipe_collection = collection
+    driver.config_collection = ConfigCollection()
+    driver.recipe_insert_listeners = []
+    driver.corpus_version = 0
+    return driver
+
+
+def make_recipe(url, recipe_name="recipe"):
+    return {"recipe_name": recipe_name, "source_url": url, "ingredients": ["salt", "salt", "pepper"]}
+
+
+def test_insert_report_splits_duplicates_and_failures():
+    collection = UniqueUrlCollection(["https://a"])
+    driver = make_driver(collection)
+    notified = []
+    driver.add_recipe_insert_listener(notified.extend)
+
+    recipe_list = [make_recipe("https://a"), make_recipe("https://b"), make_recipe("https://c", None)]
+    report = driver.insert_recipe_list(recipe_list)
+
+    assert report == {"inserted": ["https://b"], "duplicates": ["https://a"], "failed": ["https://c"]}
+    assert [recipe["source_url"] for recipe in notified] == ["https://b"]
+    assert collection.documents[0]["ingredient_count"] == 2
+    # Only the inserted documents are copies with ingredient_count and _id, the caller's dicts are left as they were
+    assert notified[0] is recipe_list[1]
+    assert recipe_list == [make_recipe("https://a"), make_recipe("https://b"), make_recipe("https://c", None)]
+    assert driver.corpus_version == 1
+
+
+def test_corpus_version_only_changes_when_recipes_are_inserted():
+    driver = make_driver(UniqueUrlCollection(["https://a"]))
+    driver.insert_recipe_list([make_recipe("https://a")])
+    assert driver.get_corpus_version() == 0
+
+    driver.insert_recipe_list([make_recipe("https://b")])
+    driver.insert_recipe_list([make_recipe("https://c")])
+    assert driver.get_corpus_version() == 2
+
+
+def test_get_existing_source_urls():
+    driver = make_driver(UniqueUrlCollection(["https://a", "https://b"]))
+    assert driver.get_existing_source_urls(["https://a", "https://c", "https://a"]) == {"https://a"}
+    assert driver.get_existing_source_urls([]) == set()
+
+
+def test_config_item_upsert_increments_version():
+    driver = make_driver(UniqueUrlCollection([]))
+    assert driver.get_config_item_version("pantryEssentials") is None
+
+    stored = driver.insert_pantry_essentials({"ingredients_list": ["salt"], "version": 7, "_id": "ignored"})
+    assert stored == {"config_item": "pantryEssentials", "ingredients_list": ["salt"], "version": 1}
+
+    driver.insert_pantry_essentials({"ingredients_list": ["salt", "pepper"]})
+    assert driver.get_config_item_version("pantryEssentials") == 2
+    assert driver.get_pantry_essentials()["ingredients_list"] == ["salt", "pepper"]
+
+    with pytest.raises(TypeError):
+        driver.insert_config_item("pantryEssentials", ["salt"])
+
+
+def test_recipes_inserted_after_filter_allows_for_clock_skew():
+    assert DatabaseDriver.build_recipes_inserted_after_filter(None) == {}
+
+    newest_recipe_id = ObjectId()
+    since = DatabaseDriver.build_recipes_inserted_after_filter(newest_recipe_id)["_id"]["$gt"]
+    assert newest_recipe_id.generation_time - since.generation_time == timedelta(seconds=RECIPE_ID_OVERLAP_SECONDS)
+
+
+def make_ranked_recipe_documents():
+    return [
+        {"_id": 0, "recipe_name": "toast", "ingredients": ["bread", "butter"], "ingredient_count": 2},
+        {"_id": 1, "recipe_name": "boiled egg", "ingredients": ["egg"], "ingredient_count": 1},
+        # Inserted before ingredient_count was stored
+        {"_id": 2, "recipe_name": "egg toast", "ingredients": ["bread", "butter", "egg"]},
+        {"_id": 3, "recipe_name": "omelette", "ingredients": ["egg", "egg", "milk", "salt"]},
+        {"_id": 4, "recipe_name": "salad", "ingredients": ["lettuce", "tomato", "cucumber"], "ingredient_count": 3},
+    ]
+
+
+def run_ranked_pipeline(documents, ingredient_list, num_missing_ingredients_allowed, number_of_recipes=10, page=0):
+    pipeline = DatabaseDriver.build_ranked_recipes_pipeline(ingredient_list, num_missing_ingredients_allowed, number_of_recipes, page)
+    return AggregationPipelineEvaluator(documents).aggregate(pipeline)
+
+
+def test_ranked_pipeline_ranks_by_missing_ingredients():
+    documents = make_ranked_recipe_documents()
+
+    results = run_ranked_pipeline(documents, ["egg", "bread"], 1)
+    assert [result["recipe_name"] for result in results] == ["boiled egg", "toast", "egg toast"]
+    assert [result["difference_count"] for result in results] == [0, 1, 1]
+    assert [sorted(result["difference_ingredients"]) for result in results] == [[], ["butter"], ["butter"]]
+
+    # Duplicate ingredients of a recipe without ingredient_count are only counted once
+    results = run_ranked_pipeline(documents, ["egg"], 2)
+    assert [(result["recipe_name"], result["difference_count"]) for result in results] == [("boiled egg", 0), ("toast", 2), ("egg toast", 2), ("omelette", 2)]
+    assert [result["recipe_name"] for result in run_ranked_pipeline(documents, ["egg"], 2, 2, 1)] == ["egg toast", "omelette"]
+
+
+def test_ranked_pipeline_keeps_recipes_without_overlap_within_budget():
+    documents = make_ranked_recipe_documents()
+
+    results = run_ranked_pipeline(documents, ["salt"], 1)
+    assert [(result["recipe_name"], result["difference_ingredients"]) for result in results] == [("boiled egg", ["egg"])]
+    # "egg toast" has no ingredient_count and shares nothing, it is still considered and ruled out by its size
+    assert [result["recipe_name"] for result in run_ranked_pipeline(documents, ["salt"], 2)] == ["boiled egg", "toast", "omelette"]
+    assert [result["recipe_name"] for result in run_ranked_pipeline(documents, ["salt"], 3)] == ["boiled egg", "toast", "omelette", "egg toast", "salad"]
+    assert run_ranked_pipeline(documents, ["salt"], 0) == []
+
+
+def test_ranked_pipeline_matches_recipe_matcher():
+    ingredient_names = load_baseline_ingredient_names()
+    recipe_list = generate_recipes(1000, ingredient_names)
+    documents = []
+    for recipe_id, recipe in enumerate(recipe_list):
+        document = {"_id": recipe_id, **recipe}
+        # Leave every third recipe without ingredient_count, as if it predated the field
+        if recipe_id % 3:
+            document["ingredient_count"] = len(set(recipe["ingredients"]))
+        documents.append(document)
+    recipe_matcher = RecipeMatcher(recipe_list)
+
+    rng = random.Random(7)
+    for _ in range(30):
+        pantry = rng.sample(ingredient_names, rng.randint(0, 60)) + ["not a known ingredient"]
+        budget = rng.randint(0, 6)
+        for page in range(2):
+            expected = recipe_matcher.get_ranked_recipes(pantry, budget, 10, page)
+            results = run_ranked_pipeline(documents, pantry, budget, 10, page)
+
+            assert [result["source_url"] for result in results] == [result["source_url"] for result in expected]
+            assert [sorted(result["difference_ingredients"]) for result in results] == [result["difference_ingredients"] for result in expected]
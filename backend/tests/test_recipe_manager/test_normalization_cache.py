@@ -0,0 +1,98 @@
+import time
+
+from recipe_manager.lru_cache import LRUCache
+from recipe_manager.normalization_cache import NormalizationCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    lru_cache = LRUCache(max_size=2)
+    lru_cache.put("a", 1)
+    lru_cache.put("b", 2)
+    assert lru_cache.get("a") == 1  # "b" is now least recently used
+
+    lru_cache.put("c", 3)
+    assert lru_cache.get("b") is None
+    assert lru_cache.get("a") == 1
+    assert lru_cache.get("c") == 3
+    assert (lru_cache.hits, lru_cache.misses) == (3, 1)
+
+
+def test_lru_cache_ttl_expiry():
+    lru_cache = LRUCache(max_size=10, ttl_seconds=0.01)
+    lru_cache.put("a", 1)
+    time.sleep(0.02)
+    assert lru_cache.get("a") is None
+    assert len(lru_cache) == 0
+
+
+def test_normalization_cache_persists_hits_and_misses(tmp_path):
+    cache_path = tmp_path / "normalization_cache.sqlite3"
+    normalization_cache = NormalizationCache(persistent_path=cache_path)
+    normalization_cache.set_vocabulary_version("v1")
+    normalization_cache.put_many(
+        ["2 Tablespoons Olive Oil", "somerandomingredient"],
+        [(("olive oil", "olive oil"), "olive oil"), (("somerandomingredient", None), None)]
+    )
+
+    # New instance simulates a restart, entries come from the persistent tier
+    restarted_cache = NormalizationCache(persistent_path=cache_path)
+    restarted_cache.set_vocabulary_version("v1")
+    assert restarted_cache.get("2 tablespoons olive oil") == (("olive oil", "olive oil"), "olive oil")
+    assert restarted_cache.get("somerandomingredient") == (("somerandomingredient", None), None)
+    assert restarted_cache.get("2 tablespoons olive oil") is not None
+    assert restarted_cache.get("1 cup flour") is None
+
+    statistics = restarted_cache.get_statistics()
+    assert (statistics["memory_hits"], statistics["persistent_hits"], statistics["misses"]) == (1, 2, 1)
+
+
+def test_normalization_cache_vocabulary_version_invalidation(tmp_path):
+    cache_path = tmp_path / "normalization_cache.sqlite3"
+    normalization_cache = NormalizationCache(persistent_path=cache_path)
+    normalization_cache.set_vocabulary_version("v1")
+    normalization_cache.put_many(["salt to taste"], [(("salt", "salt"), "salt")])
+
+    normalization_cache.set_vocabulary_version("v2")
+    assert normalization_cache.get("salt to taste") is None
+
+    # Entries of other versions are only deleted once no process has used them for the retention period
+    restarted_cache = NormalizationCache(persistent_path=cache_path)
+    restarted_cache.set_vocabulary_version("v1")
+    assert restarted_cache.get("salt to taste") == (("salt", "salt"), "salt")
+
+    expiring_cache = NormalizationCache(persistent_path=cache_path, version_retention_seconds=0.01)
+    time.sleep(0.02)
+    expiring_cache.set_vocabulary_version("v3")
+    restarted_cache = NormalizationCache(persistent_path=cache_path)
+    restarted_cache.set_vocabulary_version("v1")
+    assert restarted_cache.get("salt to taste") is None
+
+
+def test_processes_on_different_vocabulary_versions_share_the_persistent_cache(tmp_path):
+    cache_path = tmp_path / "normalization_cache.sqlite3"
+    # Two workers sharing the file, one of them already switched to the next vocabulary version
+    old_worker_cache = NormalizationCache(persistent_path=cache_path)
+    old_worker_cache.set_vocabulary_version("v1")
+    new_worker_cache = NormalizationCache(persistent_path=cache_path)
+    new_worker_cache.set_vocabulary_version("v2")
+
+    old_worker_cache.put_many(["a pinch of saffron"], [(("saffron", None), None)])
+    new_worker_cache.put_many(["a pinch of saffron"], [(("saffron", None), "saffron")])
+
+    for vocabulary_version, normalized_name in [("v1", None), ("v2", "saffron")]:
+        restarted_cache = NormalizationCache(persistent_path=cache_path)
+        restarted_cache.set_vocabulary_version(vocabulary_version)
+        assert restarted_cache.get("a pinch of saffron") == (("saffron", None), normalized_name)
+
+
+def test_entries_of_previous_vocabulary_version_are_dropped():
+    normalization_cache = NormalizationCache()
+    normalization_cache.set_vocabulary_version("v1")
+
+    # Computed under v1, stored after the vocabulary changed to v2
+    normalization_cache.set_vocabulary_version("v2")
+    normalization_cache.put_many(["saffron"], [(("saffron", None), None)], "v1")
+    assert normalization_cache.get("saffron") is None
+
+    normalization_cache.put_many(["saffron"], [(("saffron", None), "saffron")], "v2")
+    assert normalization_cache.get("saffron") == (("saffron", None), "saffron")
@@ -0,0 +1,107 @@
+import json
+import random
+from pathlib import Path
+
+from recipe_manager.mongodb_driver import NUMBER_RECIPES_TO_RETURN, DatabaseDriver
+from recipe_manager.recipe_matcher import RecipeMatcher
+from tests.database_testing.aggregation_pipeline_evaluator import AggregationPipelineEvaluator
+
+BASELINE_INGREDIENT_FILE = Path(__file__).resolve().parents[1] / "ingredient_testing" / "baseline_ingredient_list.json"
+
+
+def load_baseline_ingredient_names():
+    with open(BASELINE_INGREDIENT_FILE, 'r') as f:
+        return [ingredient["name"] for ingredient in json.load(f)]
+
+
+def generate_recipes(num_recipes, ingredient_names, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "recipe_name": f"recipe {i}",
+            "source_url": f"https://example.com/recipe/{i}",
+            "ingredients": sorted(rng.sample(ingredient_names, rng.randint(1, 15)))
+        }
+        for i in range(num_recipes)
+    ]
+
+
+def run_aggregation(recipe_list, pipeline):
+    """Runs a DatabaseDriver pipeline over the recipes as they would be stored, _id in insertion order"""
+    documents = [{"_id": recipe_id, **recipe} for recipe_id, recipe in enumerate(DatabaseDriver.prepare_recipes_for_insert(recipe_list))]
+    return AggregationPipelineEvaluator(documents).aggregate(pipeline)
+
+
+def test_matcher_parity_with_aggregation():
+    ingredient_names = load_baseline_ingredient_names()
+    recipe_list = generate_recipes(2000, ingredient_names)
+    recipe_matcher = RecipeMatcher(recipe_list)
+
+    rng = random.Random(1)
+    for _ in range(50):
+        pantry = rng.sample(ingredient_names, rng.randint(0, 40)) + ["not a known ingredient"]
+        pipeline = DatabaseDriver.build_ingredient_set_difference_pipeline(pantry)
+        # The driver only returns the first NUMBER_RECIPES_TO_RETURN, compare a longer prefix of the same ordering
+        assert pipeline[-1] == {"$limit": NUMBER_RECIPES_TO_RETURN}
+        pipeline[-1] = {"$limit": 10}
+        expected = run_aggregation(recipe_list, pipeline)
+        matched = recipe_matcher.get_ingredient_set_difference(pantry, number_of_recipes=10)
+
+        # Same recipes in the same order, ties included: both keep insertion order among equal difference counts
+        assert [result["source_url"] for result in matched] == [result["source_url"] for result in expected]
+        assert [result["difference_count"] for result in matched] == [result["difference_count"] for result in expected]
+        assert [result["difference_ingredients"] for result in matched] == [sorted(result["difference_ingredients"]) for result in expected]
+
+
+def test_matcher_add_recipes_keeps_index_in_sync():
+    recipe_matcher = RecipeMatcher([
+        {"recipe_name": "toast", "source_url": "https://example.com/toast", "ingredients": ["bread", "butter"]},
+    ])
+    assert recipe_matcher.get_ingredient_set_difference(["egg"])[0]["recipe_name"] == "toast"
+
+    recipe_matcher.add_recipes([
+        {"recipe_name": "boiled egg", "source_url": "https://example.com/egg", "ingredients": ["egg"]},
+        {"recipe_name": "toast", "source_url": "https://example.com/toast", "ingredients": ["bread", "butter"]},
+    ])
+    assert len(recipe_matcher) == 2
+
+    result = recipe_matcher.get_ingredient_set_difference(["egg"])[0]
+    assert result["recipe_name"] == "boiled egg"
+    assert result["difference_count"] == 0
+    assert result["difference_ingredients"] == []
+
+
+def test_matcher_ranked_recipes_budget_and_pagination():
+    ingredient_names = load_baseline_ingredient_names()
+    recipe_list = generate_recipes(2000, ingredient_names)
+    recipe_matcher = RecipeMatcher(recipe_list)
+
+    rng = random.Random(3)
+    for _ in range(50):
+        pantry = rng.sample(ingredient_names, 60)
+        budget = rng.randint(0, 8)
+        # Recipes sharing no ingredient with the pantry are returned too when they fit the budget
+        expected = run_aggregation(recipe_list, DatabaseDriver.build_ranked_recipes_pipeline(pantry, budget, len(recipe_list)))
+
+        ranked = []
+        page = 0
+        while page_results := recipe_matcher.get_ranked_recipes(pantry, budget, 7, page):
+            ranked.extend(page_results)
+            page += 1
+
+        assert [result["source_url"] for result in ranked] == [result["source_url"] for result in expected]
+        assert [result["difference_count"] for result in ranked] == [result["difference_count"] for result in expected]
+
+
+def test_ranked_recipes_include_recipes_without_overlap_within_budget():
+    recipe_matcher = RecipeMatcher([
+        {"recipe_name": "toast", "source_url": "https://example.com/toast", "ingredients": ["bread", "butter"]},
+        {"recipe_name": "boiled egg", "source_url": "https://example.com/egg", "ingredients": ["egg"]},
+    ])
+
+    assert [result["recipe_name"] for result in recipe_matcher.get_ranked_recipes(["salt"], 1, 10)] == ["boiled egg"]
+    assert [result["recipe_name"] for result in recipe_matcher.get_ranked_recipes(["salt"], 2, 10)] == ["boiled egg", "toast"]
+    assert recipe_matcher.get_ranked_recipes(["salt"], 0, 10) == []
+    assert recipe_matcher.get_ranked_recipes_batch([["salt"], ["bread"]], 1, 10) == [
+        recipe_matcher.get_ranked_recipes(["salt"], 1, 10), recipe_matcher.get_ranked_recipes(["bread"], 1, 10)
+    ]
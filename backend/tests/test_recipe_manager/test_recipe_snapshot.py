@@ -0,0 +1,117 @@
+import random
+
+import numpy as np
+
+from recipe_manager.ingredient_normalizer import IngredientNormalizer
+from recipe_manager.recipe_managers import RecipeManager
+from recipe_manager.recipe_matcher import RecipeMatcher
+from recipe_manager.recipe_snapshot import RecipeDeltaLog, RecipeSnapshot, RecipeSnapshotWriter
+from tests.database_testing.in_memory_database_driver import InMemoryDatabaseDriver
+from tests.ingredient_testing.raw_json_ingredient_reader import RawJsonIngredientReader
+from tests.test_recipe_manager.test_recipe_matcher import generate_recipes, load_baseline_ingredient_names
+
+
+def test_snapshot_matches_in_memory_matcher(tmp_path):
+    ingredient_names = load_baseline_ingredient_names()
+    recipe_list = generate_recipes(2000, ingredient_names)
+    RecipeSnapshotWriter(tmp_path).export(recipe_list + recipe_list[:10], corpus_version=3)
+
+    in_memory_matcher = RecipeMatcher(recipe_list)
+    snapshot_matcher = RecipeMatcher.from_snapshot(tmp_path)
+    assert len(snapshot_matcher) == 2000
+    assert snapshot_matcher.snapshot.corpus_version == 3
+    # Views of the mapped files, not copies
+    assert isinstance(snapshot_matcher.snapshot.recipe_ingredient_ids, np.memmap)
+    assert isinstance(snapshot_matcher._get_posting_array(0).base, np.memmap)
+
+    rng = random.Random(4)
+    for _ in range(50):
+        pantry = rng.sample(ingredient_names, rng.randint(0, 40))
+        assert snapshot_matcher.get_ingredient_set_difference(pantry) == in_memory_matcher.get_ingredient_set_difference(pantry)
+        assert snapshot_matcher.get_ranked_recipes(pantry, 3, 7, 1) == in_memory_matcher.get_ranked_recipes(pantry, 3, 7, 1)
+
+
+def test_delta_log_applies_recipes_inserted_after_export(tmp_path):
+    database_driver = InMemoryDatabaseDriver([
+        {"recipe_name": "toast", "source_url": "https://example.com/toast", "ingredients": ["bread", "butter"]},
+    ])
+    writer = RecipeSnapshotWriter(tmp_path)
+    writer.export_from_database(database_driver)
+    database_driver.add_recipe_insert_listener(writer.delta_log.append)
+    recipe_matcher = RecipeMatcher.from_snapshot(tmp_path)
+
+    database_driver.insert_recipe_list([
+        {"recipe_name": "boiled egg", "source_url": "https://example.com/egg", "ingredients": ["egg"]},
+        {"recipe_name": "egg toast", "source_url": "https://example.com/egg-toast", "ingredients": ["bread", "egg"]},
+    ])
+    # Same recipe appended again by another writer, and a line that is still being written
+    writer.delta_log.append([{"recipe_name": "toast", "source_url": "https://example.com/toast", "ingredients": ["bread", "butter"]}])
+    with open(writer.delta_log.path, "a", encoding="utf-8") as f:
+        f.write('{"recipe_name": "partial"')
+
+    assert recipe_matcher.apply_snapshot_delta() == 2
+    assert recipe_matcher.apply_snapshot_delta() == 0
+    assert len(recipe_matcher) == 3
+    results = recipe_matcher.get_ingredient_set_difference(["bread", "egg"], number_of_recipes=3)
+    assert [(result["recipe_name"], result["difference_count"]) for result in results] == [("boiled egg", 0), ("egg toast", 0), ("toast", 1)]
+
+    # A new worker gets the same recipes from the snapshot and the delta log
+    assert len(RecipeMatcher.from_snapshot(tmp_path)) == 3
+
+    # Readers of a new export only replay what was appended after it started
+    writer.export_from_database(database_driver)
+    assert RecipeSnapshot.open(tmp_path).delta_offset == RecipeDeltaLog(tmp_path).get_size()
+    assert len(RecipeMatcher.from_snapshot(tmp_path)) == 3
+    assert len([path for path in tmp_path.iterdir() if path.name.startswith("snapshot-")]) == RecipeSnapshotWriter.VERSIONS_KEPT
+
+
+def test_recipe_manager_from_snapshot(tmp_path):
+    database_driver = InMemoryDatabaseDriver([
+        {"recipe_name": "toast", "source_url": "https://example.com/toast", "ingredients": ["bread", "butter"]},
+    ])
+    RecipeSnapshotWriter(tmp_path).export_from_database(database_driver)
+
+    ingredient_normalizer = IngredientNormalizer(RawJsonIngredientReader(), contextual_matching=False)
+    recipe_manager = RecipeManager(database_driver=database_driver, ingredient_normalizer=ingredient_normalizer, recipe_snapshot_directory=tmp_path)
+    try:
+        database_driver.insert_recipe_list([{"recipe_name": "boiled egg", "source_url": "https://example.com/egg", "ingredients": ["egg"]}])
+
+        assert len(recipe_manager.recipe_matcher) == 2
+        assert RecipeDeltaLog(tmp_path).read(0)[0][0]["recipe_name"] == "boiled egg"
+    finally:
+        recipe_manager.cpu_executor.close()
+
+
+def test_delta_log_is_compacted_to_the_oldest_kept_version(tmp_path):
+    database_driver = InMemoryDatabaseDriver()
+    writer = RecipeSnapshotWriter(tmp_path)
+    writer.export_from_database(database_driver)
+    database_driver.add_recipe_insert_listener(writer.delta_log.append)
+    recipe_matcher = RecipeMatcher.from_snapshot(tmp_path)
+
+    def insert_recipe(recipe_name):
+        database_driver.insert_recipe_list([{"recipe_name": recipe_name, "source_url": f"https://example.com/{recipe_name}", "ingredients": [recipe_name]}])
+
+    insert_recipe("first")
+    assert recipe_matcher.apply_snapshot_delta() == 1
+    second_export_offset = writer.delta_log.get_size()
+    writer.export_from_database(database_driver)
+    insert_recipe("second")
+    # The third export removes the first version, the kept versions already hold "first"
+    writer.export_from_database(database_driver)
+    insert_recipe("third")
+
+    assert b"first" not in writer.delta_log.path.read_bytes()
+    recipe_list, offset = RecipeDeltaLog(tmp_path).read(second_export_offset)
+    assert [recipe["recipe_name"] for recipe in recipe_list] == ["second", "third"]
+    assert offset == writer.delta_log.get_size()
+    # Offsets keep counting from the start of the original log
+    assert RecipeDeltaLog(tmp_path).read(0) == (recipe_list, offset)
+
+    # A worker that opened the removed version continues from the offset it already read
+    assert recipe_matcher.apply_snapshot_delta() == 2
+    assert len(recipe_matcher) == 3
+    assert len(RecipeMatcher.from_snapshot(tmp_path)) == 3
+
+    # Nothing to drop while the oldest kept version still needs the whole log
+    assert writer.delta_log.compact(second_export_offset) == 0
@@ -0,0 +1,99 @@
+import pytest
+
+from recipe_manager import recipe_managers
+from recipe_manager.recipe_managers import RecipeManager
+from recipe_manager.response_cache import RecipeResponseCache
+from tests.database_testing.in_memory_database_driver import InMemoryDatabaseDriver
+
+
+class IdentityNormalizer:
+    """Stand-in for the ingredient normalizer, the test strings are already normalized"""
+    def __init__(self):
+        self.calls = 0
+
+    def generate_normalized_ingredients(self, ingredient_strings):
+        self.calls += 1
+        return list(ingredient_strings), []
+
+
+def make_recipe(name, ingredients):
+    return {"recipe_name": name, "source_url": f"https://example.com/{name}", "ingredients": ingredients}
+
+
+def test_key_is_canonical_ingredient_set():
+    assert RecipeResponseCache.make_key(["salt", "egg", "salt"], 1) == RecipeResponseCache.make_key(["egg", "salt"], 1)
+    assert RecipeResponseCache.make_key(["egg", "salt"], 1) != RecipeResponseCache.make_key(["egg", "salt"], 2)
+
+
+def test_saved_seconds_and_hit_ratio():
+    cache = RecipeResponseCache()
+    cache.set_corpus_version(0)
+    key = cache.make_key(["egg"], 0)
+
+    assert cache.get(key) is None
+    cache.put(key, {"success": True}, 0.25, 0)
+    assert cache.get(key) == {"success": True}
+    assert cache.get(key) == {"success": True}
+
+    statistics = cache.get_statistics()
+    assert statistics["hit_ratio"] == 2 / 3
+    assert statistics["saved_seconds"] == 0.5
+
+
+def test_response_computed_under_old_version_is_not_stored():
+    cache = RecipeResponseCache()
+    cache.set_corpus_version(0)
+    key = cache.make_key(["egg"], 0)
+
+    cache.set_corpus_version(1)
+    cache.put(key, {"success": False}, 0.1, 0)
+    assert cache.get(key) is None
+
+
+def test_insert_invalidates_cached_response():
+    manager = RecipeManager(ingredient_normalizer=IdentityNormalizer(), database_driver=InMemoryDatabaseDriver([make_recipe("toast", ["bread", "butter", "jam"])]))
+    request = {"num_missing_ingredients_allowed": 0, "ingredients_list": ["egg", "salt"]}
+    try:
+        assert manager.find_similar_recipe(request) == {"success": False}
+        # Same pantry in another order is served from the cache
+        assert manager.find_similar_recipe({**request, "ingredients_list": ["salt", "egg"]}) == {"success": False}
+        assert manager.response_cache.get_statistics()["hits"] == 1
+
+        manager.database_driver.insert_recipe_list([make_recipe("omelette", ["egg", "salt"])])
+        response = manager.find_similar_recipe(request)
+        assert response["success"]
+        assert response["recipe"]["recipe_name"] == "omelette"
+    finally:
+        manager.close()
+
+
+def insert_from_other_process(database_driver, recipe_list):
+    # Another process, e.g. the scraper, inserts through its own driver, so this process' listeners aren't notified
+    recipe_insert_listeners, database_driver.recipe_insert_listeners = database_driver.recipe_insert_listeners, []
+    try:
+        database_driver.insert_recipe_list(recipe_list)
+    finally:
+        database_driver.recipe_insert_listeners = recipe_insert_listeners
+
+
+@pytest.mark.parametrize("query_mode", [RecipeManager.IN_PROCESS_QUERY_MODE, RecipeManager.SHARDED_QUERY_MODE])
+def test_in_process_corpus_picks_up_recipes_inserted_by_other_processes(query_mode, monkeypatch):
+    monkeypatch.setattr(recipe_managers, "CORPUS_VERSION_REFRESH_SECONDS", 0)
+    database_driver = InMemoryDatabaseDriver([make_recipe("toast", ["bread", "butter", "jam"])])
+    manager = RecipeManager(query_mode, ingredient_normalizer=IdentityNormalizer(), database_driver=database_driver, shard_count=2)
+    request = {"num_missing_ingredients_allowed": 0, "ingredients_list": ["egg", "salt"]}
+    try:
+        assert manager.find_similar_recipe(request) == {"success": False}
+
+        insert_from_other_process(database_driver, [make_recipe("omelette", ["egg", "salt"])])
+        response = manager.find_similar_recipe(request)
+        assert response["success"]
+        assert response["recipe"]["recipe_name"] == "omelette"
+
+        # Own inserts are already in the matcher, reading them again on the next refresh doesn't add duplicates
+        database_driver.insert_recipe_list([make_recipe("fried egg", ["egg", "oil"])])
+        insert_from_other_process(database_driver, [make_recipe("scrambled egg", ["egg", "milk"])])
+        manager.find_similar_recipe(request)
+        assert len(manager.recipe_matcher) == 4
+    finally:
+        manager.close()
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from recipe_manager.recipe_managers import RecipeManager
+from recipe_manager.recipe_matcher import RecipeMatcher
+from recipe_manager.sharded_matcher import ShardedRecipeMatcher
+from tests.database_testing.in_memory_database_driver import InMemoryDatabaseDriver
+from tests.test_recipe_manager.test_batch_matching import CountingNormalizer
+from tests.test_recipe_manager.test_recipe_matcher import generate_recipes, load_baseline_ingredient_names
+
+
+@pytest.fixture(scope="module")
+def ingredient_names():
+    return load_baseline_ingredient_names()
+
+
+@pytest.fixture(scope="module")
+def matchers(ingredient_names):
+    recipe_list = generate_recipes(3000, ingredient_names)
+    sharded_matcher = ShardedRecipeMatcher(recipe_list, shard_count=3)
+    yield RecipeMatcher(recipe_list), sharded_matcher
+    sharded_matcher.close()
+
+
+def test_sharded_results_match_single_matcher(matchers, ingredient_names):
+    recipe_matcher, sharded_matcher = matchers
+    assert len(sharded_matcher) == len(recipe_matcher)
+
+    rng = random.Random(6)
+    pantries = [rng.sample(ingredient_names, rng.randint(0, 60)) for _ in range(30)]
+    for pantry in pantries:
+        assert sharded_matcher.get_ingredient_set_difference(pantry, 10) == recipe_matcher.get_ingredient_set_difference(pantry, 10)
+        for page in range(3):
+            assert sharded_matcher.get_ranked_recipes(pantry, 4, 7, page) == recipe_matcher.get_ranked_recipes(pantry, 4, 7, page)
+    assert sharded_matcher.get_ranked_recipes_batch(pantries, 2, 5) == recipe_matcher.get_ranked_recipes_batch(pantries, 2, 5)
+
+
+def test_sharded_add_recipes_skips_duplicates(matchers):
+    recipe_matcher, sharded_matcher = matchers
+    new_recipes = [
+        {"recipe_name": "boiled egg", "source_url": "https://example.com/egg", "ingredients": ["egg"]},
+        {"recipe_name": "boiled egg", "source_url": "https://example.com/egg", "ingredients": ["egg"]},
+        {"recipe_name": "recipe 0", "source_url": "https://example.com/recipe/0", "ingredients": ["egg"]},
+    ]
+    sharded_matcher.add_recipes(new_recipes)
+    recipe_matcher.add_recipes(new_recipes)
+
+    assert len(sharded_matcher) == len(recipe_matcher) == 3001
+    assert sharded_matcher.get_ingredient_set_difference(["egg"], 5) == recipe_matcher.get_ingredient_set_difference(["egg"], 5)
+
+
+def test_merge_stops_after_number_of_recipes():
+    def shard_results(shard_name, missing_counts):
+        for sequence, missing_count in missing_counts:
+            yield missing_count, sequence, shard_name
+        raise AssertionError("Read past the results needed")
+
+    # The second shard's best result can't beat the first shard's, it is never read past its head
+    merged = ShardedRecipeMatcher.merge_shard_results([shard_results("a", [(0, 0), (2, 1), (5, 1)]), shard_results("b", [(1, 3), (3, 3)])], 3)
+    assert merged == ["a", "a", "a"]
+
+
+def test_recipe_manager_sharded_mode():
+    database_driver = InMemoryDatabaseDriver([
+        {"recipe_name": "toast", "source_url": "https://example.com/toast", "ingredients": ["bread", "butter"]},
+    ])
+    recipe_manager = RecipeManager(query_mode=RecipeManager.SHARDED_QUERY_MODE, database_driver=database_driver,
+                                   ingredient_normalizer=CountingNormalizer(), shard_count=2)
+    try:
+        database_driver.insert_recipe_list([{"recipe_name": "boiled egg", "source_url": "https://example.com/egg", "ingredients": ["egg"]}])
+        assert len(recipe_manager.recipe_matcher) == 2
+
+        batch_response = recipe_manager.find_similar_recipes_batch({"num_missing_ingredients_allowed": 0, "pantries": [["Egg"], ["Bread"]]})
+        assert [len(result["recipes"]) for result in batch_response["results"]] == [1, 0]
+    finally:
+        recipe_manager.close()
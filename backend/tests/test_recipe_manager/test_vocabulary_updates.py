@@ -0,0 +1,114 @@
+import asyncio
+
+from recipe_manager.config_cache import ConfigCache
+from recipe_manager.embedding_store import EmbeddingStore
+from recipe_manager.faiss_index import FaissIndexConfig
+from recipe_manager.ingredient_normalizer import IngredientNormalizer, SentenceTransformerHandler
+from recipe_manager.ingredient_vocabulary import IngredientVocabulary
+from recipe_manager.lexical_matcher import LexicalMatcher
+from recipe_manager.normalization_cache import NormalizationCache
+from recipe_manager.recipe_managers import RecipeManager
+from tests.database_testing.in_memory_database_driver import InMemoryDatabaseDriver
+from tests.ingredient_testing.raw_json_ingredient_reader import RawJsonIngredientReader
+from tests.test_recipe_manager.test_embedding_backends import HashEmbeddingBackend
+
+NEW_INGREDIENTS = [{"name": "yuzu kosho", "alias": ["yuzu pepper paste"]}, {"name": "butter", "alias": ["churned butter"]}]
+
+
+def test_vocabulary_and_lexical_matcher_extend_without_changing_previous_version():
+    all_ingredients = RawJsonIngredientReader().get_all_ingredients()
+    vocabulary = IngredientVocabulary(all_ingredients)
+    lexical_matcher = LexicalMatcher(vocabulary)
+
+    new_vocabulary = vocabulary.with_ingredients(NEW_INGREDIENTS)
+    new_strings = list(new_vocabulary.alias_to_canonical)[len(vocabulary):]
+    new_lexical_matcher = lexical_matcher.with_vocabulary(new_vocabulary, new_strings)
+
+    assert new_strings == ["yuzu kosho", "yuzu pepper paste", "churned butter"]
+    assert new_vocabulary.get_canonical_name("churned butter") == "butter"
+    assert "churned butter" in new_vocabulary.get_aliases("butter")
+    assert "yuzu kosho" not in vocabulary and "churned butter" not in vocabulary.get_aliases("butter")
+
+    # Same result as building from the full list
+    rebuilt_vocabulary = IngredientVocabulary(all_ingredients + NEW_INGREDIENTS)
+    assert new_vocabulary.version == rebuilt_vocabulary.version != vocabulary.version
+    assert new_lexical_matcher.match_strings(["yuzu peper paste", "tomatoes"]) == LexicalMatcher(rebuilt_vocabulary).match_strings(["yuzu peper paste", "tomatoes"])
+    assert lexical_matcher.match_strings(["yuzu peper paste"]) == [(None, None)]
+
+
+def test_handler_encodes_only_new_strings(tmp_path):
+    known_ingredients = ["butter", "olive oil", "salted butter", "green olives"]
+    SentenceTransformerHandler(known_ingredients, EmbeddingStore(tmp_path), FaissIndexConfig(), embedding_backend=HashEmbeddingBackend()).load_index()
+
+    # Loaded memory-mapped from the store, the update appends to a copy
+    backend = HashEmbeddingBackend()
+    handler = SentenceTransformerHandler(known_ingredients, EmbeddingStore(tmp_path), FaissIndexConfig(), embedding_backend=backend)
+    previous_index = handler.get_ingredient_index()
+    assert backend.encoded_strings == []
+
+    assert handler.add_ingredients(["olive oil", "smoked paprika", "smoked paprika"]) == ["smoked paprika"]
+    assert backend.encoded_strings == ["smoked paprika"]
+    assert handler.search_ingredient("smoked paprika")[0] == "smoked paprika"
+    assert handler.index.ntotal == 5
+
+    assert previous_index.index.ntotal == 4 and len(previous_index.known_ingredients) == 4
+    assert handler.add_ingredients(["butter"]) == []
+
+
+def test_normalizer_add_ingredients(tmp_path):
+    ingredient_normalizer = IngredientNormalizer(RawJsonIngredientReader(), embedding_store=EmbeddingStore(tmp_path),
+                                                 embedding_backend=HashEmbeddingBackend())
+    ingredient_normalizer.sentence_transformer.load_index()
+    cache_version = ingredient_normalizer.get_cache_version()
+    ingredient_normalizer.normalization_cache.put_many(["yuzu kosho"], [(("yuzu kosho", None), None)])
+
+    assert ingredient_normalizer.add_ingredients(NEW_INGREDIENTS) == ["yuzu kosho", "yuzu pepper paste", "churned butter"]
+    assert ingredient_normalizer.match_ingredient_tuples([("churned butter", None), ("yuzu kosho", None)], ["unused"] * 2) == ["butter", "yuzu kosho"]
+    assert ingredient_normalizer.sentence_transformer.search_ingredient("yuzu pepper paste")[0] == "yuzu pepper paste"
+
+    # Misses cached under the previous vocabulary aren't read anymore
+    assert ingredient_normalizer.get_cache_version() != cache_version
+    assert ingredient_normalizer.normalization_cache.get("yuzu kosho") is None
+
+    assert ingredient_normalizer.add_aliases("butter", ["churned butter"]) == []
+    # Aliases are merged into the existing entry rather than added as a second "butter"
+    butter_entries = [ingredient_dict for ingredient_dict in ingredient_normalizer.all_ingredients if ingredient_dict["name"] == "butter"]
+    assert len(butter_entries) == 1 and "churned butter" in butter_entries[0]["alias"]
+
+
+def test_additions_reach_other_processes(tmp_path):
+    database_driver = InMemoryDatabaseDriver()
+    cache_path = tmp_path / "normalization_cache.sqlite3"
+
+    def make_recipe_manager():
+        ingredient_normalizer = IngredientNormalizer(RawJsonIngredientReader(), NormalizationCache(persistent_path=cache_path), contextual_matching=False)
+        recipe_manager = RecipeManager(database_driver=database_driver, ingredient_normalizer=ingredient_normalizer)
+        recipe_manager.config_cache = ConfigCache(database_driver, refresh_seconds=0)
+        return recipe_manager
+
+    recipe_manager, other_recipe_manager = make_recipe_manager(), make_recipe_manager()
+    try:
+        previous_cache_version = other_recipe_manager.ingredient_normalizer.get_cache_version()
+        other_recipe_manager.ingredient_normalizer.normalization_cache.put_many(["yuzu kosho"], [(("yuzu kosho", None), None)])
+
+        assert asyncio.run(recipe_manager.add_ingredients_async(NEW_INGREDIENTS[:1])) == ["yuzu kosho", "yuzu pepper paste"]
+        assert asyncio.run(recipe_manager.add_ingredient_aliases_async("butter", ["churned butter"])) == ["churned butter"]
+
+        # The process that added the ingredients doesn't clear the entries other processes still use from the shared cache
+        previous_version_cache = NormalizationCache(persistent_path=cache_path)
+        previous_version_cache.set_vocabulary_version(previous_cache_version)
+        assert previous_version_cache.get("yuzu kosho") == (("yuzu kosho", None), None)
+
+        other_recipe_manager.refresh_ingredient_additions()
+        assert other_recipe_manager.ingredient_normalizer.vocabulary.get_canonical_name("yuzu pepper paste") == "yuzu kosho"
+        assert other_recipe_manager.ingredient_normalizer.vocabulary.get_canonical_name("churned butter") == "butter"
+        assert other_recipe_manager.ingredient_normalizer.normalization_cache.get("yuzu kosho") is None
+
+        # A restarted process adds them on its first request
+        restarted_recipe_manager = make_recipe_manager()
+        restarted_recipe_manager.refresh_ingredient_additions()
+        assert restarted_recipe_manager.ingredient_normalizer.vocabulary.version == recipe_manager.ingredient_normalizer.vocabulary.version
+        restarted_recipe_manager.close()
+    finally:
+        recipe_manager.close()
+        other_recipe_manager.close()
@@ -0,0 +1,177 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from recipe_manager.ingredient_normalizer import IngredientNormalizer
+from recipe_manager.link_checker import LinkChecker
+from recipe_manager.mongodb_driver import DatabaseDriver
+from recipe_manager.recipe_managers import RecipeManager
+from recipe_manager.recipe_scraper import RecipeScraper
+from recipe_manager.recipe_snapshot import RecipeSnapshotWriter
+from tests.database_testing.in_memory_database_driver import InMemoryDatabaseDriver
+from tests.ingredient_testing.raw_json_ingredient_reader import RawJsonIngredientReader
+
+INGREDIENT_NAMES = ["egg", "salt", "pepper", "butter", "flour", "milk"]
+MISSING_PAGE_EVERY = 5  # Every 5th recipe links to a page that no longer exists
+
+
+class StubSpoonacularHandler(BaseHTTPRequestHandler):
+    """Serves /recipes/random like the Spoonacular API, and the recipe pages the returned recipes link to"""
+    recipes_served = 0
+    lock = threading.Lock()
+
+    def do_HEAD(self):
+        status_code = 404 if self.path.startswith("/missing") else 200
+        self.send_response(status_code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/recipes/random":
+            return self.do_HEAD()
+
+        number = int(parse_qs(url.query)["number"][0])
+        with StubSpoonacularHandler.lock:
+            first_id = StubSpoonacularHandler.recipes_served
+            StubSpoonacularHandler.recipes_served += number
+
+        host = f"http://{self.headers['Host']}"
+        recipes = []
+        for recipe_id in range(first_id, first_id + number):
+            page = "missing" if recipe_id % MISSING_PAGE_EVERY == MISSING_PAGE_EVERY - 1 else "recipe"
+            recipes.append({
+                "title": f"recipe {recipe_id}",
+                "sourceUrl": f"{host}/{page}/{recipe_id}",
+                "extendedIngredients": [{"name": INGREDIENT_NAMES[(recipe_id + offset) % len(INGREDIENT_NAMES)]} for offset in range(3)]
+            })
+
+        body = json.dumps({"recipes": recipes}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class KnownIngredientNormalizer:
+    """Stand-in for the ingredient normalizer, every stub ingredient is already a known normalized name"""
+    def normalize_ingredient_strings(self, ingredient_strings):
+        return [ingredient if ingredient in INGREDIENT_NAMES else None for ingredient in ingredient_strings]
+
+
+class FailingInMemoryDatabaseDriver(InMemoryDatabaseDriver):
+    """Raises on the nth insert, like a connection lost in the middle of a run"""
+    def __init__(self, fail_on_insert: int):
+        super().__init__()
+        self.fail_on_insert = fail_on_insert
+
+    def insert_recipe_list(self, recipe_list) -> dict:
+        if len(self.insert_many_batch_sizes) + 1 == self.fail_on_insert:
+            self.insert_many_batch_sizes.append(0)
+            raise RuntimeError("Lost connection to the database")
+        return super().insert_recipe_list(recipe_list)
+
+
+class ReportingFailureInMemoryDatabaseDriver(FailingInMemoryDatabaseDriver):
+    """Reports the whole nth batch as failed instead of raising, like DatabaseDriver when the connection is lost"""
+    def insert_recipe_list(self, recipe_list) -> dict:
+        if len(self.insert_many_batch_sizes) + 1 == self.fail_on_insert:
+            self.insert_many_batch_sizes.append(0)
+            return DatabaseDriver.build_insert_report(recipe_list, [], set(), set(range(len(recipe_list))))
+        return super().insert_recipe_list(recipe_list)
+
+
+@pytest.fixture
+def spoonacular_url():
+    StubSpoonacularHandler.recipes_served = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSpoonacularHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def make_scraper(spoonacular_url, database_driver, recipe_snapshot_directory=None):
+    return RecipeScraper(KnownIngredientNormalizer(), database_driver, LinkChecker(max_workers=4), base_url=spoonacular_url, api_key="test",
+                         recipe_snapshot_directory=recipe_snapshot_directory)
+
+
+def test_pipelined_ingest_end_to_end(spoonacular_url, tmp_path):
+    database_driver = InMemoryDatabaseDriver()
+    scraper = make_scraper(spoonacular_url, database_driver)
+    checkpoint_path = tmp_path / "checkpoint.json"
+
+    report = scraper.scrape_and_insert_recipes_pipelined(30, fetch_batch_size=7, insert_batch_size=5, queue_size=2, checkpoint_path=checkpoint_path)
+    scraper.link_checker.close()
+
+    live_count = 30 - 30 // MISSING_PAGE_EVERY
+    assert len(report["inserted"]) == live_count
+    assert len(database_driver.recipes) == live_count
+    assert all("/missing/" not in recipe["source_url"] for recipe in database_driver.recipes)
+    assert database_driver.insert_many_batch_sizes == [5, 5, 5, 5, 4]
+
+    assert report["stages"]["fetch"]["items_out"] == 30
+    assert report["stages"]["link_check"]["items_out"] == live_count
+    assert report["stages"]["insert"]["items_out"] == live_count
+    assert not checkpoint_path.exists()
+
+
+@pytest.mark.parametrize("driver_class", [FailingInMemoryDatabaseDriver, ReportingFailureInMemoryDatabaseDriver])
+def test_interrupted_ingest_resumes_from_checkpoint(driver_class, spoonacular_url, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    pipeline_options = {"fetch_batch_size": 5, "insert_batch_size": 4, "queue_size": 1, "checkpoint_path": checkpoint_path}
+
+    database_driver = driver_class(fail_on_insert=3)
+    scraper = make_scraper(spoonacular_url, database_driver)
+    with pytest.raises(RuntimeError):
+        scraper.scrape_and_insert_recipes_pipelined(40, **pipeline_options)
+
+    completed = json.loads(checkpoint_path.read_text())["completed"]
+    assert 0 < completed < 40
+    inserted_before_failure = len(database_driver.recipes)
+
+    # Resume with the connection back, only the recipes that weren't completed are fetched again
+    database_driver.fail_on_insert = None
+    served_before_resume = StubSpoonacularHandler.recipes_served
+    report = scraper.scrape_and_insert_recipes_pipelined(40, **pipeline_options)
+    scraper.link_checker.close()
+
+    assert StubSpoonacularHandler.recipes_served - served_before_resume == 40 - completed
+    assert report["completed"] == 40
+    assert len(database_driver.recipes) == inserted_before_failure + len(report["inserted"])
+    assert not checkpoint_path.exists()
+
+
+def test_scraped_recipes_reach_snapshot_workers(spoonacular_url, tmp_path):
+    # The API worker and the scraper run in separate processes, each with its own driver
+    worker_database_driver = InMemoryDatabaseDriver([
+        {"recipe_name": "toast", "source_url": "https://example.com/toast", "ingredients": ["bread", "butter"]},
+    ])
+    RecipeSnapshotWriter(tmp_path).export_from_database(worker_database_driver)
+    ingredient_normalizer = IngredientNormalizer(RawJsonIngredientReader(), contextual_matching=False)
+    recipe_manager = RecipeManager(database_driver=worker_database_driver, ingredient_normalizer=ingredient_normalizer, recipe_snapshot_directory=tmp_path)
+
+    scraper = make_scraper(spoonacular_url, InMemoryDatabaseDriver(), recipe_snapshot_directory=tmp_path)
+    try:
+        scraper.scrape_and_insert_recipes(10)
+        assert scraper.stage_counters["fetch"].items_out == 10
+        assert scraper.stage_counters["insert"].items_out == 10 - 10 // MISSING_PAGE_EVERY
+        scraper.scrape_and_insert_recipes_pipelined(10, fetch_batch_size=5, insert_batch_size=5, checkpoint_path=tmp_path / "checkpoint.json")
+
+        scraped_urls = {recipe["source_url"] for recipe in scraper.database_driver.recipes}
+        assert len(scraped_urls) == 2 * (10 - 10 // MISSING_PAGE_EVERY)
+        assert len(recipe_manager.recipe_matcher) == 1
+
+        recipe_manager.apply_snapshot_delta()
+        assert len(recipe_manager.recipe_matcher) == 1 + len(scraped_urls)
+    finally:
+        scraper.link_checker.close()
+        recipe_manager.close()
@@ -0,0 +1,116 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from recipe_manager.link_checker import LinkChecker
+
+SLOW_RESPONSE_SECONDS = 0.5
+
+
+class StubRecipeSiteHandler(BaseHTTPRequestHandler):
+    """Simulates recipe sites: live, missing, slow, HEAD-rejecting and hanging pages"""
+    active_requests = 0
+    max_active_requests = 0
+    request_count = 0
+    lock = threading.Lock()
+
+    def do_HEAD(self):
+        self.handle_request(is_head=True)
+
+    def do_GET(self):
+        self.handle_request(is_head=False)
+
+    def handle_request(self, is_head):
+        with StubRecipeSiteHandler.lock:
+            StubRecipeSiteHandler.request_count += 1
+            StubRecipeSiteHandler.active_requests += 1
+            StubRecipeSiteHandler.max_active_requests = max(StubRecipeSiteHandler.max_active_requests, StubRecipeSiteHandler.active_requests)
+        try:
+            if self.path.startswith("/slow"):
+                time.sleep(SLOW_RESPONSE_SECONDS)
+                status_code = 200
+            elif self.path.startswith("/hang"):
+                time.sleep(3)
+                status_code = 200
+            elif self.path.startswith("/no-head"):
+                status_code = 405 if is_head else 200
+            elif self.path.startswith("/missing"):
+                status_code = 404
+            else:
+                status_code = 200
+
+            self.send_response(status_code)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        finally:
+            with StubRecipeSiteHandler.lock:
+                StubRecipeSiteHandler.active_requests -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubRecipeSiteHandler.active_requests = 0
+    StubRecipeSiteHandler.max_active_requests = 0
+    StubRecipeSiteHandler.request_count = 0
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubRecipeSiteHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_link_checker_statuses_and_timeouts(stub_server):
+    link_checker = LinkChecker(timeout=(1, 1))
+    results = link_checker.check_urls([
+        f"{stub_server}/live",
+        f"{stub_server}/missing",
+        f"{stub_server}/no-head",
+        f"{stub_server}/hang",
+        "http://127.0.0.1:1/refused",
+    ])
+    link_checker.close()
+
+    assert results == {
+        f"{stub_server}/live": True,
+        f"{stub_server}/missing": False,
+        f"{stub_server}/no-head": True,
+        f"{stub_server}/hang": False,
+        "http://127.0.0.1:1/refused": False,
+    }
+
+
+def test_link_checker_concurrency_and_host_limit(stub_server):
+    link_checker = LinkChecker(max_workers=8, max_requests_per_host=4)
+    slow_urls = [f"{stub_server}/slow/{i}" for i in range(8)]
+
+    start = time.perf_counter()
+    results = link_checker.check_urls(slow_urls)
+    elapsed = time.perf_counter() - start
+    link_checker.close()
+
+    assert all(results.values())
+    # Sequential checks would take 8 slow responses, 4 at a time should take about 2
+    assert elapsed < SLOW_RESPONSE_SECONDS * 4
+    assert StubRecipeSiteHandler.max_active_requests <= 4
+
+
+def test_link_checker_caches_live_urls(stub_server):
+    link_checker = LinkChecker()
+    urls = [f"{stub_server}/live", f"{stub_server}/missing"]
+
+    link_checker.check_urls(urls)
+    first_request_count = StubRecipeSiteHandler.request_count
+    results = link_checker.check_urls(urls)
+    link_checker.close()
+
+    assert results == {f"{stub_server}/live": True, f"{stub_server}/missing": False}
+    # Only the failing URL is checked again
+    assert StubRecipeSiteHandler.request_count == first_request_count + 1